@@ -1,12 +1,37 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import threading
+import time
+import uuid
+from functools import partial
+from typing import Optional
 
+import anyio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from app.api.responses import FastJSONResponse, dumps, execute_response_content
 from app.models.schemas import (
     ConnectionRequest, ConnectionResponse, QueryRequest, 
-    QueryResponse, ExecuteRequest, ExecuteResponse, SchemaResponse
+    QueryResponse, ExecuteRequest, ExecuteResponse, SchemaResponse,
+    ResultSetRequest, ResultSetResponse, ResultPageResponse,
+    JobRequest, JobResponse, BatchExecuteRequest, BatchExecuteResponse, FanoutRequest, ProfileRequest,
+    TemplateRequest, TemplateResponse, TemplateExecuteRequest
 )
 from app.services.database_service import DatabaseService
 from app.services.llm_service import LLMService
+from app.services.result_set_service import result_set_service
+from app.services.job_service import job_service
+from app.services.query_registry import query_registry
+from app.services.query_cache import query_cache
+from app.services.replica_router import replica_router
+from app.services.result_budget import release_per_fetch
+from app.services.suggestion_service import suggestion_prefetcher
+from app.services.query_templates import query_template_service
 from app.core.config import config
+from app.core.loop_monitor import loop_monitor
+from app.core.profiling import is_admin, profiler
+from app.core.tracing import span, trace_buffer
 from app.services.agent_service import AgentOrchestrator, AgentContext
 
 # Create router
@@ -15,6 +40,9 @@ router = APIRouter(prefix="/api", tags=["api"])
 # Initialize services
 llm_service = LLMService()
 
+# Seconds between client disconnect checks while a query runs
+DISCONNECT_POLL_INTERVAL = 0.25
+
 @router.post("/connect", response_model=ConnectionResponse)
 async def test_connection(request: ConnectionRequest):
     """Test database connection"""
@@ -40,13 +68,46 @@ async def get_schema(request: ConnectionRequest):
 async def generate_query(request: QueryRequest):
     """Generate SQL query using AI agents"""
     try:
+        # Get database schema
+        with span("schema"):
+            schema_response = await run_in_threadpool(
+                DatabaseService.get_cached_schema_info, request.database_url
+            )
+        
+        # Suggested questions may already have validated SQL waiting
+        with span("prefetch_lookup") as lookup_span:
+            prefetched = suggestion_prefetcher.lookup(
+                request.database_url, schema_response, request.natural_language
+            )
+            lookup_span.set(hit=prefetched is not None)
+        if prefetched is not None:
+            preview, preview_fetched_at = None, None
+            if request.preview:
+                preview, preview_fetched_at = prefetched.fresh_preview(), prefetched.created_at
+                if preview is None:
+                    # Cached rows are older than SUGGESTION_PREVIEW_TTL; fetch them again
+                    result = await run_in_threadpool(
+                        DatabaseService.preview_query, request.database_url, prefetched.sql
+                    )
+                    preview, preview_fetched_at = (result.model_dump(), time.time()) if result.success else (None, None)
+            return {
+                "sql": prefetched.sql,
+                "explanation": prefetched.explanation,
+                "safety_warnings": prefetched.safety_warnings,
+                "estimated_rows": 1000,
+                "preview": preview,
+                "preview_fetched_at": preview_fetched_at,
+                "prefetched": True,
+                "validation": {"valid": True, "attempts": 0, "validation_time": 0.0, "error": None},
+                "complexity_analysis": {},
+                "business_insights": [],
+                "suggested_actions": [],
+                "agent_messages": []
+            }
+        
         # Initialize agent orchestrator
         orchestrator = AgentOrchestrator()
         
-        # Get database schema
-        db_service = DatabaseService()
-        schema_response = db_service.get_schema_info(request.database_url)
-        
         # Convert schema to format expected by agents
         schema_dict = {}
         for table in schema_response.tables:
@@ -62,7 +123,10 @@ async def generate_query(request: QueryRequest):
         )
         
         # Process user input through agents
-        agent_response = await orchestrator.process_user_input(context, request.natural_language)
+        with span("agents"):
+            agent_response = await orchestrator.process_user_input(
+                context, request.natural_language, preview=request.preview
+            )
         
         # Extract primary response (SQL query and explanation)
         primary_response = agent_response.get("primary_response", {})
@@ -76,6 +140,10 @@ async def generate_query(request: QueryRequest):
             "explanation": primary_response.get("explanation"),
             "safety_warnings": primary_response.get("safety_warnings", []),
                          "estimated_rows": 1000,  # TODO: Implement in agent system
+            "preview": primary_response.get("preview"),
+            "preview_fetched_at": time.time() if primary_response.get("preview") else None,
+            "prefetched": False,
+            "validation": primary_response.get("validation"),
             
             # New agent-powered features
             "complexity_analysis": primary_response.get("complexity", {}),
@@ -97,20 +165,304 @@ async def generate_query(request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query generation failed: {str(e)}")
 
+async def _run_cancellable(http_request: Request, cancel_id: str, func, *args, **kwargs):
+    """Run a blocking query call, cancelling its statement if the client disconnects"""
+    task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            await run_in_threadpool(query_registry.cancel, cancel_id)
+            return await task
+
 @router.post("/execute-query", response_model=ExecuteResponse)
-async def execute_query(request: ExecuteRequest):
+async def execute_query(request: ExecuteRequest, http_request: Request):
     """Execute SQL query and return results"""
+    if request.request_id and query_registry.is_running(request.request_id):
+        raise HTTPException(status_code=409, detail=f"Request id {request.request_id} is already running")
+    
     try:
         # Test connection first
-        conn_response = DatabaseService.test_connection(request.database_url)
+        with span("test_connection"):
+            conn_response = DatabaseService.test_connection(request.database_url)
         if conn_response.status != "success":
             raise HTTPException(status_code=400, detail=conn_response.message)
         
-        return DatabaseService.execute_query(request.database_url, request.sql)
+        request_id = request.request_id or uuid.uuid4().hex
+        with span("execute", template=request.use_template, cache=request.use_cache):
+            execute = query_template_service.execute_sql if request.use_template else DatabaseService.execute_query
+            if request.use_cache:
+                # Cache misses still run in template mode when both are requested
+                execute = partial(query_cache.execute, execute=execute)
+            result = await _run_cancellable(
+                http_request, request_id,
+                execute, request.database_url, request.sql,
+                request_id=request_id, result_encoding=request.result_encoding,
+                truncate_cells=request.truncate_cells
+            )
+        
+        if request.fast_response:
+            with span("serialize"):
+                return FastJSONResponse(execute_response_content(result))
+        return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/execute-batch", response_model=BatchExecuteResponse)
+async def execute_batch(request: BatchExecuteRequest):
+    """Execute many statements over pooled connections, optionally in one snapshot"""
+    if not request.statements:
+        raise HTTPException(status_code=400, detail="No statements provided")
+    if len(request.statements) > config.BATCH_MAX_STATEMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.BATCH_MAX_STATEMENTS} statements per batch"
+        )
+    
+    return await run_in_threadpool(
+        DatabaseService.execute_batch,
+        request.database_url, request.statements, request.consistent,
+        request.max_concurrency, request.result_encoding
+    )
+
+@router.post("/execute-fanout")
+async def execute_fanout(request: FanoutRequest):
+    """Run one statement against many tenant databases, streaming tagged results as NDJSON"""
+    if not request.tenants:
+        raise HTTPException(status_code=400, detail="No tenants provided")
+    if len(request.tenants) > config.FANOUT_MAX_TARGETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.FANOUT_MAX_TARGETS} tenants per fan-out"
+        )
+    
+    stop = threading.Event()
+    results = DatabaseService.execute_fanout(
+        request.tenants, request.sql, request.max_concurrency,
+        request.result_encoding, request.truncate_cells, stop=stop
+    )
+    
+    def stream():
+        # Each tenant's rows are written out as they arrive, so they don't stay charged to the request
+        release_per_fetch()
+        start_time = time.time()
+        failed = 0
+        # One line per row, then a status line per tenant, in completion order
+        for tenant, result in results:
+            for row in result.data:
+                yield dumps({"type": "row", "tenant": tenant, "data": row}) + b"\n"
+            summary = execute_response_content(result)
+            del summary["data"]
+            failed += not result.success
+            yield dumps({"type": "result", "tenant": tenant, **summary}) + b"\n"
+        yield dumps({
+            "type": "done",
+            "tenants": len(request.tenants),
+            "failed": failed,
+            "total_time": time.time() - start_time
+        }) + b"\n"
+    
+    def cancel_outstanding():
+        stop.set()
+        while True:
+            try:
+                results.close()
+                return
+            except ValueError:
+                # A worker thread is inside next(); it sees `stop` within a poll interval
+                time.sleep(0.01)
+    
+    async def stream_until_disconnect():
+        try:
+            async for line in iterate_in_threadpool(stream()):
+                yield line
+        finally:
+            # Starlette cancels the response on disconnect without closing the generator
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(cancel_outstanding)
+    
+    return StreamingResponse(stream_until_disconnect(), media_type="application/x-ndjson")
+
+@router.post("/templates", response_model=TemplateResponse)
+async def create_template(request: TemplateRequest):
+    """Extract literals from SQL into a reusable parameterized template"""
+    template, parameters = query_template_service.register(request.sql)
+    return TemplateResponse(
+        template_id=template.template_id,
+        template=template.sql,
+        parameter_count=template.parameter_count,
+        parameters=parameters
+    )
+
+@router.post("/templates/{template_id}/execute", response_model=ExecuteResponse)
+async def execute_template(template_id: str, request: TemplateExecuteRequest, http_request: Request):
+    """Execute a template with new parameter values through the prepared statement cache"""
+    template = query_template_service.get(template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    request_id = uuid.uuid4().hex
+    return await _run_cancellable(
+        http_request, request_id,
+        query_template_service.execute, request.database_url, template,
+        request.parameters, request.result_encoding, request_id=request_id
+    )
+
+@router.post("/queries/{request_id}/cancel")
+async def cancel_query(request_id: str):
+    """Cancel a running statement by the request id it was started with"""
+    cancelled = await run_in_threadpool(query_registry.cancel, request_id)
+    return {"success": True, "was_running": cancelled}
+
+@router.get("/queries")
+async def list_queries():
+    """List statements currently running on Postgres"""
+    return {"queries": query_registry.in_flight()}
+
+@router.post("/result-sets", response_model=ResultSetResponse)
+async def create_result_set(request: ResultSetRequest):
+    """Execute a query once and hold its result server-side for paging"""
+    return await run_in_threadpool(
+        result_set_service.create, request.database_url, request.sql, request.user_id
+    )
+
+@router.get("/result-sets/{result_set_id}", response_model=ResultPageResponse)
+async def fetch_result_page(
+    result_set_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    sort_by: Optional[str] = None,
+    descending: bool = False
+):
+    """Fetch a page of rows from a held result set"""
+    try:
+        page = await run_in_threadpool(
+            result_set_service.fetch_page, result_set_id, offset, limit, sort_by, descending
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result set not found or expired")
+    return page
+
+@router.delete("/result-sets/{result_set_id}")
+async def close_result_set(result_set_id: str):
+    """Release a held result set"""
+    if not result_set_service.close(result_set_id):
+        raise HTTPException(status_code=404, detail="Result set not found or expired")
+    return {"success": True}
+
+@router.post("/jobs", response_model=JobResponse)
+async def submit_job(request: JobRequest):
+    """Submit a long-running query as a background job"""
+    return await run_in_threadpool(job_service.submit, request.database_url, request.sql)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Poll job status and progress"""
+    job = await run_in_threadpool(job_service.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Download the ExecuteResponse of a finished job"""
+    path = await run_in_threadpool(job_service.result_path, job_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Job result not available")
+    return FileResponse(path, media_type="application/json", filename=f"{job_id}.json")
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = await run_in_threadpool(job_service.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints need X-Admin-Token and do not exist while ADMIN_TOKEN is unset"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/debug/traces", dependencies=[Depends(require_admin)])
+async def list_traces():
+    """Recently traced requests, newest first"""
+    return {
+        "traces": [
+            {
+                "trace_id": trace.trace_id,
+                "name": trace.name,
+                "start_time": trace.root.start_ns / 1e9 if trace.root else None,
+                "duration_ms": round(trace.root.duration_ms, 3) if trace.root else None,
+                "spans": len(trace.spans)
+            }
+            for trace in trace_buffer.list()
+        ]
+    }
+
+@router.get("/debug/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str, format: str = Query("waterfall", pattern="^(waterfall|otlp)$")):
+    """One traced request as a timing waterfall or as OTLP JSON"""
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_otlp() if format == "otlp" else trace.waterfall()
+
+@router.post("/debug/traces/export", dependencies=[Depends(require_admin)])
+async def export_traces():
+    """Append buffered traces not exported yet to TRACE_EXPORT_PATH as OTLP JSON lines"""
+    try:
+        exported = await run_in_threadpool(trace_buffer.export)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Trace export failed: {e}")
+    return {"exported": exported, "path": config.TRACE_EXPORT_PATH}
+
+@router.get("/debug/loop-stalls", dependencies=[Depends(require_admin)])
+async def list_loop_stalls():
+    """Recent event loop stalls with the stack that was blocking the loop"""
+    return {
+        "interval": loop_monitor.interval,
+        "threshold": loop_monitor.threshold,
+        "stalls": [stall.to_dict() for stall in loop_monitor.stalls()]
+    }
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def arm_profiler(request: ProfileRequest):
+    """Profile the next N requests (optionally only under a path prefix)"""
+    if request.requests < 1 or request.requests > config.PROFILE_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"requests must be between 1 and {config.PROFILE_MAX_REQUESTS}"
+        )
+    profiler.arm(request.mode.value, request.requests, request.path_prefix)
+    return {"armed": profiler.armed, "mode": request.mode, "path_prefix": request.path_prefix}
+
+@router.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def disarm_profiler():
+    """Stop profiling requests that have not started yet"""
+    profiler.disarm()
+    return {"armed": 0}
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recently profiled requests, newest first"""
+    return {"armed": profiler.armed, "profiles": [result.summary() for result in profiler.list()]}
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = Query("top", pattern="^(top|collapsed)$")):
+    """A profiled request's top functions by cumulative time, or its collapsed stacks for flamegraphs"""
+    result = profiler.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(result.collapsed())
+    return {**result.summary(), "top": result.top}
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -118,7 +470,9 @@ async def health_check():
         "status": "healthy",
         "openai_configured": bool(config.OPENAI_API_KEY),
         "max_query_timeout": config.MAX_QUERY_TIMEOUT,
-        "max_result_rows": config.MAX_RESULT_ROWS
+        "max_result_rows": config.MAX_RESULT_ROWS,
+        "query_cache": query_cache.stats(),
+        "replicas": replica_router.status()
     }
 
 @router.get("/suggested-questions")
@@ -142,8 +496,7 @@ async def get_suggested_questions(database_url: str = None):
             }
         
         # Get database schema for specific suggestions
-        db_service = DatabaseService()
-        schema_response = db_service.get_schema_info(database_url)
+        schema_response = await run_in_threadpool(DatabaseService.get_cached_schema_info, database_url)
         
         # Convert to format expected by LLM service
         schema_dict = {}
@@ -154,9 +507,13 @@ async def get_suggested_questions(database_url: str = None):
         llm_service = LLMService()
         suggestions = await llm_service.generate_suggested_questions(schema_dict)
         
+        # Generate and validate SQL for each suggestion before the user clicks one
+        fingerprint = suggestion_prefetcher.schedule(database_url, schema_response, suggestions)
+        
         return {
             "success": True,
-            "suggestions": suggestions
+            "suggestions": suggestions,
+            "schema_fingerprint": fingerprint
         }
         
     except Exception as e:
@@ -0,0 +1,63 @@
+"""
+Fast JSON responses
+Encode large row payloads directly, skipping per-row model validation
+"""
+
+import json
+from decimal import Decimal
+from typing import Any, Dict
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_jsonable_python
+
+from app.models.schemas import ExecuteResponse
+from app.services.result_store import json_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Match what the validated response path emits, e.g. Decimal as a string
+    if isinstance(value, Decimal):
+        return str(value)
+    try:
+        return to_jsonable_python(value)
+    except Exception:
+        return json_default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact JSON with orjson when available, falling back to the stdlib encoder"""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with dumps() instead of the stdlib encoder defaults"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def execute_response_content(response: ExecuteResponse) -> Dict[str, Any]:
+    """Validate the metadata fields of an ExecuteResponse and attach its rows untouched"""
+    metadata = ExecuteResponse.model_validate(response.model_dump(exclude={"data"}))
+    fields = metadata.model_dump(mode="json")
+    return {
+        name: response.data if name == "data" else fields[name]
+        for name in ExecuteResponse.model_fields
+    }
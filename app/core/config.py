@@ -5,10 +5,118 @@ load_dotenv()
 
 class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+    # Point at any OpenAI-compatible server, e.g. scripts/llm_stub_server.py for offline load tests
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
     DATABASE_URL = os.getenv("DATABASE_URL", "")
     MAX_QUERY_TIMEOUT = int(os.getenv("MAX_QUERY_TIMEOUT", "30"))
     MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "1000"))
     
+    # Result size budgets
+    RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", str(64 * 1024 * 1024)))
+    WORKER_RESULT_MAX_BYTES = int(os.getenv("WORKER_RESULT_MAX_BYTES", str(256 * 1024 * 1024)))
+    RESULT_MAX_CELL_BYTES = int(os.getenv("RESULT_MAX_CELL_BYTES", str(64 * 1024)))
+    RESULT_FETCH_BATCH = int(os.getenv("RESULT_FETCH_BATCH", "500"))
+    
+    # Generated SQL validation and repair
+    SQL_VALIDATION_TIMEOUT = float(os.getenv("SQL_VALIDATION_TIMEOUT", "5"))
+    SQL_REPAIR_MAX_ATTEMPTS = int(os.getenv("SQL_REPAIR_MAX_ATTEMPTS", "3"))
+    SQL_REPAIR_TIME_BUDGET = float(os.getenv("SQL_REPAIR_TIME_BUDGET", "15"))
+    
+    # Speculative preview during SQL generation
+    PREVIEW_MAX_ROWS = int(os.getenv("PREVIEW_MAX_ROWS", "20"))
+    PREVIEW_TIMEOUT = float(os.getenv("PREVIEW_TIMEOUT", "2"))
+    
+    # Schema introspection cache and suggested question prefetch
+    SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "60"))
+    SUGGESTION_CACHE_SIZE = int(os.getenv("SUGGESTION_CACHE_SIZE", "500"))
+    SUGGESTION_CACHE_TTL = int(os.getenv("SUGGESTION_CACHE_TTL", "3600"))
+    SUGGESTION_PREFETCH_WORKERS = int(os.getenv("SUGGESTION_PREFETCH_WORKERS", "2"))
+    SUGGESTION_PREFETCH_PREVIEW = os.getenv("SUGGESTION_PREFETCH_PREVIEW", "true").lower() == "true"
+    SUGGESTION_PREVIEW_TTL = int(os.getenv("SUGGESTION_PREVIEW_TTL", "300"))
+    
+    # Read replica routing; DSN_GROUPS is JSON: {"name": {"primary": dsn, "replicas": [dsn, ...], "max_lag": s}}
+    # Parsed by the replica router, which reports a malformed value when the app starts
+    DSN_GROUPS = os.getenv("DSN_GROUPS", "{}")
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "10"))
+    REPLICA_PROBE_INTERVAL = float(os.getenv("REPLICA_PROBE_INTERVAL", "5"))
+    REPLICA_PROBE_TIMEOUT = int(os.getenv("REPLICA_PROBE_TIMEOUT", "3"))
+    
+    # Connection pools
+    POOL_MAX_SIZE = int(os.getenv("POOL_MAX_SIZE", "10"))
+    POOL_ACQUIRE_TIMEOUT = float(os.getenv("POOL_ACQUIRE_TIMEOUT", "30"))
+    POOL_MAX_IDLE_TIME = int(os.getenv("POOL_MAX_IDLE_TIME", "300"))
+    
+    # Prepared query templates
+    PREPARED_CACHE_SIZE = int(os.getenv("PREPARED_CACHE_SIZE", "100"))
+    TEMPLATE_REGISTRY_SIZE = int(os.getenv("TEMPLATE_REGISTRY_SIZE", "1000"))
+    
+    # Batch execution
+    BATCH_MAX_STATEMENTS = int(os.getenv("BATCH_MAX_STATEMENTS", "100"))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    
+    # Multi-tenant fan-out
+    FANOUT_MAX_TARGETS = int(os.getenv("FANOUT_MAX_TARGETS", "500"))
+    FANOUT_MAX_CONCURRENCY = int(os.getenv("FANOUT_MAX_CONCURRENCY", "16"))
+    
+    # Server-held result sets
+    RESULT_SET_DIR = os.getenv("RESULT_SET_DIR", "")
+    RESULT_SET_TTL = int(os.getenv("RESULT_SET_TTL", "600"))
+    # Seconds between background sweeps that drop expired result sets and their files
+    RESULT_SET_SWEEP_INTERVAL = float(os.getenv("RESULT_SET_SWEEP_INTERVAL", "60"))
+    RESULT_SET_MAX_ROWS = int(os.getenv("RESULT_SET_MAX_ROWS", "1000000"))
+    RESULT_SET_MAX_PER_USER = int(os.getenv("RESULT_SET_MAX_PER_USER", "5"))
+    RESULT_SET_MAX_TOTAL = int(os.getenv("RESULT_SET_MAX_TOTAL", "100"))
+    RESULT_SET_FETCH_BATCH = int(os.getenv("RESULT_SET_FETCH_BATCH", "5000"))
+    
+    # Asynchronous query jobs
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "")
+    JOB_RESULT_DIR = os.getenv("JOB_RESULT_DIR", "")
+    JOB_WORKERS_PER_DSN = int(os.getenv("JOB_WORKERS_PER_DSN", "2"))
+    # Worker pools kept for distinct DSNs; idle ones beyond this are shut down
+    JOB_MAX_EXECUTORS = int(os.getenv("JOB_MAX_EXECUTORS", "16"))
+    JOB_QUERY_TIMEOUT = int(os.getenv("JOB_QUERY_TIMEOUT", "3600"))
+    JOB_MAX_RESULT_ROWS = int(os.getenv("JOB_MAX_RESULT_ROWS", "100000"))
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "86400"))
+    
+    # Query result cache
+    QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    QUERY_CACHE_MAX_AGE = int(os.getenv("QUERY_CACHE_MAX_AGE", "300"))
+    
+    # Request tracing
+    TRACE_ALL_REQUESTS = os.getenv("TRACE_ALL_REQUESTS", "false").lower() == "true"
+    TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.otlp.jsonl")
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "nl2sql")
+    
+    # Admin-only profiling; the admin endpoints are disabled while ADMIN_TOKEN is unset
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+    PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "30"))
+    
+    # Event loop monitoring
+    LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05"))
+    LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))
+    LOOP_STALL_BUFFER_SIZE = int(os.getenv("LOOP_STALL_BUFFER_SIZE", "50"))
+    
+    # Production server (scripts/run.py --production)
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    # Result sets, templates and the cancel registry are per process; 0 runs one worker per usable CPU
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+    SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+    # Longer than a load balancer's idle timeout, so it never reuses a connection the server just closed
+    SERVER_KEEPALIVE_TIMEOUT = int(os.getenv("SERVER_KEEPALIVE_TIMEOUT", "75"))
+    # On SIGTERM, in-flight requests get this long to finish before they are cancelled
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+    
+    # Warm-up before the server accepts traffic
+    WARMUP_DATABASE_URLS = [url for url in os.getenv("WARMUP_DATABASE_URLS", DATABASE_URL).split(",") if url]
+    WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "2"))
+    
     @classmethod
     def validate(cls):
         if not cls.OPENAI_API_KEY:
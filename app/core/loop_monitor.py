@@ -0,0 +1,163 @@
+"""
+Event loop monitoring
+Measures event loop scheduling lag and captures the stack of whatever blocks the loop past a threshold
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import config
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS
+
+
+def _thread_stack(thread_id: int) -> List[str]:
+    frame = sys._current_frames().get(thread_id)
+    return traceback.format_stack(frame) if frame is not None else []
+
+
+@dataclass
+class LoopStall:
+    started_at: float
+    stack: List[str]
+    # Filled in once the loop runs again; None while it is still blocked
+    duration: Optional[float] = None
+    callback: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "callback": self.callback,
+            "stack": self.stack
+        }
+
+
+class LoopMonitor:
+    """Heartbeat task on the serving loop plus a watchdog thread that snapshots the loop thread when it stalls"""
+
+    def __init__(self, interval: Optional[float] = None, threshold: Optional[float] = None,
+                 buffer_size: Optional[int] = None):
+        self.interval = interval or config.LOOP_MONITOR_INTERVAL
+        self.threshold = threshold or config.LOOP_BLOCK_THRESHOLD
+        self._stalls: "deque[LoopStall]" = deque(maxlen=buffer_size or config.LOOP_STALL_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._beat = 0.0
+        self._open_stall: Optional[LoopStall] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Begin monitoring the running loop; call from inside it"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def stalls(self) -> List[LoopStall]:
+        with self._lock:
+            return list(reversed(self._stalls))
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            # How late the loop got round to waking us is how long any callback had to wait
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            with self._lock:
+                self._beat = now
+                if self._open_stall is not None:
+                    self._open_stall.duration = lag
+                    self._open_stall = None
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 2):
+            with self._lock:
+                overdue = time.monotonic() - self._beat - self.interval
+                if overdue <= self.threshold or self._open_stall is not None:
+                    continue
+                # Snapshot while the loop is still blocked, so the stack shows the culprit
+                stall = LoopStall(started_at=time.time() - overdue, stack=_thread_stack(self._loop_thread_id))
+                self._open_stall = stall
+                self._stalls.append(stall)
+            EVENT_LOOP_STALLS.inc()
+            print(f"Event loop blocked for over {self.threshold * 1000:.0f}ms:\n{''.join(stall.stack)}")
+
+
+loop_monitor = LoopMonitor()
+
+
+@contextmanager
+def detect_blocking_callbacks(threshold: float):
+    """Time every asyncio callback on every loop and collect stalls of those that ran past threshold
+
+    Wraps asyncio's Handle._run, so it covers loops created by test clients but not uvloop,
+    and adds per-callback overhead: meant for test suites, not production.
+    """
+    original = asyncio.events.Handle._run
+    running: Dict[int, list] = {}
+    stalls: List[LoopStall] = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def timed_run(handle):
+        thread_id = threading.get_ident()
+        # [start, stall captured by the watchdog]
+        entry = [time.monotonic(), None]
+        with lock:
+            running[thread_id] = entry
+        try:
+            return original(handle)
+        finally:
+            elapsed = time.monotonic() - entry[0]
+            with lock:
+                running.pop(thread_id, None)
+            if elapsed > threshold:
+                stall = entry[1] or LoopStall(started_at=time.time() - elapsed, stack=[])
+                stall.duration = elapsed
+                stall.callback = repr(handle)
+                with lock:
+                    stalls.append(stall)
+
+    def watch():
+        while not stop.wait(threshold / 4):
+            with lock:
+                now = time.monotonic()
+                overdue = [(tid, e) for tid, e in running.items() if e[1] is None and now - e[0] > threshold]
+            for thread_id, entry in overdue:
+                entry[1] = LoopStall(started_at=time.time() - (now - entry[0]), stack=_thread_stack(thread_id))
+
+    watchdog = threading.Thread(target=watch, name="callback-watchdog", daemon=True)
+    asyncio.events.Handle._run = timed_run
+    watchdog.start()
+    try:
+        yield stalls
+    finally:
+        asyncio.events.Handle._run = original
+        stop.set()
+        watchdog.join()
@@ -0,0 +1,238 @@
+"""
+Metrics
+Counters and histograms with per-thread shards, rendered in the Prometheus text format
+Values live in this process only: production runs one worker by default (scripts/run.py), and with several
+instances each one's /metrics is scraped separately
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans fast local work up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Sharded:
+    """Per-thread value arrays: each thread writes only its own shard, so recording takes no lock"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        # Shards of finished threads are folded in here so short-lived threads do not accumulate
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    for index, value in enumerate(shard):
+                        self._retired[index] += value
+            self._shards = live
+            totals = list(self._retired)
+        for _, shard in live:
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class Counter:
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount: float = 1.0):
+        self._values.shard()[0] += amount
+
+    def value(self) -> float:
+        return self._values.totals()[0]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf, then the running sum
+        self._values = _Sharded(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        shard = self._values.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """Cumulative bucket counts (the last one being +Inf) and the sum"""
+        totals = self._values.totals()
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class _Family:
+    """A named metric with optional labels; children are created once per label combination"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        key = values or tuple(kwargs[name] for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [(name, str(value)) for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        raise NotImplementedError
+
+
+class CounterFamily(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return Counter()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format(child.value())}"]
+
+
+class HistogramFamily(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, key, child) -> List[str]:
+        cumulative, total = child.snapshot()
+        lines = []
+        for bound, count in zip(self.buckets + (float("inf"),), cumulative):
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {_format(count)}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {_format(cumulative[-1])}")
+        return lines
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def register(self, family: _Family) -> _Family:
+        with self._lock:
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CounterFamily:
+        return self.register(CounterFamily(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> HistogramFamily:
+        return self.register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONNECTION_ACQUIRE_SECONDS = registry.histogram(
+    "nl2sql_connection_acquire_seconds", "Time to open or check out a database connection", ["source"]
+)
+SCHEMA_INTROSPECTION_SECONDS = registry.histogram(
+    "nl2sql_schema_introspection_seconds", "Time to introspect a database schema"
+)
+QUERY_EXECUTION_SECONDS = registry.histogram(
+    "nl2sql_query_execution_seconds", "Time to run a statement and fetch its rows", ["outcome"]
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "nl2sql_llm_call_seconds", "Latency of LLM chat completion calls", ["agent", "purpose", "outcome"]
+)
+LLM_TOKENS = registry.counter(
+    "nl2sql_llm_tokens_total", "Tokens used by LLM calls", ["agent", "purpose", "kind"]
+)
+AGENT_PROCESS_SECONDS = registry.histogram(
+    "nl2sql_agent_process_seconds", "Time spent in each agent's process step", ["agent"]
+)
+CACHE_REQUESTS = registry.counter(
+    "nl2sql_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+EVENT_LOOP_LAG_SECONDS = registry.histogram(
+    "nl2sql_event_loop_lag_seconds", "How late the event loop ran the monitor's heartbeat",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_STALLS = registry.counter(
+    "nl2sql_event_loop_stalls_total", "Times the event loop stayed blocked past LOOP_BLOCK_THRESHOLD"
+)
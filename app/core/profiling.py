@@ -0,0 +1,311 @@
+"""
+On-demand request profiling
+Admin-armed cProfile or stack-sampling sessions around live requests, reported as collapsed stacks and top functions
+"""
+
+import cProfile
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import config
+
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+MODES = ("cprofile", "sample")
+# Leaf functions of threads that are parked rather than doing work
+_IDLE_LEAVES = {"wait", "select", "poll", "epoll", "_worker", "get", "acquire", "accept", "run_forever"}
+# Bounds the caller-graph walk used to build collapsed stacks from cProfile data
+_MAX_COLLAPSED_STACKS = 5000
+_MAX_WALK_NODES = 50000
+_MAX_STACK_DEPTH = 64
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Constant-time check of an admin token; always false while ADMIN_TOKEN is unset"""
+    return bool(config.ADMIN_TOKEN) and token is not None and secrets.compare_digest(token, config.ADMIN_TOKEN)
+
+
+@dataclass
+class ProfileResult:
+    profile_id: str
+    mode: str
+    method: str
+    path: str
+    started_at: float
+    duration: float = 0.0
+    samples: int = 0
+    # Collapsed stack "root;...;leaf" -> weight (samples, or microseconds for cProfile)
+    stacks: Dict[str, int] = field(default_factory=dict)
+    top: List[Dict[str, object]] = field(default_factory=list)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as read by flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {weight}\n" for stack, weight in sorted(self.stacks.items()))
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "profile_id": self.profile_id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "samples": self.samples
+        }
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of every busy thread at a fixed interval from a background thread"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or config.PROFILE_SAMPLE_INTERVAL
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not stack or stack[0].co_name in _IDLE_LEAVES:
+                    continue
+                self.stacks[";".join(_frame_label(code) for code in reversed(stack))] += 1
+
+    def top(self, limit: int) -> List[Dict[str, object]]:
+        """Functions by inclusive sample count: every sample with the function anywhere on its stack"""
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            for label in set(frames):
+                inclusive[label] += count
+            own[frames[-1]] += count
+        return [
+            {
+                "function": label,
+                "cumulative_time": round(count * self.interval, 6),
+                "self_time": round(own[label] * self.interval, 6),
+                "samples": count
+            }
+            for label, count in inclusive.most_common(limit)
+        ]
+
+
+def _cprofile_report(profile: cProfile.Profile, limit: int) -> Tuple[Dict[str, int], List[Dict[str, object]]]:
+    stats = pstats.Stats(profile).stats
+
+    def label(func) -> str:
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    top = [
+        {
+            "function": label(func),
+            "cumulative_time": round(cumtime, 6),
+            "self_time": round(tottime, 6),
+            "calls": calls
+        }
+        for func, (_, calls, tottime, cumtime, _) in sorted(
+            stats.items(), key=lambda item: item[1][3], reverse=True
+        )[:limit]
+    ]
+
+    # cProfile keeps caller->callee edges, not whole stacks, so stacks are rebuilt from the roots
+    # down, splitting each callee's time by how much of it each caller accounted for
+    callees: Dict[tuple, List[Tuple[tuple, float]]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_cumtime) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_cumtime))
+
+    stacks: Dict[str, int] = {}
+    visited = 0
+
+    def walk(func, path: List[str], on_path: set, budget: float):
+        nonlocal visited
+        visited += 1
+        if len(stacks) >= _MAX_COLLAPSED_STACKS or visited > _MAX_WALK_NODES:
+            return
+        path = path + [label(func)]
+        cumtime = stats[func][3] or 1e-12
+        scale = min(1.0, budget / cumtime)
+        children = [(child, t * scale) for child, t in callees.get(func, []) if child not in on_path]
+        if len(path) < _MAX_STACK_DEPTH:
+            for child, child_budget in children:
+                walk(child, path, on_path | {child}, child_budget)
+        self_time = budget - sum(t for _, t in children) if len(path) < _MAX_STACK_DEPTH else budget
+        micros = int(self_time * 1e6)
+        if micros > 0:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0) + micros
+
+    for func, (_, _, _, cumtime, callers) in stats.items():
+        if not callers:
+            walk(func, [], {func}, cumtime)
+    return stacks, top
+
+
+class Profiler:
+    """Arms profiling for upcoming requests and keeps recent results; idle cost is one attribute read"""
+
+    def __init__(self, buffer_size: Optional[int] = None):
+        self.armed = 0
+        self._mode = "sample"
+        self._path_prefix = ""
+        self._cprofile_active = False
+        self._lock = threading.Lock()
+        self._results: "deque[ProfileResult]" = deque(maxlen=buffer_size or config.PROFILE_BUFFER_SIZE)
+
+    def arm(self, mode: str, requests: int, path_prefix: str = ""):
+        """Profile the next `requests` requests whose path starts with path_prefix"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        with self._lock:
+            self._mode = mode
+            self.armed = max(0, min(requests, config.PROFILE_MAX_REQUESTS))
+            self._path_prefix = path_prefix
+
+    def disarm(self):
+        with self._lock:
+            self.armed = 0
+
+    def claim(self, path: str, requested_mode: Optional[str] = None) -> Optional[str]:
+        """Mode to profile this request with, or None; a marked request passes requested_mode"""
+        with self._lock:
+            if requested_mode is None:
+                if self.armed <= 0 or not path.startswith(self._path_prefix):
+                    return None
+                self.armed -= 1
+                requested_mode = self._mode
+            # cProfile hooks the event loop thread, so only one session can run at a time
+            if requested_mode == "cprofile":
+                if self._cprofile_active:
+                    return "sample"
+                self._cprofile_active = True
+            return requested_mode
+
+    def start(self, mode: str, method: str, path: str):
+        result = ProfileResult(
+            profile_id=secrets.token_hex(8), mode=mode, method=method, path=path, started_at=time.time()
+        )
+        try:
+            if mode == "cprofile":
+                session = cProfile.Profile()
+                session.enable()
+            else:
+                session = StackSampler()
+                session.start()
+        except BaseException:
+            # claim() reserved the cProfile slot for this request; give it back
+            if mode == "cprofile":
+                with self._lock:
+                    self._cprofile_active = False
+            raise
+        return result, session
+
+    def stop(self, result: ProfileResult, session, start: float):
+        """End the measurement; cProfile must be disabled on the thread that enabled it"""
+        result.duration = time.perf_counter() - start
+        if isinstance(session, cProfile.Profile):
+            session.disable()
+            with self._lock:
+                self._cprofile_active = False
+
+    def finish(self, result: ProfileResult, session):
+        """Build the report and keep it; joins the sampler thread, so run it off the event loop"""
+        if isinstance(session, cProfile.Profile):
+            result.stacks, result.top = _cprofile_report(session, config.PROFILE_TOP_FUNCTIONS)
+        else:
+            session.stop()
+            result.samples = session.samples
+            result.stacks = dict(session.stacks)
+            result.top = session.top(config.PROFILE_TOP_FUNCTIONS)
+        with self._lock:
+            self._results.append(result)
+
+    def get(self, profile_id: str) -> Optional[ProfileResult]:
+        with self._lock:
+            return next((r for r in self._results if r.profile_id == profile_id), None)
+
+    def list(self) -> List[ProfileResult]:
+        with self._lock:
+            return list(reversed(self._results))
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Profiles armed requests, or one sent with X-Profile: cprofile|sample and a valid X-Admin-Token"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/api/admin"):
+            await self.app(scope, receive, send)
+            return
+
+        requested = None
+        if config.ADMIN_TOKEN:
+            headers = dict(scope.get("headers", []))
+            marker = headers.get(PROFILE_HEADER.encode())
+            if marker is not None and is_admin(headers.get(ADMIN_TOKEN_HEADER.encode(), b"").decode("latin-1")):
+                requested = marker.decode("latin-1") if marker.decode("latin-1") in MODES else "sample"
+        if requested is None and not profiler.armed:
+            await self.app(scope, receive, send)
+            return
+
+        mode = profiler.claim(scope["path"], requested)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            result, session = profiler.start(mode, scope["method"], scope["path"])
+        except Exception as e:
+            print(f"Could not start {mode} profiling: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, result.profile_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop(result, session, start)
+            # Reports can take a while to build; the thread finishes them even if this request is cancelled
+            await run_in_threadpool(profiler.finish, result, session)
@@ -0,0 +1,278 @@
+"""
+Request tracing
+Lightweight in-process spans carried in contextvars, kept in a ring buffer and exportable as OTLP JSON
+"""
+
+import contextvars
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import config
+
+TRACE_HEADER = "x-trace"
+TRACE_ID_HEADER = "X-Trace-Id"
+# Server-Timing entries beyond this are dropped to keep response headers small
+_MAX_TIMING_ENTRIES = 50
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9_.\-]")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+@dataclass
+class Trace:
+    name: str
+    trace_id: str = field(default_factory=lambda: secrets.token_hex(16))
+    spans: List[Span] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, span: Span):
+        # Spans may finish on worker threads
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def root(self) -> Optional[Span]:
+        return self.spans[0] if self.spans else None
+
+    def waterfall(self) -> Dict[str, Any]:
+        """Spans ordered by start time with offsets and nesting depth, for reading one request"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        if not spans:
+            return {"trace_id": self.trace_id, "name": self.name, "spans": []}
+
+        origin = spans[0].start_ns
+        depths: Dict[Optional[str], int] = {}
+        rows = []
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1
+            depths[span.span_id] = depth
+            rows.append({
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "depth": depth,
+                "offset_ms": round((span.start_ns - origin) / 1e6, 3),
+                "duration_ms": round(span.duration_ms, 3),
+                "attributes": span.attributes,
+                "error": span.error
+            })
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start_time": origin / 1e9,
+            "duration_ms": rows[0]["duration_ms"],
+            "spans": rows
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one entry per span with its duration and start offset"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)[:_MAX_TIMING_ENTRIES]
+        if not spans:
+            return ""
+        origin = spans[0].start_ns
+        return ", ".join(
+            f'{_TOKEN_UNSAFE.sub("_", span.name)};dur={span.duration_ms:.1f};'
+            f'desc="+{(span.start_ns - origin) / 1e6:.1f}ms"'
+            for span in spans
+        )
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest containing this trace"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", config.TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [
+                        {
+                            "traceId": self.trace_id,
+                            "spanId": span.span_id,
+                            "parentSpanId": span.parent_id or "",
+                            "name": span.name,
+                            "kind": 2 if span.parent_id is None else 1,
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                            "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child of the current span; does nothing when the request is not traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes
+    )
+    trace.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def propagate(func):
+    """Wrap func so it runs in the caller's context (trace and parent span) on another thread"""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # Each call gets its own copy so concurrent workers can enter it at the same time
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+class TraceBuffer:
+    """Most recent finished traces, oldest dropped first"""
+
+    def __init__(self, size: Optional[int] = None):
+        self._traces = deque(maxlen=size or config.TRACE_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        # Traces are numbered as they are added so export can skip the ones already written
+        self._added = 0
+        self._exported = 0
+        self._export_lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+            self._added += 1
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((t for t in self._traces if t.trace_id == trace_id), None)
+
+    def list(self) -> List[Trace]:
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def export(self, path: Optional[str] = None) -> int:
+        """Append buffered traces not exported before to a file as OTLP JSON, one request per line"""
+        path = path or config.TRACE_EXPORT_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._export_lock:
+            with self._lock:
+                added = self._added
+                new = min(added - self._exported, len(self._traces))
+                traces = list(self._traces)[len(self._traces) - new:]
+            with open(path, "a", encoding="utf-8") as f:
+                for trace in traces:
+                    f.write(json.dumps(trace.to_otlp()) + "\n")
+            self._exported = added
+        return len(traces)
+
+
+trace_buffer = TraceBuffer()
+
+
+class TracingMiddleware:
+    """Traces requests that ask for it with ?trace=1 or an X-Trace: 1 header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_trace(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(name=f"{scope['method']} {scope['path']}")
+        trace_token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(TRACE_ID_HEADER, trace.trace_id)
+                headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            with span(trace.name, method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(trace_token)
+            trace_buffer.add(trace)
+
+
+def _wants_trace(scope) -> bool:
+    if config.TRACE_ALL_REQUESTS:
+        return True
+    for name, value in scope.get("headers", []):
+        if name == TRACE_HEADER.encode() and value in (b"1", b"true"):
+            return True
+    query = scope.get("query_string", b"")
+    return b"trace=" in query and parse_qs(query.decode("latin-1")).get("trace", [""])[0] in ("1", "true")
@@ -1,16 +1,57 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 import os
 
 from app.api.endpoints import router
+from app.core.config import config
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import registry
+from app.core.profiling import ProfilingMiddleware
+from app.core.tracing import TracingMiddleware
+from app.services.connection_pool import pool_manager
+from app.services.job_service import job_service
+from app.services.replica_router import replica_router
+from app.services.result_budget import ResultBudgetMiddleware
+from app.services.result_set_service import result_set_service
+from app.services.warmup import warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services"""
+    # Replica health and lag are probed in the background, not per request
+    replica_router.start()
+    # Spill files of earlier processes are removed and idle result sets expire on a timer
+    await run_in_threadpool(result_set_service.start)
+    if config.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    # Runs before the server starts accepting connections
+    summary = await run_in_threadpool(warm_up)
+    print(f"Worker {os.getpid()} warmed up in {summary['seconds']:.2f}s: {summary['databases']}")
+    yield
+    await loop_monitor.stop()
+    replica_router.stop()
+    job_service.shutdown()
+    result_set_service.stop()
+    pool_manager.close_all()
 
 app = FastAPI(
     title="Natural Language SQL Tool",
     description="Convert natural language queries to PostgreSQL",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Requests opt in to tracing with ?trace=1 or an X-Trace: 1 header
+app.add_middleware(TracingMiddleware)
+# Admin-armed or X-Profile-marked requests are profiled; otherwise this is a pass-through
+app.add_middleware(ProfilingMiddleware)
+
+# Fetched rows count against WORKER_RESULT_MAX_BYTES until their response has been sent
+app.add_middleware(ResultBudgetMiddleware)
+
 # Include API routes
 app.include_router(router)
 
@@ -18,6 +59,11 @@ app.include_router(router)
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     """Serve the main web interface"""
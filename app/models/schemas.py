@@ -13,6 +13,15 @@ class QueryType(str, Enum):
     DELETE = "delete"
     UNKNOWN = "unknown"
 
+class ResultEncoding(str, Enum):
+    NATIVE = "native"
+    JSON = "json"
+
+class LimitReason(str, Enum):
+    MAX_ROWS = "max_rows"
+    MAX_BYTES = "max_bytes"
+    WORKER_MAX_BYTES = "worker_max_bytes"
+
 class ConnectionRequest(BaseModel):
     database_url: str
 
@@ -42,6 +51,7 @@ class SchemaResponse(BaseModel):
 class QueryRequest(BaseModel):
     natural_language: str
     database_url: str
+    preview: bool = False
 
 class QueryResponse(BaseModel):
     sql: str
@@ -53,6 +63,12 @@ class QueryResponse(BaseModel):
 class ExecuteRequest(BaseModel):
     sql: str
     database_url: str
+    request_id: Optional[str] = None
+    use_cache: bool = False
+    use_template: bool = False
+    result_encoding: ResultEncoding = ResultEncoding.NATIVE
+    fast_response: bool = False
+    truncate_cells: bool = False
 
 class ExecuteResponse(BaseModel):
     success: bool
@@ -61,4 +77,96 @@ class ExecuteResponse(BaseModel):
     row_count: int = 0
     execution_time: float = 0.0
     error: Optional[str] = None
-    was_limited: bool = False 
\ No newline at end of file
+    was_limited: bool = False 
+    limit_reason: Optional[LimitReason] = None
+    truncated_cells: int = 0
+    cache_hit: bool = False
+    template_id: Optional[str] = None
+
+class TemplateRequest(BaseModel):
+    sql: str
+
+class TemplateResponse(BaseModel):
+    template_id: str
+    template: str
+    parameter_count: int
+    parameters: List[Any] = []
+
+class TemplateExecuteRequest(BaseModel):
+    database_url: str
+    parameters: List[Any] = []
+    result_encoding: ResultEncoding = ResultEncoding.NATIVE
+
+class BatchExecuteRequest(BaseModel):
+    database_url: str
+    statements: List[str]
+    consistent: bool = False
+    max_concurrency: Optional[int] = None
+    result_encoding: ResultEncoding = ResultEncoding.NATIVE
+
+class BatchExecuteResponse(BaseModel):
+    results: List[ExecuteResponse]
+    total_time: float = 0.0
+
+class FanoutRequest(BaseModel):
+    sql: str
+    tenants: Dict[str, str]
+    max_concurrency: Optional[int] = None
+    result_encoding: ResultEncoding = ResultEncoding.NATIVE
+    truncate_cells: bool = False
+
+class ProfileMode(str, Enum):
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+
+class ProfileRequest(BaseModel):
+    mode: ProfileMode = ProfileMode.SAMPLE
+    requests: int = 1
+    path_prefix: str = ""
+
+class ResultSetRequest(BaseModel):
+    sql: str
+    database_url: str
+    user_id: str = "demo_user"
+
+class ResultSetResponse(BaseModel):
+    success: bool
+    result_set_id: Optional[str] = None
+    columns: List[str] = []
+    row_count: int = 0
+    execution_time: float = 0.0
+    error: Optional[str] = None
+    was_limited: bool = False
+    expires_in: int = 0
+
+class ResultPageResponse(BaseModel):
+    result_set_id: str
+    offset: int
+    limit: int
+    data: List[Dict[str, Any]] = []
+    columns: List[str] = []
+    row_count: int = 0
+    total_rows: int = 0
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobRequest(BaseModel):
+    sql: str
+    database_url: str
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    progress: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    elapsed: float = 0.0
+    row_count: int = 0
+    was_limited: bool = False
+    error: Optional[str] = None
@@ -4,14 +4,21 @@ Implements MCP-style agents for intelligent database operations
 """
 
 import asyncio
+import re
+import time
 from typing import List, Dict, Any, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
 import json
 from datetime import datetime
+from functools import partial
 
 from app.services.llm_service import LLMService
 from app.services.database_service import DatabaseService
+from app.services.sql_text import is_read_only, is_single_statement
+from app.core.config import config
+from app.core.metrics import AGENT_PROCESS_SECONDS
+from app.core.tracing import propagate, span
 
 
 class AgentType(Enum):
@@ -52,6 +59,12 @@ class DatabaseAgent:
     async def process(self, context: AgentContext, input_data: Dict[str, Any]) -> List[AgentMessage]:
         """Process input and return agent messages"""
         raise NotImplementedError
+    
+    async def _chat(self, purpose: str, **kwargs):
+        """LLM call on the default executor, so the event loop keeps serving other requests meanwhile"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(propagate(self.llm_service.chat), self.agent_type.value, purpose, **kwargs)
+        )
 
 
 class QueryAgent(DatabaseAgent):
@@ -68,10 +81,7 @@ class QueryAgent(DatabaseAgent):
         # TODO: Properly integrate with existing LLMService
         try:
             # Simple schema text for prompt
-            schema_text = ""
-            for table_name, columns in context.schema_info.items():
-                col_list = [f"{col['name']} ({col['type']})" for col in columns]
-                schema_text += f"Table {table_name}: {', '.join(col_list)}\n"
+            schema_text = self._schema_text(context)
             
             prompt = f"""
             Generate a SQL query for this natural language request:
@@ -84,14 +94,15 @@ class QueryAgent(DatabaseAgent):
             Return only the SQL query.
             """
             
-            response = self.llm_service.client.chat.completions.create(
+            response = await self._chat(
+                "generate_sql",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=500,
                 temperature=0.1
             )
             
-            sql = response.choices[0].message.content.strip()
+            sql = self._strip_code_fences(response.choices[0].message.content)
             
             # Create a simple result object
             sql_result = type('SQLResult', (), {
@@ -106,14 +117,32 @@ class QueryAgent(DatabaseAgent):
                 'explanation': f"Failed to generate SQL for: {natural_query}"
             })()
         
-        # Analyze query complexity
-        complexity_analysis = await self._analyze_query_complexity(sql_result.sql, context)
+        # Catch parse and binding errors here rather than when the user executes the query
+        validation = await self._validate_and_repair(sql_result, natural_query, context)
+        
+        # Start the preview now so it runs while the analysis calls below are in flight
+        preview_future = None
+        if input_data.get("preview") and validation["valid"] and self._is_preview_safe(sql_result.sql):
+            preview_future = asyncio.get_running_loop().run_in_executor(
+                None, propagate(DatabaseService.preview_query), context.database_url, sql_result.sql
+            )
         
-        # Check for potential issues
-        safety_check = await self._check_query_safety(sql_result.sql, context)
+        try:
+            # Analyze query complexity
+            complexity_analysis = await self._analyze_query_complexity(sql_result.sql, context)
+            
+            # Check for potential issues
+            safety_check = await self._check_query_safety(sql_result.sql, context)
+            
+            # Generate insights about the query
+            query_insights = await self._generate_query_insights(sql_result.sql, context)
+        except BaseException:
+            if preview_future is not None:
+                # Drops a preview still queued; one already running ends within PREVIEW_TIMEOUT, unread
+                preview_future.cancel()
+            raise
         
-        # Generate insights about the query
-        query_insights = await self._generate_query_insights(sql_result.sql, context)
+        preview = (await preview_future).model_dump() if preview_future else None
         
         # Create response messages
         messages.append(AgentMessage(
@@ -126,13 +155,105 @@ class QueryAgent(DatabaseAgent):
                 "explanation": sql_result.explanation,
                 "complexity": complexity_analysis,
                 "safety_warnings": safety_check,
-                "insights": query_insights
+                "insights": query_insights,
+                "preview": preview,
+                "validation": validation
             },
             timestamp=datetime.now()
         ))
         
         return messages
     
+    async def _validate_and_repair(self, sql_result, natural_query: str, context: AgentContext) -> Dict[str, Any]:
+        """EXPLAIN the SQL, asking the model to fix it while attempts and time budget remain"""
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        attempts = 1
+        
+        while True:
+            if not is_single_statement(sql_result.sql):
+                error = "Only a single SQL statement is allowed"
+            else:
+                try:
+                    error = await loop.run_in_executor(
+                        None, propagate(DatabaseService.explain_query),
+                        context.database_url, sql_result.sql, config.SQL_VALIDATION_TIMEOUT
+                    )
+                except Exception as e:
+                    # No database to plan against: return the SQL unvalidated rather than failing the request
+                    error = f"Could not validate SQL: {e}"
+                    break
+            
+            remaining = config.SQL_REPAIR_TIME_BUDGET - (time.time() - start_time)
+            if error is None or attempts >= config.SQL_REPAIR_MAX_ATTEMPTS or remaining <= 0:
+                break
+            
+            repaired = await self._repair_sql(sql_result.sql, error, natural_query, context, remaining)
+            if repaired is None:
+                break
+            sql_result.sql = repaired
+            attempts += 1
+        
+        return {
+            "valid": error is None,
+            "attempts": attempts,
+            "validation_time": time.time() - start_time,
+            "error": error
+        }
+    
+    async def _repair_sql(self, sql: str, error: str, natural_query: str,
+                          context: AgentContext, timeout: float) -> Optional[str]:
+        """Ask the model to correct SQL that PostgreSQL rejected"""
+        
+        repair_prompt = f"""
+        This SQL query was generated for the request below, but PostgreSQL rejected it.
+        
+        Request: {natural_query}
+        
+        SQL: {sql}
+        
+        Error: {error}
+        
+        Database Schema:
+        {self._schema_text(context)}
+        
+        Return only the corrected SQL query.
+        """
+        
+        try:
+            response = await self._chat(
+                "repair_sql",
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": repair_prompt}],
+                max_tokens=500,
+                temperature=0.1,
+                timeout=timeout
+            )
+            return self._strip_code_fences(response.choices[0].message.content)
+        except Exception as e:
+            print(f"SQL repair failed: {e}")
+            return None
+    
+    @staticmethod
+    def _schema_text(context: AgentContext) -> str:
+        schema_text = ""
+        for table_name, columns in context.schema_info.items():
+            col_list = [f"{col['name']} ({col['type']})" for col in columns]
+            schema_text += f"Table {table_name}: {', '.join(col_list)}\n"
+        return schema_text
+    
+    @staticmethod
+    def _strip_code_fences(text: str) -> str:
+        """Drop the ```sql fences models often wrap around a bare query"""
+        text = text.strip()
+        match = re.match(r"^```[a-zA-Z]*\s*\n(.*?)\n?```$", text, re.DOTALL)
+        return match.group(1).strip() if match else text
+    
+    @staticmethod
+    def _is_preview_safe(sql: str) -> bool:
+        """Local checks a statement must pass before it is executed speculatively"""
+        return is_read_only(sql) and is_single_statement(sql)
+    
     async def _analyze_query_complexity(self, sql: str, context: AgentContext) -> Dict[str, Any]:
         """Analyze SQL query complexity and performance implications"""
         
@@ -153,7 +274,8 @@ class QueryAgent(DatabaseAgent):
         """
         
         try:
-            response = self.llm_service.client.chat.completions.create(
+            response = await self._chat(
+                "complexity",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": analysis_prompt}],
                 max_tokens=500,
@@ -188,7 +310,8 @@ class QueryAgent(DatabaseAgent):
         """
         
         try:
-            response = self.llm_service.client.chat.completions.create(
+            response = await self._chat(
+                "safety",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": safety_prompt}],
                 max_tokens=300,
@@ -221,7 +344,8 @@ class QueryAgent(DatabaseAgent):
         """
         
         try:
-            response = self.llm_service.client.chat.completions.create(
+            response = await self._chat(
+                "insights",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": insights_prompt}],
                 max_tokens=400,
@@ -328,7 +452,8 @@ class InsightAgent(DatabaseAgent):
         """
         
         try:
-            response = self.llm_service.client.chat.completions.create(
+            response = await self._chat(
+                "suggest_questions",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": suggestion_prompt}],
                 max_tokens=300,
@@ -353,7 +478,8 @@ class AgentOrchestrator:
             # Add more agents as needed
         }
         
-    async def process_user_input(self, context: AgentContext, user_input: str) -> Dict[str, Any]:
+    async def process_user_input(self, context: AgentContext, user_input: str,
+                                 preview: bool = False) -> Dict[str, Any]:
         """Process user input through relevant agents"""
         
         # Determine which agents should handle this input
@@ -365,7 +491,8 @@ class AgentOrchestrator:
             agent = self.agents.get(agent_type)
             if agent:
                 try:
-                    messages = await agent.process(context, {"natural_query": user_input})
+                    with AGENT_PROCESS_SECONDS.labels(agent_type.value).time(), span(f"agent.{agent_type.value}"):
+                        messages = await agent.process(context, {"natural_query": user_input, "preview": preview})
                     all_messages.extend(messages)
                 except Exception as e:
                     # Log error but don't break the flow
@@ -400,7 +527,9 @@ class AgentOrchestrator:
         insight_agent = self.agents.get(AgentType.INSIGHT)
         if insight_agent:
             try:
-                insight_messages = await insight_agent.process(context, {})
+                with AGENT_PROCESS_SECONDS.labels(AgentType.INSIGHT.value).time(), \
+                        span(f"agent.{AgentType.INSIGHT.value}", background=True):
+                    insight_messages = await insight_agent.process(context, {})
                 messages.extend(insight_messages)
             except Exception as e:
                 print(f"Background insight agent failed: {e}")
@@ -415,7 +544,9 @@ class AgentOrchestrator:
                     "sql": message.metadata.get("sql"),
                     "explanation": message.metadata.get("explanation"),
                     "complexity": message.metadata.get("complexity"),
-                    "safety_warnings": message.metadata.get("safety_warnings")
+                    "safety_warnings": message.metadata.get("safety_warnings"),
+                    "preview": message.metadata.get("preview"),
+                    "validation": message.metadata.get("validation")
                 }
         return None
     
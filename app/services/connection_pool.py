@@ -0,0 +1,126 @@
+"""
+Connection pooling
+Bounded per-DSN pools of reusable psycopg2 connections
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from app.core.config import config
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that carries session state which outlives a single checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Server-side prepared statement names by cache key, least recently used first
+        self.prepared_statements = OrderedDict()
+
+
+class ConnectionPool:
+    """Hands out at most max_size connections to one DSN, reusing idle ones"""
+
+    def __init__(self, database_url: str, max_size: Optional[int] = None):
+        self.database_url = database_url
+        self.max_size = max_size or config.POOL_MAX_SIZE
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        timeout = config.POOL_ACQUIRE_TIMEOUT if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeoutError(f"No connection available within {timeout}s")
+
+        conn = None
+        try:
+            conn = self._take()
+            yield conn
+        finally:
+            if conn is not None:
+                self._give_back(conn)
+            self._slots.release()
+
+    def warm(self, count: int) -> int:
+        """Open connections until count are idle, so the first requests skip the connect; returns how many opened"""
+        count = min(count, self.max_size)
+        opened = 0
+        while True:
+            with self._lock:
+                if len(self._idle) >= count:
+                    return opened
+            conn = psycopg2.connect(self.database_url, connection_factory=PooledConnection)
+            with self._lock:
+                self._idle.append((conn, time.time()))
+            opened += 1
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                conn.close()
+
+    def _take(self):
+        now = time.time()
+        with self._lock:
+            while self._idle:
+                conn, idle_since = self._idle.pop()
+                if not conn.closed and now - idle_since < config.POOL_MAX_IDLE_TIME:
+                    return conn
+                conn.close()
+        return psycopg2.connect(self.database_url, connection_factory=PooledConnection)
+
+    def _give_back(self, conn):
+        if conn.closed:
+            return
+        try:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                conn.close()
+                return
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            conn.close()
+            return
+
+        with self._lock:
+            self._idle.append((conn, time.time()))
+
+
+class PoolManager:
+    """One lazily created pool per DSN"""
+
+    def __init__(self):
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, database_url: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(database_url)
+            if pool is None:
+                pool = ConnectionPool(database_url)
+                self._pools[database_url] = pool
+            return pool
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close_all()
+
+
+pool_manager = PoolManager()
@@ -1,14 +1,35 @@
 import psycopg2
 import psycopg2.extras
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import threading
 import time
-from contextlib import contextmanager
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
 
 from app.models.schemas import (
     ColumnInfo, TableInfo, SchemaResponse, 
-    ExecuteResponse, ConnectionResponse, ConnectionStatus
+    ExecuteResponse, ConnectionResponse, ConnectionStatus, BatchExecuteResponse, ResultEncoding,
+    LimitReason
 )
+from app.services.query_registry import query_registry
+from app.services.connection_pool import pool_manager
+from app.services.replica_router import replica_router
+from app.services.typecasters import register_json_typecasters
+from app.services.result_budget import request_reservation, row_size, worker_byte_budget
+from app.services.sql_text import is_read_only, is_single_statement
 from app.core.config import config
+from app.core.metrics import (
+    CACHE_REQUESTS, CONNECTION_ACQUIRE_SECONDS, QUERY_EXECUTION_SECONDS, SCHEMA_INTROSPECTION_SECONDS
+)
+from app.core.tracing import propagate, span
+
+# Schema introspection results by DSN: (fetched_at, SchemaResponse)
+_schema_cache: Dict[str, Tuple[float, SchemaResponse]] = {}
+_schema_cache_lock = threading.Lock()
+
+# Seconds between checks of a fan-out's stop event while waiting for tenants
+FANOUT_STOP_POLL_INTERVAL = 0.25
 
 class DatabaseService:
     
@@ -17,12 +38,36 @@ class DatabaseService:
     def get_connection(database_url: str):
         conn = None
         try:
-            conn = psycopg2.connect(database_url)
+            with CONNECTION_ACQUIRE_SECONDS.labels("direct").time(), span("db.connect", source="direct"):
+                conn = psycopg2.connect(replica_router.primary(database_url))
             yield conn
         finally:
             if conn:
                 conn.close()
     
+    @staticmethod
+    @contextmanager
+    def get_pooled_connection(database_url: str):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            with span("db.connect", source="pool"):
+                conn = stack.enter_context(pool_manager.get(replica_router.primary(database_url)).connection())
+            CONNECTION_ACQUIRE_SECONDS.labels("pool").observe(time.perf_counter() - start)
+            yield conn
+    
+    @staticmethod
+    @contextmanager
+    def _track_request(request_id: Optional[str], database_url: str, conn):
+        # Registered statements can be cancelled by request id or on client disconnect
+        if not request_id:
+            yield
+            return
+        query_registry.register(request_id, database_url, conn)
+        try:
+            yield
+        finally:
+            query_registry.unregister(request_id)
+    
     @staticmethod
     def test_connection(database_url: str) -> ConnectionResponse:
         try:
@@ -41,12 +86,48 @@ class DatabaseService:
                 message=f"Connection failed: {str(e)}"
             )
     
+    @staticmethod
+    def get_cached_schema_info(database_url: str, max_age: Optional[float] = None) -> SchemaResponse:
+        """Schema introspection reused for up to max_age seconds per DSN"""
+        max_age = config.SCHEMA_CACHE_TTL if max_age is None else max_age
+        with _schema_cache_lock:
+            cached = _schema_cache.get(database_url)
+        if cached is not None and time.time() - cached[0] < max_age:
+            CACHE_REQUESTS.labels("schema", "hit").inc()
+            return cached[1]
+        
+        CACHE_REQUESTS.labels("schema", "miss").inc()
+        schema = DatabaseService.get_schema_info(database_url)
+        with _schema_cache_lock:
+            _schema_cache[database_url] = (time.time(), schema)
+        return schema
+    
+    @staticmethod
+    def explain_query(database_url: str, sql: str, timeout_seconds: Optional[float] = None) -> Optional[str]:
+        """Plan a statement without running it, returning the planner error or None if it is valid"""
+        timeout_seconds = timeout_seconds or config.MAX_QUERY_TIMEOUT
+        with span("db.explain"), \
+                replica_router.route(database_url, read_only=True) as dsn, \
+                DatabaseService.get_connection(dsn) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SET TRANSACTION READ ONLY;")
+            cursor.execute(f"SET statement_timeout = {int(timeout_seconds * 1000)};")
+            try:
+                cursor.execute(f"EXPLAIN {sql}")
+                return None
+            except psycopg2.Error as e:
+                return str(e).strip()
+            finally:
+                conn.rollback()
+    
     @staticmethod
     def get_schema_info(database_url: str) -> SchemaResponse:
         tables = []
         relationships = []
         
-        with DatabaseService.get_connection(database_url) as conn:
+        with SCHEMA_INTROSPECTION_SECONDS.time(), span("db.schema"), \
+                replica_router.route(database_url, read_only=True) as dsn, \
+                DatabaseService.get_connection(dsn) as conn:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
             # Get all tables
@@ -164,45 +245,19 @@ class DatabaseService:
         return relationships
     
     @staticmethod
-    def execute_query(database_url: str, sql: str) -> ExecuteResponse:
+    def execute_query(database_url: str, sql: str, max_rows: Optional[int] = None,
+                      timeout_seconds: Optional[int] = None,
+                      request_id: Optional[str] = None,
+                      result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                      truncate_cells: bool = False) -> ExecuteResponse:
         start_time = time.time()
         
         try:
-            with DatabaseService.get_connection(database_url) as conn:
-                cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-                
-                # Set query timeout
-                cursor.execute(f"SET statement_timeout = {config.MAX_QUERY_TIMEOUT * 1000};")
-                
-                cursor.execute(sql)
-                
-                # Get column names
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                
-                # Convert results to list of dictionaries
-                if cursor.description:
-                    rows = cursor.fetchmany(config.MAX_RESULT_ROWS + 1)  # +1 to check if limited
-                    was_limited = len(rows) > config.MAX_RESULT_ROWS
-                    
-                    if was_limited:
-                        rows = rows[:config.MAX_RESULT_ROWS]
-                    
-                    data = [dict(row) for row in rows]
-                    row_count = len(data)
-                else:
-                    data = []
-                    row_count = cursor.rowcount
-                    was_limited = False
-                
-                execution_time = time.time() - start_time
-                
-                return ExecuteResponse(
-                    success=True,
-                    data=data,
-                    columns=columns,
-                    row_count=row_count,
-                    execution_time=execution_time,
-                    was_limited=was_limited
+            with replica_router.route(database_url, read_only=is_read_only(sql)) as dsn, \
+                    DatabaseService.get_connection(dsn) as conn, \
+                    DatabaseService._track_request(request_id, dsn, conn):
+                return DatabaseService._run_statement(
+                    conn, sql, start_time, max_rows, timeout_seconds, result_encoding, truncate_cells
                 )
                 
         except Exception as e:
@@ -211,4 +266,241 @@ class DatabaseService:
                 success=False,
                 execution_time=execution_time,
                 error=str(e)
-            ) 
\ No newline at end of file
+            )
+    
+    @staticmethod
+    def preview_query(database_url: str, sql: str) -> ExecuteResponse:
+        """Run LLM-written SQL nobody asked to execute yet, inside a read-only transaction that is rolled back"""
+        start_time = time.time()
+        if not (is_read_only(sql) and is_single_statement(sql)):
+            return ExecuteResponse(success=False, execution_time=0.0, error="Only read-only statements are previewed")
+
+        try:
+            with span("db.preview"), \
+                    replica_router.route(database_url, read_only=True) as dsn, \
+                    DatabaseService.get_connection(dsn) as conn:
+                try:
+                    conn.cursor().execute("SET TRANSACTION READ ONLY;")
+                    return DatabaseService._run_statement(
+                        conn, sql, start_time, config.PREVIEW_MAX_ROWS, config.PREVIEW_TIMEOUT, ResultEncoding.JSON
+                    )
+                finally:
+                    conn.rollback()
+        except Exception as e:
+            return ExecuteResponse(success=False, execution_time=time.time() - start_time, error=str(e))
+
+    @staticmethod
+    def _run_statement(conn, sql: str, start_time: float, max_rows: Optional[int] = None,
+                       timeout_seconds: Optional[int] = None,
+                       result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                       truncate_cells: bool = False) -> ExecuteResponse:
+        start = time.perf_counter()
+        with span("db.query") as query_span:
+            try:
+                response = DatabaseService._execute_statement(
+                    conn, sql, start_time, max_rows, timeout_seconds, result_encoding, truncate_cells
+                )
+            except Exception:
+                QUERY_EXECUTION_SECONDS.labels("error").observe(time.perf_counter() - start)
+                raise
+            QUERY_EXECUTION_SECONDS.labels("success").observe(time.perf_counter() - start)
+            query_span.set(rows=response.row_count, limited=response.was_limited)
+        return response
+    
+    @staticmethod
+    def _execute_statement(conn, sql: str, start_time: float, max_rows: Optional[int] = None,
+                           timeout_seconds: Optional[int] = None,
+                           result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                           truncate_cells: bool = False) -> ExecuteResponse:
+        max_rows = max_rows or config.MAX_RESULT_ROWS
+        timeout_seconds = timeout_seconds or config.MAX_QUERY_TIMEOUT
+        
+        # Set query timeout
+        conn.cursor().execute(f"SET statement_timeout = {int(timeout_seconds * 1000)};")
+        
+        if is_read_only(sql) and is_single_statement(sql):
+            # Server-side cursor, so only the rows actually kept are transferred
+            cursor = conn.cursor(name=f"eq_{uuid.uuid4().hex}", cursor_factory=psycopg2.extras.DictCursor)
+        else:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        
+        if result_encoding == ResultEncoding.JSON:
+            # Decode values into JSON primitives while fetching instead of during response encoding
+            register_json_typecasters(cursor)
+        
+        cursor.execute(sql)
+        try:
+            # A server-side cursor only knows its columns after the first fetch
+            if cursor.name is not None or cursor.description:
+                data, limit_reason, truncated_cells = DatabaseService._fetch_within_budget(
+                    cursor, max_rows, config.RESULT_MAX_CELL_BYTES if truncate_cells else None
+                )
+                row_count = len(data)
+            else:
+                data, limit_reason, truncated_cells = [], None, 0
+                row_count = cursor.rowcount
+            
+            # Get column names
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        finally:
+            cursor.close()
+        
+        execution_time = time.time() - start_time
+        
+        # Rows come straight from the driver, so skip validating every cell
+        return ExecuteResponse.model_construct(
+            success=True,
+            data=data,
+            columns=columns,
+            row_count=row_count,
+            execution_time=execution_time,
+            was_limited=limit_reason is not None,
+            limit_reason=limit_reason,
+            truncated_cells=truncated_cells
+        )
+    
+    @staticmethod
+    def _fetch_within_budget(cursor, max_rows: int, max_cell_bytes: Optional[int] = None):
+        """Fetch rows in batches until the result runs out or hits the row or byte budget"""
+        data = []
+        limit_reason = None
+        truncated_cells = 0
+        used_bytes = 0
+        reserved_bytes = 0
+        
+        try:
+            while limit_reason is None:
+                # Ask for one row past max_rows to detect that the result was limited
+                batch = cursor.fetchmany(min(config.RESULT_FETCH_BATCH, max_rows + 1 - len(data)))
+                if not batch:
+                    break
+                for row in batch:
+                    if len(data) == max_rows:
+                        limit_reason = LimitReason.MAX_ROWS
+                        break
+                    record = dict(row)
+                    size, truncated = row_size(record, max_cell_bytes)
+                    if used_bytes + size > config.RESULT_MAX_BYTES:
+                        limit_reason = LimitReason.MAX_BYTES
+                        break
+                    if not worker_byte_budget.reserve(size):
+                        limit_reason = LimitReason.WORKER_MAX_BYTES
+                        break
+                    used_bytes += size
+                    reserved_bytes += size
+                    truncated_cells += truncated
+                    data.append(record)
+        finally:
+            # Within a request the rows stay charged until its response is sent; otherwise only while fetching
+            reservation = request_reservation()
+            if reservation is not None:
+                reservation.add(reserved_bytes)
+            else:
+                worker_byte_budget.release(reserved_bytes)
+        
+        return data, limit_reason, truncated_cells
+    
+    @staticmethod
+    def execute_batch(database_url: str, statements: List[str], consistent: bool = False,
+                      max_concurrency: Optional[int] = None,
+                      result_encoding: ResultEncoding = ResultEncoding.NATIVE) -> BatchExecuteResponse:
+        start_time = time.time()
+        
+        if consistent:
+            results = DatabaseService._execute_in_snapshot(database_url, statements, result_encoding)
+        else:
+            workers = min(max_concurrency or config.BATCH_MAX_CONCURRENCY,
+                          config.BATCH_MAX_CONCURRENCY, len(statements)) or 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    propagate(lambda sql: DatabaseService._execute_pooled(database_url, sql, result_encoding)),
+                    statements
+                ))
+        
+        return BatchExecuteResponse(results=results, total_time=time.time() - start_time)
+    
+    @staticmethod
+    def execute_fanout(tenants: Dict[str, str], sql: str, max_concurrency: Optional[int] = None,
+                       result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                       truncate_cells: bool = False,
+                       stop: Optional[threading.Event] = None) -> Iterator[Tuple[str, ExecuteResponse]]:
+        """Run one statement against many tenant databases, yielding (tenant, result) as each finishes"""
+        # Setting `stop` or closing the iterator cancels the tenants that have not finished
+        fanout_id = uuid.uuid4().hex
+        workers = min(max_concurrency or config.FANOUT_MAX_CONCURRENCY,
+                      config.FANOUT_MAX_CONCURRENCY, len(tenants)) or 1
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            executor.submit(
+                propagate(DatabaseService.execute_query), database_url, sql,
+                request_id=f"{fanout_id}:{tenant}", result_encoding=result_encoding,
+                truncate_cells=truncate_cells
+            ): tenant
+            for tenant, database_url in tenants.items()
+        }
+        
+        pending = set(futures)
+        try:
+            while pending and not (stop and stop.is_set()):
+                done, pending = wait(pending, timeout=FANOUT_STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures[future], future.result()
+        finally:
+            # The consumer stopped early: drop queued tenants and cancel running statements
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in pending:
+                if not future.cancelled():
+                    query_registry.cancel(f"{fanout_id}:{futures[future]}")
+    
+    @staticmethod
+    def _execute_pooled(database_url: str, sql: str,
+                        result_encoding: ResultEncoding = ResultEncoding.NATIVE) -> ExecuteResponse:
+        start_time = time.time()
+        try:
+            with DatabaseService.get_pooled_connection(database_url) as conn:
+                return DatabaseService._run_statement(
+                    conn, sql, start_time, result_encoding=result_encoding
+                )
+        except Exception as e:
+            return ExecuteResponse(
+                success=False,
+                execution_time=time.time() - start_time,
+                error=str(e)
+            )
+    
+    @staticmethod
+    def _execute_in_snapshot(database_url: str, statements: List[str],
+                             result_encoding: ResultEncoding = ResultEncoding.NATIVE) -> List[ExecuteResponse]:
+        """Run statements in order inside one read-only REPEATABLE READ transaction"""
+        results = []
+        try:
+            with DatabaseService.get_pooled_connection(database_url) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+                
+                for sql in statements:
+                    start_time = time.time()
+                    # Savepoints keep one failed statement from aborting the rest of the snapshot
+                    cursor.execute("SAVEPOINT batch_statement;")
+                    try:
+                        results.append(DatabaseService._run_statement(
+                            conn, sql, start_time, result_encoding=result_encoding
+                        ))
+                        cursor.execute("RELEASE SAVEPOINT batch_statement;")
+                    except psycopg2.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT batch_statement;")
+                        results.append(ExecuteResponse(
+                            success=False,
+                            execution_time=time.time() - start_time,
+                            error=str(e)
+                        ))
+                
+                conn.rollback()
+        except Exception as e:
+            # Connection-level failure: report it for every statement that did not run
+            results.extend(
+                ExecuteResponse(success=False, error=str(e))
+                for _ in range(len(statements) - len(results))
+            )
+        
+        return results
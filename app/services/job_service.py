@@ -0,0 +1,294 @@
+"""
+Asynchronous query jobs
+Runs long queries on bounded per-DSN worker pools and keeps job state in a local SQLite table
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.models.schemas import JobStatus, JobResponse
+from app.services.database_service import DatabaseService
+from app.services.query_registry import query_registry
+from app.core.config import config
+
+_FINISHED = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+_UNFINISHED = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+
+def _boot_id() -> str:
+    """Identifies the current boot of this host, so PIDs from before a reboot are never trusted"""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobService:
+    """Submits queries as jobs and tracks them until their results are downloaded"""
+
+    def __init__(self, db_path: Optional[str] = None, result_dir: Optional[str] = None):
+        data_dir = os.path.join(os.getcwd(), "data")
+        self.db_path = db_path or config.JOB_DB_PATH or os.path.join(data_dir, "jobs.sqlite3")
+        self.result_dir = result_dir or config.JOB_RESULT_DIR or os.path.join(data_dir, "job_results")
+        # Least recently used first; idle pools beyond JOB_MAX_EXECUTORS are shut down
+        self._executors: "OrderedDict[str, ThreadPoolExecutor]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        # job_id -> (future, DSN) while the job is queued or running in this process
+        self._futures: Dict[str, Tuple[Future, str]] = {}
+        # Jobs are owned by the process that runs them; the token tells a restarted process reusing a PID apart
+        self._owner = (os.getpid(), _boot_id(), uuid.uuid4().hex)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def submit(self, database_url: str, sql: str) -> JobResponse:
+        self._ensure_initialized()
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        # The DSN is only kept in memory so credentials never land in the job table
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, sql, status, progress, created_at, owner_pid, owner_boot, owner_token) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, sql, JobStatus.QUEUED.value, "Waiting for a worker", time.time(), *self._owner)
+            )
+
+        with self._lock:
+            executor = self._executors.get(database_url)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=config.JOB_WORKERS_PER_DSN, thread_name_prefix="nl2sql-job"
+                )
+                self._executors[database_url] = executor
+            self._executors.move_to_end(database_url)
+            self._active[database_url] = self._active.get(database_url, 0) + 1
+            self._evict_idle_executors()
+            self._futures[job_id] = (executor.submit(self._run_job, job_id, database_url, sql), database_url)
+
+        return self.get(job_id)
+
+    def shutdown(self):
+        """Stop every worker pool; jobs still queued are failed as interrupted by the next process"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _evict_idle_executors(self):
+        # Called with the lock held
+        idle = [url for url, count in self._executors.items() if not self._active.get(url)]
+        for url in idle[:max(0, len(self._executors) - config.JOB_MAX_EXECUTORS)]:
+            self._executors.pop(url).shutdown(wait=False)
+            self._active.pop(url, None)
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        self._ensure_initialized()
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] in _UNFINISHED and self._reap_orphans(db, [row]):
+                row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        end = row["finished_at"] or time.time()
+        return JobResponse(
+            job_id=row["job_id"],
+            status=row["status"],
+            progress=row["progress"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            elapsed=end - (row["started_at"] or end),
+            row_count=row["row_count"] or 0,
+            was_limited=bool(row["was_limited"]),
+            error=row["error"]
+        )
+
+    def result_path(self, job_id: str) -> Optional[str]:
+        """Path of the stored ExecuteResponse JSON for a finished job"""
+        job = self.get(job_id)
+        if job is None or job.status != JobStatus.SUCCEEDED:
+            return None
+        path = self._result_file(job_id)
+        return path if os.path.exists(path) else None
+
+    def cancel(self, job_id: str) -> Optional[JobResponse]:
+        job = self.get(job_id)
+        if job is None or job.status.value in _FINISHED:
+            return job
+
+        with self._lock:
+            future, _ = self._futures.get(job_id, (None, None))
+
+        if future is not None and future.cancel():
+            self._job_done(job_id)
+            self._update(job_id, status=JobStatus.CANCELLED.value, progress="Cancelled before start",
+                         finished_at=time.time())
+        else:
+            # Already running; stop the statement on Postgres and let the worker record the outcome
+            self._update(job_id, progress="Cancel requested", cancel_requested=1)
+            query_registry.cancel(job_id)
+
+        return self.get(job_id)
+
+    def _job_done(self, job_id: str):
+        with self._lock:
+            _, database_url = self._futures.pop(job_id, (None, None))
+            if database_url in self._active:
+                self._active[database_url] -= 1
+            if len(self._executors) > config.JOB_MAX_EXECUTORS:
+                self._evict_idle_executors()
+
+    def _run_job(self, job_id: str, database_url: str, sql: str):
+        try:
+            self._update(job_id, status=JobStatus.RUNNING.value, progress="Executing query",
+                         started_at=time.time())
+
+            result = DatabaseService.execute_query(
+                database_url, sql,
+                max_rows=config.JOB_MAX_RESULT_ROWS,
+                timeout_seconds=config.JOB_QUERY_TIMEOUT,
+                request_id=job_id
+            )
+
+            if self._cancel_requested(job_id):
+                self._update(job_id, status=JobStatus.CANCELLED.value, progress="Cancelled",
+                             finished_at=time.time())
+                return
+
+            if not result.success:
+                self._update(job_id, status=JobStatus.FAILED.value, progress="Query failed",
+                             error=result.error, finished_at=time.time())
+                return
+
+            self._update(job_id, progress="Saving results", row_count=result.row_count)
+            path = self._result_file(job_id)
+            with open(path + ".tmp", "w") as f:
+                f.write(result.model_dump_json())
+            os.replace(path + ".tmp", path)
+
+            self._update(job_id, status=JobStatus.SUCCEEDED.value, progress="Done",
+                         was_limited=int(result.was_limited), finished_at=time.time())
+        except Exception as e:
+            self._update(job_id, status=JobStatus.FAILED.value, progress="Job failed",
+                         error=str(e), finished_at=time.time())
+        finally:
+            self._job_done(job_id)
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as db:
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _purge_expired(self):
+        cutoff = time.time() - config.JOB_RESULT_TTL
+        with self._connect() as db:
+            self._reap_orphans(db, db.execute(
+                "SELECT job_id, owner_pid, owner_boot, owner_token FROM jobs WHERE status IN (?, ?)", _UNFINISHED
+            ).fetchall())
+            expired = [row["job_id"] for row in db.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+        for job_id in expired:
+            try:
+                os.remove(self._result_file(job_id))
+            except OSError:
+                pass
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def _result_file(self, job_id: str) -> str:
+        return os.path.join(self.result_dir, f"{job_id}.json")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            os.makedirs(self.result_dir, exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        job_id TEXT PRIMARY KEY,
+                        sql TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        progress TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        started_at REAL,
+                        finished_at REAL,
+                        row_count INTEGER,
+                        was_limited INTEGER DEFAULT 0,
+                        error TEXT,
+                        cancel_requested INTEGER DEFAULT 0,
+                        owner_pid INTEGER,
+                        owner_boot TEXT,
+                        owner_token TEXT
+                    )
+                """)
+                columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+                for column, column_type in (("owner_pid", "INTEGER"), ("owner_boot", "TEXT"), ("owner_token", "TEXT")):
+                    if column not in columns:
+                        db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                # Other processes sharing the table may still be running their jobs; only orphans are failed
+                self._reap_orphans(db, db.execute(
+                    "SELECT job_id, owner_pid, owner_boot, owner_token FROM jobs WHERE status IN (?, ?)", _UNFINISHED
+                ).fetchall())
+            self._initialized = True
+
+    def _owner_alive(self, row) -> bool:
+        pid, boot, token = row["owner_pid"], row["owner_boot"], row["owner_token"]
+        if pid is None or boot != self._owner[1]:
+            return False
+        if pid == self._owner[0]:
+            return token == self._owner[2]
+        return _process_alive(pid)
+
+    def _reap_orphans(self, db, rows: List[sqlite3.Row]) -> int:
+        """Fail unfinished jobs whose owning process is gone; they can never finish"""
+        orphans = [row["job_id"] for row in rows if not self._owner_alive(row)]
+        db.executemany(
+            "UPDATE jobs SET status = ?, progress = ?, error = ?, finished_at = ? "
+            "WHERE job_id = ? AND status IN (?, ?)",
+            [(JobStatus.FAILED.value, "Interrupted", "Server stopped before the job finished", time.time(),
+              job_id, *_UNFINISHED) for job_id in orphans]
+        )
+        return len(orphans)
+
+
+job_service = JobService()
@@ -1,22 +1,57 @@
 import openai
 import re
 import json
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
 from app.models.schemas import QueryResponse, QueryType, SchemaResponse
 from app.core.config import config
+from app.core.metrics import LLM_CALL_SECONDS, LLM_TOKENS
+from app.core.tracing import span
+
+# Clients by (api key, base URL); building one costs tens of ms and each owns an HTTP connection pool
+_clients: Dict[Tuple[str, Optional[str]], openai.OpenAI] = {}
+_clients_lock = threading.Lock()
+
+def _shared_client() -> openai.OpenAI:
+    key = (config.OPENAI_API_KEY, config.OPENAI_BASE_URL or None)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = openai.OpenAI(api_key=key[0], base_url=key[1])
+        return client
 
 class LLMService:
     
     def __init__(self):
         openai.api_key = config.OPENAI_API_KEY
-        self.client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+        self.client = _shared_client()
+    
+    def chat(self, agent: str, purpose: str, **kwargs):
+        """Chat completion call that records latency and token usage per agent and purpose"""
+        start = time.perf_counter()
+        outcome = "error"
+        with span(f"llm.{purpose}", agent=agent, model=kwargs.get("model", "")) as call_span:
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+                outcome = "success"
+            finally:
+                LLM_CALL_SECONDS.labels(agent, purpose, outcome).observe(time.perf_counter() - start)
+            
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.labels(agent, purpose, "prompt").inc(usage.prompt_tokens or 0)
+                LLM_TOKENS.labels(agent, purpose, "completion").inc(usage.completion_tokens or 0)
+                call_span.set(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+        return response
     
     def generate_sql(self, natural_language: str, schema: SchemaResponse) -> QueryResponse:
         try:
             prompt = self._build_prompt(natural_language, schema)
             
-            response = self.client.chat.completions.create(
+            response = self.chat(
+                "llm_service", "generate_sql",
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -266,7 +301,8 @@ RESPONSE FORMAT:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.chat(
+                "llm_service", "suggested_questions",
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=500,
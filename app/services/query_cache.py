@@ -0,0 +1,159 @@
+"""
+Query result cache
+Serves repeated SELECTs from memory while the tables they read are unchanged
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models.schemas import ExecuteResponse, ResultEncoding
+from app.services.database_service import DatabaseService
+from app.services.replica_router import replica_router
+from app.services.sql_text import is_deterministic, is_read_only, normalize_sql, referenced_tables
+from app.core.config import config
+from app.core.metrics import CACHE_REQUESTS
+
+TableCounters = Dict[str, Tuple[int, ...]]
+CacheKey = Tuple[str, str, bool, str]
+
+
+@dataclass
+class CacheEntry:
+    payload: bytes
+    counters: TableCounters
+    stored_at: float
+
+
+class QueryCache:
+    """LRU cache of compressed ExecuteResponse payloads keyed by (DSN, encoding, truncation, normalized SQL)"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or config.QUERY_CACHE_MAX_BYTES
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def execute(self, database_url: str, sql: str, request_id: Optional[str] = None,
+                result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                truncate_cells: bool = False,
+                execute: Optional[Callable[..., ExecuteResponse]] = None) -> ExecuteResponse:
+        """Cached result if its tables are unchanged, else run the query with `execute` (plain execution by default)"""
+        execute = execute or DatabaseService.execute_query
+        start_time = time.time()
+        # Replica statistics do not count replayed writes, so cached reads stay on the primary
+        database_url = replica_router.primary(database_url)
+        tables = referenced_tables(sql) if is_read_only(sql) and is_deterministic(sql) else []
+        if not tables:
+            return execute(
+                database_url, sql, request_id=request_id, result_encoding=result_encoding,
+                truncate_cells=truncate_cells
+            )
+
+        # Counters are read before the query runs, so concurrent writes make the entry stale, never wrong
+        try:
+            counters = self._table_counters(database_url, tables)
+        except Exception:
+            counters = None
+        if counters is None:
+            return execute(
+                database_url, sql, request_id=request_id, result_encoding=result_encoding,
+                truncate_cells=truncate_cells
+            )
+
+        key = (database_url, result_encoding.value, truncate_cells, normalize_sql(sql))
+        entry = self._lookup(key)
+        if entry is not None and entry.counters == counters:
+            with self._lock:
+                self.hits += 1
+            CACHE_REQUESTS.labels("query", "hit").inc()
+            response = ExecuteResponse.model_validate_json(zlib.decompress(entry.payload))
+            response.execution_time = time.time() - start_time
+            response.cache_hit = True
+            return response
+
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS.labels("query", "miss").inc()
+        response = execute(
+            database_url, sql, request_id=request_id, result_encoding=result_encoding,
+            truncate_cells=truncate_cells
+        )
+        if response.success:
+            self._store(key, CacheEntry(
+                payload=zlib.compress(response.model_dump_json().encode("utf-8"), 1),
+                counters=counters,
+                stored_at=time.time()
+            ))
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _lookup(self, key: CacheKey) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.stored_at > config.QUERY_CACHE_MAX_AGE:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: CacheKey, entry: CacheEntry):
+        size = len(entry.payload)
+        # A single result larger than a quarter of the cache would just churn it
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= len(entry.payload)
+
+    @staticmethod
+    def _table_counters(database_url: str, tables: List[str]) -> Optional[TableCounters]:
+        """Modification counters for each referenced table, or None if any cannot be tracked"""
+        with DatabaseService.get_connection(database_url) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.name, c.oid IS NOT NULL,
+                       c.relkind = 'p' OR EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhparent = c.oid),
+                       s.relid IS NOT NULL, s.n_tup_ins, s.n_tup_upd, s.n_tup_del, s.n_live_tup
+                FROM unnest(%s::text[]) AS t(name)
+                LEFT JOIN pg_class c ON c.oid = to_regclass(t.name)
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid;
+            """, (tables,))
+
+            counters = {}
+            for name, is_relation, has_children, has_stats, *values in cursor.fetchall():
+                if not is_relation:
+                    # Not a relation at all, e.g. the column in EXTRACT(year FROM created_at)
+                    continue
+                if has_children or not has_stats:
+                    # Writes to partitions and inheritance children don't move the parent's counters,
+                    # and views and catalogs have none to validate against
+                    return None
+                counters[name] = tuple(values)
+            return counters or None
+
+
+query_cache = QueryCache()
@@ -0,0 +1,96 @@
+"""
+In-flight query registry
+Tracks running statements by request id and backend PID so they can be cancelled on Postgres
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+# How long a cancel for a not-yet-started request is remembered
+_PENDING_CANCEL_TTL = 60
+
+
+class QueryCancelledError(Exception):
+    """Raised when a request is cancelled before its statement starts"""
+
+
+class DuplicateRequestError(Exception):
+    """Raised when a request id is already running, so a cancel could not tell the two apart"""
+
+
+@dataclass
+class InFlightQuery:
+    request_id: str
+    database_url: str
+    connection: Any
+    backend_pid: int
+    started_at: float = field(default_factory=time.time)
+
+
+class QueryRegistry:
+    """Maps request ids to the connections running their statements"""
+
+    def __init__(self):
+        self._queries: Dict[str, InFlightQuery] = {}
+        self._pending_cancels: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, request_id: str, database_url: str, conn):
+        with self._lock:
+            if request_id in self._queries:
+                raise DuplicateRequestError(f"Request id {request_id} is already running")
+            cancelled_at = self._pending_cancels.pop(request_id, None)
+            if cancelled_at is not None and time.time() - cancelled_at < _PENDING_CANCEL_TTL:
+                raise QueryCancelledError("canceling statement due to user request")
+            self._queries[request_id] = InFlightQuery(
+                request_id=request_id,
+                database_url=database_url,
+                connection=conn,
+                backend_pid=conn.get_backend_pid()
+            )
+
+    def unregister(self, request_id: str):
+        with self._lock:
+            self._queries.pop(request_id, None)
+
+    def is_running(self, request_id: str) -> bool:
+        with self._lock:
+            return request_id in self._queries
+
+    def cancel(self, request_id: str) -> bool:
+        """Cancel the statement for a request; returns False if it is not running yet or the cancel failed"""
+        with self._lock:
+            query = self._queries.get(request_id)
+            if query is None:
+                now = time.time()
+                self._pending_cancels = {
+                    rid: ts for rid, ts in self._pending_cancels.items() if now - ts < _PENDING_CANCEL_TTL
+                }
+                self._pending_cancels[request_id] = now
+                return False
+
+        try:
+            # Sends a libpq cancel request for whatever the connection is running. There is deliberately no
+            # pg_cancel_backend fallback: by the time it ran, the PID could be serving another request.
+            query.connection.cancel()
+        except Exception as e:
+            print(f"Cancel for request {request_id} failed: {e}")
+            return False
+        return True
+
+    def in_flight(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "request_id": query.request_id,
+                    "backend_pid": query.backend_pid,
+                    "elapsed": now - query.started_at
+                }
+                for query in self._queries.values()
+            ]
+
+
+query_registry = QueryRegistry()
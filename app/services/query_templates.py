@@ -0,0 +1,164 @@
+"""
+Parameterized query templates
+Extracts literals from SQL and executes the resulting templates as per-connection prepared statements
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+import psycopg2
+
+from app.models.schemas import ExecuteResponse, ResultEncoding
+from app.services.database_service import DatabaseService
+from app.services.sql_text import bind_parameters, extract_literals
+from app.core.config import config
+from app.core.metrics import CACHE_REQUESTS
+
+
+@dataclass
+class QueryTemplate:
+    template_id: str
+    sql: str
+    parameter_count: int
+
+
+def _parameter_type(value: Any) -> str:
+    """PostgreSQL type the original literal would have had"""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer" if -2**31 <= value < 2**31 else "bigint"
+    if isinstance(value, (float, Decimal)):
+        return "numeric"
+    # Quoted literals start out untyped and are resolved from context
+    return "unknown"
+
+
+def _statement_key(template: QueryTemplate, params: List[Any]) -> Tuple[str, Tuple[str, ...]]:
+    return template.template_id, tuple(_parameter_type(value) for value in params)
+
+
+class QueryTemplateService:
+    """Registers templates and runs them through a prepared statement cache on pooled connections"""
+
+    def __init__(self):
+        self._templates: "OrderedDict[str, QueryTemplate]" = OrderedDict()
+        # Statement keys whose PREPARE failed; they run as plain text without trying again
+        self._unpreparable: "OrderedDict[Tuple[str, Tuple[str, ...]], bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, sql: str) -> Tuple[QueryTemplate, List[Any]]:
+        """Turn SQL into a template, returning it with the literal values it contained"""
+        template_sql, params = extract_literals(sql)
+        template_id = hashlib.sha1(template_sql.encode("utf-8")).hexdigest()[:16]
+        template = QueryTemplate(template_id=template_id, sql=template_sql, parameter_count=len(params))
+
+        with self._lock:
+            self._templates[template_id] = template
+            self._templates.move_to_end(template_id)
+            while len(self._templates) > config.TEMPLATE_REGISTRY_SIZE:
+                self._templates.popitem(last=False)
+
+        return template, params
+
+    def get(self, template_id: str) -> Optional[QueryTemplate]:
+        with self._lock:
+            return self._templates.get(template_id)
+
+    def execute_sql(self, database_url: str, sql: str,
+                    result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                    truncate_cells: bool = False, request_id: Optional[str] = None) -> ExecuteResponse:
+        """Template mode for ad-hoc SQL: extract literals, then execute as a prepared statement"""
+        template, params = self.register(sql)
+        return self.execute(database_url, template, params, result_encoding, truncate_cells, request_id)
+
+    def execute(self, database_url: str, template: QueryTemplate, params: List[Any],
+                result_encoding: ResultEncoding = ResultEncoding.NATIVE,
+                truncate_cells: bool = False, request_id: Optional[str] = None) -> ExecuteResponse:
+        start_time = time.time()
+        if len(params) != template.parameter_count:
+            return ExecuteResponse(
+                success=False,
+                error=f"Template expects {template.parameter_count} parameters, got {len(params)}",
+                template_id=template.template_id
+            )
+
+        try:
+            with DatabaseService.get_pooled_connection(database_url) as conn, \
+                    DatabaseService._track_request(request_id, database_url, conn):
+                statement = self._prepare_unless_known_bad(conn, template, params)
+                if statement is None:
+                    # Fall back to plain text execution if the template cannot be prepared
+                    bound_sql, bound_params = bind_parameters(template.sql, params)
+                    sql = conn.cursor().mogrify(bound_sql, bound_params).decode("utf-8")
+                else:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    execute_sql = f"EXECUTE {statement} ({placeholders})" if params else f"EXECUTE {statement}"
+                    sql = conn.cursor().mogrify(execute_sql, params).decode("utf-8")
+
+                response = DatabaseService._run_statement(
+                    conn, sql, start_time, result_encoding=result_encoding, truncate_cells=truncate_cells
+                )
+        except Exception as e:
+            response = ExecuteResponse(
+                success=False,
+                execution_time=time.time() - start_time,
+                error=str(e)
+            )
+
+        response.template_id = template.template_id
+        return response
+
+    def _prepare_unless_known_bad(self, conn, template: QueryTemplate, params: List[Any]) -> Optional[str]:
+        """Prepared statement name, or None when this template and parameter types cannot be prepared"""
+        key = _statement_key(template, params)
+        with self._lock:
+            if key in self._unpreparable:
+                self._unpreparable.move_to_end(key)
+                return None
+        try:
+            return self._prepare(conn, template, params)
+        except psycopg2.OperationalError:
+            # Cancellations and lost connections say nothing about the template
+            raise
+        except psycopg2.Error:
+            # e.g. a literal repeated in SELECT and GROUP BY becomes two parameters that no longer match
+            conn.rollback()
+            with self._lock:
+                self._unpreparable[key] = True
+                while len(self._unpreparable) > config.TEMPLATE_REGISTRY_SIZE:
+                    self._unpreparable.popitem(last=False)
+            return None
+
+    @staticmethod
+    def _prepare(conn, template: QueryTemplate, params: List[Any]) -> str:
+        """Name of a prepared statement for this template on this connection, preparing it if needed"""
+        key = _statement_key(template, params)
+        types = list(key[1])
+        cache = conn.prepared_statements
+
+        if key in cache:
+            cache.move_to_end(key)
+            CACHE_REQUESTS.labels("prepared_statement", "hit").inc()
+            return cache[key]
+        CACHE_REQUESTS.labels("prepared_statement", "miss").inc()
+
+        cursor = conn.cursor()
+        while len(cache) >= config.PREPARED_CACHE_SIZE:
+            _, evicted = cache.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted};")
+
+        name = "nl2sql_" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        type_list = f" ({', '.join(types)})" if types else ""
+        # PREPARE is not transactional, so the statement survives the pool's rollback on release
+        cursor.execute(f"PREPARE {name}{type_list} AS {template.sql}")
+        cache[key] = name
+        return name
+
+
+query_template_service = QueryTemplateService()
@@ -0,0 +1,214 @@
+"""
+Read replica routing
+Resolves DSN groups (a primary plus streaming replicas) to concrete DSNs, sending reads to healthy replicas
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import psycopg2
+
+from app.core.config import config
+
+# database_url values of the form "group:<name>" refer to a configured DSN group
+GROUP_PREFIX = "group:"
+
+# Replayed everything received only means caught up while the WAL receiver is still streaming;
+# a disconnected replica stops receiving, so its lag would otherwise read as 0 forever
+_LAG_QUERY = """
+    SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END,
+        NOT pg_is_in_recovery() OR EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming'
+        );
+"""
+
+
+class UnknownDsnGroupError(Exception):
+    """Raised when a group: reference names no configured DSN group"""
+
+
+def parse_dsn_groups(groups: Union[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Validate DSN_GROUPS (JSON text or an already decoded dict), raising ValueError that names the problem"""
+    if isinstance(groups, str):
+        try:
+            groups = json.loads(groups or "{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"DSN_GROUPS is not valid JSON: {e}") from None
+    if not isinstance(groups, dict):
+        raise ValueError("DSN_GROUPS must be a JSON object of group name to {primary, replicas, max_lag}")
+
+    for name, spec in groups.items():
+        if not isinstance(spec, dict) or not isinstance(spec.get("primary"), str):
+            raise ValueError(f"DSN_GROUPS group {name!r} needs a \"primary\" DSN string")
+        replicas = spec.get("replicas", [])
+        if not isinstance(replicas, list) or not all(isinstance(dsn, str) for dsn in replicas):
+            raise ValueError(f"DSN_GROUPS group {name!r}: \"replicas\" must be a list of DSN strings")
+        if not isinstance(spec.get("max_lag", 0), (int, float)):
+            raise ValueError(f"DSN_GROUPS group {name!r}: \"max_lag\" must be a number of seconds")
+    return groups
+
+
+@dataclass
+class ReplicaState:
+    dsn: str
+    healthy: bool = False
+    lag_seconds: Optional[float] = None
+    in_flight: int = 0
+    last_checked: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class DsnGroup:
+    name: str
+    primary: str
+    replicas: List[ReplicaState] = field(default_factory=list)
+    max_lag: float = 0.0
+
+
+class ReplicaRouter:
+    """Routes read-only work to the least-loaded healthy replica of a DSN group, else to its primary"""
+
+    def __init__(self, groups: Optional[Dict[str, Dict[str, Any]]] = None):
+        # A bad DSN_GROUPS must not break importing the app; start() raises it instead
+        self.config_error: Optional[str] = None
+        try:
+            groups = parse_dsn_groups(config.DSN_GROUPS if groups is None else groups)
+        except ValueError as e:
+            self.config_error = str(e)
+            groups = {}
+        self._groups: Dict[str, DsnGroup] = {
+            name: DsnGroup(
+                name=name,
+                primary=spec["primary"],
+                replicas=[ReplicaState(dsn=dsn) for dsn in spec.get("replicas", [])],
+                max_lag=float(spec.get("max_lag", config.REPLICA_MAX_LAG))
+            )
+            for name, spec in groups.items()
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def is_group(database_url: str) -> bool:
+        return database_url.startswith(GROUP_PREFIX)
+
+    def primary(self, database_url: str) -> str:
+        """Concrete DSN for writes; plain DSNs are returned unchanged"""
+        if not self.is_group(database_url):
+            return database_url
+        return self._group(database_url).primary
+
+    @contextmanager
+    def route(self, database_url: str, read_only: bool):
+        """Yield the DSN to run on, counting the work against the chosen replica while it runs"""
+        if not read_only or not self.is_group(database_url):
+            yield self.primary(database_url)
+            return
+
+        group = self._group(database_url)
+        with self._lock:
+            candidates = [r for r in group.replicas if r.healthy]
+            replica = min(candidates, key=lambda r: (r.in_flight, r.lag_seconds or 0)) if candidates else None
+            if replica is not None:
+                replica.in_flight += 1
+
+        if replica is None:
+            # No replica is within the lag limit, so reads fall back to the primary
+            yield group.primary
+            return
+
+        try:
+            yield replica.dsn
+        finally:
+            with self._lock:
+                replica.in_flight -= 1
+
+    def probe(self):
+        """Check every replica's reachability and replication lag once"""
+        for group in list(self._groups.values()):
+            for replica in group.replicas:
+                lag, error = self._measure_lag(replica.dsn)
+                with self._lock:
+                    replica.lag_seconds = lag
+                    replica.error = error
+                    replica.healthy = error is None and lag <= group.max_lag
+                    replica.last_checked = time.time()
+
+    def start(self):
+        if self.config_error:
+            raise ValueError(self.config_error)
+        if self._thread is not None or not any(g.replicas for g in self._groups.values()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._probe_loop, name="replica-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=config.REPLICA_PROBE_TIMEOUT + 1)
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        # DSNs may carry credentials, so replicas are reported by position only
+        with self._lock:
+            return {
+                group.name: [
+                    {
+                        "replica": index,
+                        "healthy": replica.healthy,
+                        "lag_seconds": replica.lag_seconds,
+                        "in_flight": replica.in_flight,
+                        "error": replica.error
+                    }
+                    for index, replica in enumerate(group.replicas)
+                ]
+                for group in self._groups.values()
+            }
+
+    def _group(self, database_url: str) -> DsnGroup:
+        name = database_url[len(GROUP_PREFIX):]
+        group = self._groups.get(name)
+        if group is None:
+            detail = f" ({self.config_error})" if self.config_error else ""
+            raise UnknownDsnGroupError(f"Unknown DSN group: {name}{detail}")
+        return group
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"Replica probe failed: {e}")
+            self._stop.wait(config.REPLICA_PROBE_INTERVAL)
+
+    @staticmethod
+    def _measure_lag(dsn: str):
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=config.REPLICA_PROBE_TIMEOUT)
+            cursor = conn.cursor()
+            cursor.execute(f"SET statement_timeout = {config.REPLICA_PROBE_TIMEOUT * 1000};")
+            cursor.execute(_LAG_QUERY)
+            lag, streaming = cursor.fetchone()
+            if not streaming:
+                return None, "WAL receiver is not streaming"
+            return float(lag), None
+        except Exception as e:
+            return None, str(e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,144 @@
+"""
+Result byte budgets
+Estimates the encoded size of fetched rows and caps how much result data a request and a worker may hold
+"""
+
+import json
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import config
+
+TRUNCATION_MARKER = "...[truncated]"
+
+
+def encoded_size(value: Any) -> int:
+    """Approximate JSON-encoded size of a cell value in bytes"""
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        # Characters rather than UTF-8 bytes, which keeps the estimate O(1)
+        return len(value) + 2
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float)):
+        return 24
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return 2 * len(value) + 2
+    if isinstance(value, (dict, list)):
+        return len(json.dumps(value, default=str))
+    return len(str(value)) + 2
+
+
+def truncate_cell(value: Any, max_bytes: int) -> Tuple[Any, bool]:
+    """Shorten a cell to roughly max_bytes, returning the new value and whether it was cut"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        text = bytes(value[:max_bytes // 2 + 1]).hex()
+    elif isinstance(value, (dict, list)):
+        # Structured values are cut as their JSON text
+        text = json.dumps(value, default=str)
+    elif isinstance(value, str):
+        text = value
+    else:
+        return value, False
+
+    if len(text) <= max_bytes:
+        return value, False
+    return text[:max_bytes] + TRUNCATION_MARKER, True
+
+
+def row_size(row: Dict[str, Any], max_cell_bytes: Optional[int] = None) -> Tuple[int, int]:
+    """Encoded size of a row, truncating oversized cells in place when max_cell_bytes is set"""
+    size = 2
+    truncated = 0
+    for key, value in row.items():
+        cell_size = encoded_size(value)
+        if max_cell_bytes is not None and cell_size > max_cell_bytes:
+            value, was_cut = truncate_cell(value, max_cell_bytes)
+            if was_cut:
+                row[key] = value
+                truncated += 1
+                cell_size = encoded_size(value)
+        size += len(key) + 4 + cell_size
+    return size, truncated
+
+
+class WorkerByteBudget:
+    """Bytes of result rows held by all in-progress fetches in this process"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or config.WORKER_RESULT_MAX_BYTES
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.used_bytes + size > self.max_bytes:
+                return False
+            self.used_bytes += size
+            return True
+
+    def release(self, size: int):
+        with self._lock:
+            self.used_bytes = max(0, self.used_bytes - size)
+
+
+worker_byte_budget = WorkerByteBudget()
+
+
+class RequestReservation:
+    """Worker budget bytes fetched for one request, held until its response has been sent"""
+
+    def __init__(self, budget: WorkerByteBudget):
+        self._budget = budget
+        self._lock = threading.Lock()
+        self.size = 0
+        self.released = False
+
+    def add(self, size: int):
+        with self._lock:
+            if not self.released:
+                self.size += size
+                return
+        # Work that outlives its request (e.g. a background prefetch) gives its bytes back at once
+        self._budget.release(size)
+
+    def release(self):
+        with self._lock:
+            size, self.size, self.released = self.size, 0, True
+        self._budget.release(size)
+
+
+_request_reservation: ContextVar[Optional[RequestReservation]] = ContextVar("request_reservation", default=None)
+
+
+def request_reservation() -> Optional[RequestReservation]:
+    """Reservation of the request this code runs for, or None outside a request"""
+    return _request_reservation.get()
+
+
+def release_per_fetch():
+    """Let fetches in the current context release their bytes themselves, for responses that stream rows out"""
+    _request_reservation.set(None)
+
+
+class ResultBudgetMiddleware:
+    """Keeps the rows a request fetched charged to the worker budget until its response is sent"""
+
+    def __init__(self, app, budget: Optional[WorkerByteBudget] = None):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reservation = RequestReservation(self.budget or worker_byte_budget)
+        token = _request_reservation.set(reservation)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_reservation.reset(token)
+            reservation.release()
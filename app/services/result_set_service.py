@@ -0,0 +1,252 @@
+"""
+Server-held result sets
+Executes a query once, spills the rows to a local columnar file and serves page fetches from it
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.models.schemas import ResultSetResponse, ResultPageResponse
+from app.services.database_service import DatabaseService
+from app.services.result_store import ColumnarResult, ColumnarResultWriter
+from app.core.config import config
+
+
+# Each process spills into its own p<pid> subdirectory of RESULT_SET_DIR
+_PROCESS_DIR = re.compile(r"p(\d+)$")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class ResultSet:
+    result_set_id: str
+    user_id: str
+    store: ColumnarResult
+    was_limited: bool = False
+    last_access: float = field(default_factory=time.time)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.store.columns
+
+    @property
+    def row_count(self) -> int:
+        return self.store.row_count
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.last_access > config.RESULT_SET_TTL
+
+
+class ResultSetService:
+    """Keeps executed results on disk so pages can be fetched without re-running the query"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.root = directory or config.RESULT_SET_DIR or os.path.join(
+            tempfile.gettempdir(), "nl2sql_result_sets"
+        )
+        self.directory = os.path.join(self.root, f"p{os.getpid()}")
+        self._result_sets: "OrderedDict[str, ResultSet]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Remove spill files no live result set owns, then expire idle sets in the background"""
+        self.remove_orphaned_files()
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="result-set-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop expiring and drop every held result set with its file"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for result_set_id in list(self._result_sets):
+                self._discard(result_set_id)
+
+    def remove_orphaned_files(self) -> int:
+        """Delete spill files left by exited processes and files of this process that no set owns"""
+        with self._lock:
+            owned = {result_set.store.path for result_set in self._result_sets.values()}
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            return 0
+
+        removed = 0
+        for entry in entries:
+            path = os.path.join(self.root, entry)
+            match = _PROCESS_DIR.match(entry)
+            if entry.endswith(".nlrs") and path not in owned:
+                # Spilled before files were kept per process
+                removed += self._remove_file(path)
+            elif match and os.path.isdir(path):
+                pid = int(match.group(1))
+                if pid != os.getpid() and _process_alive(pid):
+                    continue
+                for name in os.listdir(path):
+                    if os.path.join(path, name) not in owned:
+                        removed += self._remove_file(os.path.join(path, name))
+                if pid != os.getpid():
+                    shutil.rmtree(path, ignore_errors=True)
+        if removed:
+            print(f"Removed {removed} orphaned result set files from {self.root}")
+        return removed
+
+    def create(self, database_url: str, sql: str, user_id: str) -> ResultSetResponse:
+        start_time = time.time()
+        result_set_id = uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{result_set_id}.nlrs")
+
+        try:
+            result_set = self._spill_query(database_url, sql, user_id, result_set_id, path)
+        except Exception as e:
+            self._remove_file(path)
+            return ResultSetResponse(
+                success=False,
+                execution_time=time.time() - start_time,
+                error=str(e)
+            )
+
+        with self._lock:
+            self._evict_expired()
+            self._evict_for_user(user_id)
+            self._result_sets[result_set_id] = result_set
+            while len(self._result_sets) > config.RESULT_SET_MAX_TOTAL:
+                self._discard(next(iter(self._result_sets)))
+
+        return ResultSetResponse(
+            success=True,
+            result_set_id=result_set_id,
+            columns=result_set.columns,
+            row_count=result_set.row_count,
+            execution_time=time.time() - start_time,
+            was_limited=result_set.was_limited,
+            expires_in=config.RESULT_SET_TTL
+        )
+
+    def fetch_page(self, result_set_id: str, offset: int, limit: int,
+                   sort_by: Optional[str] = None, descending: bool = False) -> Optional[ResultPageResponse]:
+        with self._lock:
+            self._evict_expired()
+            result_set = self._result_sets.get(result_set_id)
+            if result_set is None:
+                return None
+            result_set.last_access = time.time()
+            self._result_sets.move_to_end(result_set_id)
+
+        if sort_by and sort_by not in result_set.columns:
+            raise ValueError(f"Unknown sort column: {sort_by}")
+
+        try:
+            data = result_set.store.slice(offset, offset + limit, sort_by, descending)
+        except ValueError:
+            # The result set was evicted while this page was being read
+            return None
+
+        return ResultPageResponse(
+            result_set_id=result_set_id,
+            offset=offset,
+            limit=limit,
+            data=data,
+            columns=result_set.columns,
+            row_count=len(data),
+            total_rows=result_set.row_count
+        )
+
+    def close(self, result_set_id: str) -> bool:
+        with self._lock:
+            if result_set_id not in self._result_sets:
+                return False
+            self._discard(result_set_id)
+            return True
+
+    def _spill_query(self, database_url: str, sql: str, user_id: str,
+                     result_set_id: str, path: str) -> ResultSet:
+        with DatabaseService.get_connection(database_url) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SET statement_timeout = {config.MAX_QUERY_TIMEOUT * 1000};")
+
+            # Server-side cursor streams rows instead of buffering the whole result
+            named_cursor = conn.cursor(name=f"rs_{result_set_id}")
+            named_cursor.execute(sql)
+
+            rows = named_cursor.fetchmany(min(config.RESULT_SET_FETCH_BATCH, config.RESULT_SET_MAX_ROWS))
+            writer = ColumnarResultWriter.from_description(path, named_cursor.description)
+            was_limited = False
+
+            try:
+                while rows:
+                    writer.append_rows(rows)
+                    remaining = config.RESULT_SET_MAX_ROWS - writer.row_count
+                    if remaining <= 0:
+                        was_limited = bool(named_cursor.fetchmany(1))
+                        break
+                    rows = named_cursor.fetchmany(min(config.RESULT_SET_FETCH_BATCH, remaining))
+            except Exception:
+                writer.abort()
+                raise
+
+            named_cursor.close()
+            return ResultSet(
+                result_set_id=result_set_id,
+                user_id=user_id,
+                store=writer.finish(),
+                was_limited=was_limited
+            )
+
+    def _sweep_loop(self):
+        while not self._stop.wait(config.RESULT_SET_SWEEP_INTERVAL):
+            with self._lock:
+                self._evict_expired()
+
+    def _evict_expired(self):
+        now = time.time()
+        for result_set_id in [rid for rid, rs in self._result_sets.items() if rs.is_expired(now)]:
+            self._discard(result_set_id)
+
+    def _evict_for_user(self, user_id: str):
+        # Make room for one more result set owned by this user, dropping their least recently used
+        owned = [rid for rid, rs in self._result_sets.items() if rs.user_id == user_id]
+        while len(owned) >= config.RESULT_SET_MAX_PER_USER:
+            self._discard(owned.pop(0))
+
+    def _discard(self, result_set_id: str):
+        result_set = self._result_sets.pop(result_set_id, None)
+        if result_set:
+            result_set.store.close()
+            self._remove_file(result_set.store.path)
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+
+result_set_service = ResultSetService()
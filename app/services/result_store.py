@@ -0,0 +1,530 @@
+"""
+Columnar on-disk result store
+Writes cursor batches into one compact file per result and reads it back through mmap
+"""
+
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+MAGIC = b"NLRS0001"
+_FOOTER_LENGTH = struct.Struct("<Q")
+# Rows sorted in memory at once; longer columns are sorted in runs of this size and merged
+_SORT_RUN_ROWS = 65536
+
+
+class ColumnKind:
+    INT64 = "int64"
+    FLOAT64 = "float64"
+    BOOL = "bool"
+    STR = "str"
+    # numeric keeps its exact text, like the API encodes Decimal, and sorts by value
+    DECIMAL = "decimal"
+    JSON = "json"
+
+
+# PostgreSQL type OIDs mapped to storage kinds; anything else is stored as text
+_OID_KINDS = {
+    16: ColumnKind.BOOL,
+    20: ColumnKind.INT64, 21: ColumnKind.INT64, 23: ColumnKind.INT64, 26: ColumnKind.INT64,
+    700: ColumnKind.FLOAT64, 701: ColumnKind.FLOAT64, 1700: ColumnKind.DECIMAL,
+    114: ColumnKind.JSON, 3802: ColumnKind.JSON,
+    # Arrays keep their structure as JSON
+    1000: ColumnKind.JSON, 1005: ColumnKind.JSON, 1007: ColumnKind.JSON, 1009: ColumnKind.JSON,
+    1015: ColumnKind.JSON, 1016: ColumnKind.JSON, 1021: ColumnKind.JSON, 1022: ColumnKind.JSON,
+    1231: ColumnKind.JSON,
+}
+
+# array typecodes for the fixed-width layouts
+_TYPECODES = {ColumnKind.INT64: "q", ColumnKind.FLOAT64: "d", ColumnKind.BOOL: "B"}
+
+
+def json_default(value: Any) -> Any:
+    """Encode driver types the same way the JSON API responses do"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def _encode_text(value: Any) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    encoded = json_default(value)
+    return (encoded if isinstance(encoded, str) else str(encoded)).encode("utf-8")
+
+
+class _ColumnWriter:
+    """Spills one column into temporary segment files while rows are appended"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.validity = tempfile.TemporaryFile()
+        self.values = tempfile.TemporaryFile()
+        self.offsets = tempfile.TemporaryFile() if kind not in _TYPECODES else None
+        self.position = 0
+        if self.offsets is not None:
+            array("q", [0]).tofile(self.offsets)
+
+    def append(self, values: Sequence[Any]):
+        validity = array("B", (0 if v is None else 1 for v in values))
+        validity.tofile(self.validity)
+
+        if self.offsets is None:
+            default = 0.0 if self.kind == ColumnKind.FLOAT64 else 0
+            cast = float if self.kind == ColumnKind.FLOAT64 else int
+            array(_TYPECODES[self.kind], (default if v is None else cast(v) for v in values)).tofile(self.values)
+            return
+
+        offsets = array("q")
+        chunks = []
+        for v in values:
+            if v is not None:
+                data = (json.dumps(v, default=json_default).encode("utf-8")
+                        if self.kind == ColumnKind.JSON else _encode_text(v))
+                chunks.append(data)
+                self.position += len(data)
+            offsets.append(self.position)
+        self.values.write(b"".join(chunks))
+        offsets.tofile(self.offsets)
+
+    def segments(self) -> Dict[str, Any]:
+        segments = {"validity": self.validity, "values": self.values}
+        if self.offsets is not None:
+            segments["offsets"] = self.offsets
+        return segments
+
+    def close(self):
+        for segment in self.segments().values():
+            segment.close()
+
+
+class ColumnarResultWriter:
+    """Builds a columnar result file from cursor batches"""
+
+    def __init__(self, path: str, columns: List[str], kinds: List[str]):
+        self.path = path
+        self.columns = columns
+        self.row_count = 0
+        self._writers = [_ColumnWriter(name, kind) for name, kind in zip(columns, kinds)]
+
+    @classmethod
+    def from_description(cls, path: str, description) -> "ColumnarResultWriter":
+        """Create a writer using the column names and type OIDs from a cursor description"""
+        columns = [desc[0] for desc in description]
+        kinds = [_OID_KINDS.get(desc[1], ColumnKind.STR) for desc in description]
+        return cls(path, columns, kinds)
+
+    def append_rows(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        for index, writer in enumerate(self._writers):
+            writer.append([row[index] for row in rows])
+        self.row_count += len(rows)
+
+    def finish(self) -> "ColumnarResult":
+        """Concatenate the column segments into the result file and open it for reading"""
+        footer = {"row_count": self.row_count, "columns": []}
+
+        try:
+            with open(self.path, "wb") as out:
+                out.write(MAGIC)
+                for writer in self._writers:
+                    column = {"name": writer.name, "kind": writer.kind, "segments": {}}
+                    for segment_name, segment in writer.segments().items():
+                        # Keep every segment 8-byte aligned for the fixed-width views
+                        out.write(b"\0" * (-out.tell() % 8))
+                        start = out.tell()
+                        segment.seek(0)
+                        shutil.copyfileobj(segment, out)
+                        column["segments"][segment_name] = [start, out.tell() - start]
+                    footer["columns"].append(column)
+
+                footer_bytes = json.dumps(footer).encode("utf-8")
+                out.write(footer_bytes)
+                out.write(_FOOTER_LENGTH.pack(len(footer_bytes)))
+                out.write(MAGIC)
+        finally:
+            self._close_writers()
+
+        return ColumnarResult(self.path)
+
+    def abort(self):
+        self._close_writers()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _close_writers(self):
+        for writer in self._writers:
+            writer.close()
+
+
+class _ColumnView:
+    """Random access over one column inside the mapped file"""
+
+    def __init__(self, result: "ColumnarResult", spec: Dict[str, Any]):
+        self.name = spec["name"]
+        self.kind = spec["kind"]
+        segments = spec["segments"]
+        self.validity = result._view(*segments["validity"], "B")
+
+        if self.kind in _TYPECODES:
+            self.values = result._view(*segments["values"], _TYPECODES[self.kind])
+            self.offsets = None
+        else:
+            self.values = result._view(*segments["values"])
+            self.offsets = result._view(*segments["offsets"], "q")
+
+    def get(self, row: int) -> Any:
+        if not self.validity[row]:
+            return None
+        if self.offsets is None:
+            value = self.values[row]
+            return bool(value) if self.kind == ColumnKind.BOOL else value
+
+        text = bytes(self.values[self.offsets[row]:self.offsets[row + 1]])
+        if self.kind == ColumnKind.JSON:
+            return json.loads(text)
+        return text.decode("utf-8")
+
+    def sort_key(self, row: int):
+        """Key ordering values like PostgreSQL: numbers, then NaN, then NULL"""
+        if not self.validity[row]:
+            return (2, 0)
+        if self.offsets is None:
+            value = self.values[row]
+            # NaN doesn't compare, and PostgreSQL sorts it above every number
+            return (1, 0) if value != value else (0, value)
+        text = bytes(self.values[self.offsets[row]:self.offsets[row + 1]])
+        if self.kind != ColumnKind.DECIMAL:
+            return (0, text)
+        value = Decimal(text.decode("ascii"))
+        return (1, 0) if value.is_nan() else (0, value)
+
+    def argsort(self, row_count: int, descending: bool = False) -> array:
+        """Stable row permutation by value; runs are kept as 8-byte row arrays, so only one run's keys are held"""
+        # Nulls sort last ascending and first descending, as PostgreSQL does by default
+        runs = [
+            array("q", sorted(range(start, min(start + _SORT_RUN_ROWS, row_count)),
+                              key=self.sort_key, reverse=descending))
+            for start in range(0, row_count, _SORT_RUN_ROWS)
+        ]
+        if len(runs) == 1:
+            return runs[0]
+        return array("q", heapq.merge(*runs, key=self.sort_key, reverse=descending))
+
+
+class ColumnarResult:
+    """Memory-mapped reader for a columnar result file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views = []
+        self._sort_orders: Dict[tuple, array] = {}
+        # Readers hold a lease so close() never releases the mapping under a slice in progress
+        self._lease_lock = threading.Lock()
+        self._readers = 0
+        self._closing = False
+
+        if self._buffer[:len(MAGIC)] != MAGIC or self._buffer[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar result file: {path}")
+
+        footer_end = len(self._buffer) - len(MAGIC) - _FOOTER_LENGTH.size
+        (footer_length,) = _FOOTER_LENGTH.unpack(self._buffer[footer_end:footer_end + _FOOTER_LENGTH.size])
+        footer = json.loads(bytes(self._buffer[footer_end - footer_length:footer_end]))
+
+        self.row_count = footer["row_count"]
+        self._columns = [_ColumnView(self, spec) for spec in footer["columns"]]
+        self.columns = [column.name for column in self._columns]
+
+    def _view(self, start: int, length: int, typecode: Optional[str] = None) -> memoryview:
+        view = self._buffer[start:start + length]
+        self._views.append(view)
+        if typecode:
+            view = view.cast(typecode)
+            self._views.append(view)
+        return view
+
+    @contextmanager
+    def reading(self):
+        """Lease the mapping for a read; raises ValueError once the result is closed"""
+        with self._lease_lock:
+            if self._closing:
+                raise ValueError(f"Columnar result is closed: {self.path}")
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._lease_lock:
+                self._readers -= 1
+                release = self._closing and self._readers == 0
+            if release:
+                self._release()
+
+    def sort_order(self, column: str, descending: bool = False) -> array:
+        """Row permutation ordering the result by one column, cached per direction"""
+        key = (column, descending)
+        if key not in self._sort_orders:
+            with self.reading():
+                view = self._columns[self.columns.index(column)]
+                self._sort_orders[key] = view.argsort(self.row_count, descending)
+        return self._sort_orders[key]
+
+    def slice(self, start: int, stop: int, sort_by: Optional[str] = None,
+              descending: bool = False) -> List[Dict[str, Any]]:
+        """Decode rows [start, stop) as dictionaries, optionally in sorted order"""
+        return list(self.iter_rows(start, stop, sort_by, descending))
+
+    def iter_rows(self, start: int = 0, stop: Optional[int] = None, sort_by: Optional[str] = None,
+                  descending: bool = False) -> Iterator[Dict[str, Any]]:
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        rows = range(max(start, 0), stop)
+        with self.reading():
+            if sort_by:
+                order = self.sort_order(sort_by, descending)
+                rows = (order[i] for i in rows)
+
+            for row in rows:
+                yield {column.name: column.get(row) for column in self._columns}
+
+    def close(self):
+        for segment in self.segments().values():
+            segment.close()
+
+
+class ColumnarResultWriter:
+    """Builds a columnar result file from cursor batches"""
+
+    def __init__(self, path: str, columns: List[str], kinds: List[str]):
+        self.path = path
+        self.columns = columns
+        self.row_count = 0
+        self._writers = [_ColumnWriter(name, kind) for name, kind in zip(columns, kinds)]
+
+    @classmethod
+    def from_description(cls, path: str, description) -> "ColumnarResultWriter":
+        """Create a writer using the column names and type OIDs from a cursor description"""
+        columns = [desc[0] for desc in description]
+        kinds = [_OID_KINDS.get(desc[1], ColumnKind.STR) for desc in description]
+        return cls(path, columns, kinds)
+
+    def append_rows(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        for index, writer in enumerate(self._writers):
+            writer.append([row[index] for row in rows])
+        self.row_count += len(rows)
+
+    def finish(self) -> "ColumnarResult":
+        """Concatenate the column segments into the result file and open it for reading"""
+        footer = {"row_count": self.row_count, "columns": []}
+
+        try:
+            with open(self.path, "wb") as out:
+                out.write(MAGIC)
+                for writer in self._writers:
+                    column = {"name": writer.name, "kind": writer.kind, "segments": {}}
+                    for segment_name, segment in writer.segments().items():
+                        # Keep every segment 8-byte aligned for the fixed-width views
+                        out.write(b"\0" * (-out.tell() % 8))
+                        start = out.tell()
+                        segment.seek(0)
+                        shutil.copyfileobj(segment, out)
+                        column["segments"][segment_name] = [start, out.tell() - start]
+                    footer["columns"].append(column)
+
+                footer_bytes = json.dumps(footer).encode("utf-8")
+                out.write(footer_bytes)
+                out.write(_FOOTER_LENGTH.pack(len(footer_bytes)))
+                out.write(MAGIC)
+        finally:
+            self._close_writers()
+
+        return ColumnarResult(self.path)
+
+    def abort(self):
+        self._close_writers()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _close_writers(self):
+        for writer in self._writers:
+            writer.close()
+
+
+class _ColumnView:
+    """Random access over one column inside the mapped file"""
+
+    def __init__(self, result: "ColumnarResult", spec: Dict[str, Any]):
+        self.name = spec["name"]
+        self.kind = spec["kind"]
+        segments = spec["segments"]
+        self.validity = result._view(*segments["validity"], "B")
+
+        if self.kind in _TYPECODES:
+            self.values = result._view(*segments["values"], _TYPECODES[self.kind])
+            self.offsets = None
+        else:
+            self.values = result._view(*segments["values"])
+            self.offsets = result._view(*segments["offsets"], "q")
+
+    def get(self, row: int) -> Any:
+        if not self.validity[row]:
+            return None
+        if self.offsets is None:
+            value = self.values[row]
+            return bool(value) if self.kind == ColumnKind.BOOL else value
+
+        text = bytes(self.values[self.offsets[row]:self.offsets[row + 1]])
+        if self.kind == ColumnKind.JSON:
+            return json.loads(text)
+        return text.decode("utf-8")
+
+    def sort_key(self, row: int):
+        """Key ordering values like PostgreSQL: numbers, then NaN, then NULL"""
+        if not self.validity[row]:
+            return (2, 0)
+        if self.offsets is None:
+            value = self.values[row]
+            # NaN doesn't compare, and PostgreSQL sorts it above every number
+            return (1, 0) if value != value else (0, value)
+        text = bytes(self.values[self.offsets[row]:self.offsets[row + 1]])
+        if self.kind != ColumnKind.DECIMAL:
+            return (0, text)
+        value = Decimal(text.decode("ascii"))
+        return (1, 0) if value.is_nan() else (0, value)
+
+    def argsort(self, row_count: int, descending: bool = False) -> array:
+        """Stable row permutation by value; runs are kept as 8-byte row arrays, so only one run's keys are held"""
+        # Nulls sort last ascending and first descending, as PostgreSQL does by default
+        runs = [
+            array("q", sorted(range(start, min(start + _SORT_RUN_ROWS, row_count)),
+                              key=self.sort_key, reverse=descending))
+            for start in range(0, row_count, _SORT_RUN_ROWS)
+        ]
+        if len(runs) == 1:
+            return runs[0]
+        return array("q", heapq.merge(*runs, key=self.sort_key, reverse=descending))
+
+
+class ColumnarResult:
+    """Memory-mapped reader for a columnar result file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views = []
+        self._sort_orders: Dict[tuple, array] = {}
+        # Readers hold a lease so close() never releases the mapping under a slice in progress
+        self._lease_lock = threading.Lock()
+        self._readers = 0
+        self._closing = False
+
+        if self._buffer[:len(MAGIC)] != MAGIC or self._buffer[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar result file: {path}")
+
+        footer_end = len(self._buffer) - len(MAGIC) - _FOOTER_LENGTH.size
+        (footer_length,) = _FOOTER_LENGTH.unpack(self._buffer[footer_end:footer_end + _FOOTER_LENGTH.size])
+        footer = json.loads(bytes(self._buffer[footer_end - footer_length:footer_end]))
+
+        self.row_count = footer["row_count"]
+        self._columns = [_ColumnView(self, spec) for spec in footer["columns"]]
+        self.columns = [column.name for column in self._columns]
+
+    def _view(self, start: int, length: int, typecode: Optional[str] = None) -> memoryview:
+        view = self._buffer[start:start + length]
+        self._views.append(view)
+        if typecode:
+            view = view.cast(typecode)
+            self._views.append(view)
+        return view
+
+    @contextmanager
+    def reading(self):
+        """Lease the mapping for a read; raises ValueError once the result is closed"""
+        with self._lease_lock:
+            if self._closing:
+                raise ValueError(f"Columnar result is closed: {self.path}")
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._lease_lock:
+                self._readers -= 1
+                release = self._closing and self._readers == 0
+            if release:
+                self._release()
+
+    def sort_order(self, column: str, descending: bool = False) -> array:
+        """Row permutation ordering the result by one column, cached per direction"""
+        key = (column, descending)
+        if key not in self._sort_orders:
+            with self.reading():
+                view = self._columns[self.columns.index(column)]
+                self._sort_orders[key] = view.argsort(self.row_count, descending)
+        return self._sort_orders[key]
+
+    def slice(self, start: int, stop: int, sort_by: Optional[str] = None,
+              descending: bool = False) -> List[Dict[str, Any]]:
+        """Decode rows [start, stop) as dictionaries, optionally in sorted order"""
+        return list(self.iter_rows(start, stop, sort_by, descending))
+
+    def iter_rows(self, start: int = 0, stop: Optional[int] = None, sort_by: Optional[str] = None,
+                  descending: bool = False) -> Iterator[Dict[str, Any]]:
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        rows = range(max(start, 0), stop)
+        with self.reading():
+            if sort_by:
+                order = self.sort_order(sort_by, descending)
+                rows = (order[i] for i in rows)
+
+            for row in rows:
+                yield {column.name: column.get(row) for column in self._columns}
+
+    def write_ndjson(self, fp, sort_by: Optional[str] = None, descending: bool = False):
+        """Re-serialize the whole result as newline-delimited JSON"""
+        for row in self.iter_rows(sort_by=sort_by, descending=descending):
+            fp.write(json.dumps(row).encode("utf-8") + b"\n")
+
+    def close(self):
+        """Release the mapping now, or when the last reader finishes"""
+        with self._lease_lock:
+            if self._closing:
+                return
+            self._closing = True
+            release = self._readers == 0
+        if release:
+            self._release()
+
+    def _release(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
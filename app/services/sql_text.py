@@ -0,0 +1,277 @@
+"""
+Lightweight SQL text helpers
+Tokenizes just enough of PostgreSQL syntax to normalize statements and find referenced tables
+"""
+
+import re
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+# String literals, quoted identifiers and comments must not be touched by normalization
+_TOKEN_PATTERN = re.compile(
+    r"(?P<string>[eE]?'(?:[^']|'')*')"
+    r"|(?P<dollar>(?<![\w$])\$(?P<tag>[a-zA-Z_][a-zA-Z0-9_]*|)\$.*?\$(?P=tag)\$)"
+    r"|(?P<ident>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<line_comment>--[^\n]*)"
+    r"|(?P<block_comment>/\*.*?\*/)",
+    re.DOTALL
+)
+
+_NAME = r'(?:"(?:[^"]|"")+"|[a-z_][a-z0-9_$]*)'
+_NAME_PATTERN = re.compile(_NAME)
+_WORD_PATTERN = re.compile(rf"{_NAME}|\d+(?:\.\d+)?|\S")
+_CTE_PATTERN = re.compile(rf"({_NAME})\s*(?:\([^)]*\)\s*)?as\s*(?:not\s+)?(?:materialized\s*)?\(")
+
+# Functions whose results change between calls even when no table changes
+_VOLATILE_PATTERN = re.compile(
+    r"\b(?:now|random|clock_timestamp|statement_timestamp|transaction_timestamp|timeofday|"
+    r"nextval|currval|setval|gen_random_uuid|uuid_generate_v\d|txid_current|pg_sleep|"
+    r"current_timestamp|current_date|current_time|localtime|localtimestamp)\b"
+)
+
+# Functions that write, signal other sessions or reach other servers, even when called from a SELECT
+_SIDE_EFFECT_PATTERN = re.compile(
+    r"\b(?:nextval|setval|set_config|pg_terminate_backend|pg_cancel_backend|pg_reload_conf|pg_rotate_logfile|"
+    r"pg_switch_wal|pg_notify|pg_(?:try_)?advisory_\w+|pg_create_\w+_slot|pg_drop_replication_slot|"
+    r"pg_file_write|lo_(?:import|export|unlink|create|from_bytea|put)|dblink\w*|txid_current)\s*\("
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a statement: comments dropped, whitespace collapsed, unquoted text lowercased"""
+    parts = []
+    unquoted = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        unquoted.append(sql[position:match.start()])
+        position = match.end()
+        if match.lastgroup in ("string", "dollar", "ident"):
+            parts.append(_collapse("".join(unquoted)))
+            parts.append(match.group(0))
+            unquoted = []
+        else:
+            unquoted.append(" ")
+    unquoted.append(sql[position:])
+    parts.append(_collapse("".join(unquoted)))
+
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _collapse(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower())
+
+
+def _strip_literals(normalized: str) -> str:
+    # Blank out string literals so keywords inside them are ignored
+    return _TOKEN_PATTERN.sub(
+        lambda match: "''" if match.lastgroup in ("string", "dollar") else match.group(0), normalized
+    )
+
+
+def is_read_only(sql: str) -> bool:
+    normalized = _strip_literals(normalize_sql(sql))
+    if not re.match(r"^\(*\s*(?:select|with|values|table)\b", normalized):
+        return False
+    if _SIDE_EFFECT_PATTERN.search(normalized):
+        return False
+    return not re.search(r"\b(?:insert|update|delete|merge|into|for update|for share)\b", normalized)
+
+
+def is_single_statement(sql: str) -> bool:
+    return ";" not in _strip_literals(normalize_sql(sql))
+
+
+def is_deterministic(sql: str) -> bool:
+    return not _VOLATILE_PATTERN.search(_strip_literals(normalize_sql(sql)))
+
+
+def referenced_tables(sql: str) -> List[str]:
+    """Relations in FROM clauses, excluding CTE names; empty when a FROM clause isn't understood"""
+    normalized = _strip_literals(normalize_sql(sql))
+    ctes = set(_CTE_PATTERN.findall(normalized))
+    words = _WORD_PATTERN.findall(normalized)
+
+    tables: List[str] = []
+    calls = []
+    for i, word in enumerate(words):
+        if word == "(":
+            calls.append(words[i - 1] if i else "")
+        elif word == ")" and calls:
+            calls.pop()
+        elif word == "from" and not (i and words[i - 1] == "distinct") and not (calls and calls[-1] in _FROM_CALLS):
+            # Subqueries inside the clause have their own FROM, which this loop reaches later
+            if _read_from_clause(words, i + 1, tables) is None:
+                return []
+    return [name for name in dict.fromkeys(tables) if name not in ctes]
+
+
+# FROM inside these calls is an argument separator, as in EXTRACT(year FROM created_at)
+_FROM_CALLS = frozenset(("extract", "substring", "trim", "overlay", "position"))
+_JOIN_WORDS = frozenset(("join", "inner", "left", "right", "full", "outer", "cross", "natural"))
+_CLAUSE_WORDS = frozenset((
+    ")", ";", "where", "group", "having", "window", "order", "limit", "offset", "fetch", "for",
+    "union", "intersect", "except", "returning"
+))
+_NOT_ALIASES = _JOIN_WORDS | _CLAUSE_WORDS | {"on", "using", "from", "with", "tablesample"}
+
+
+def _read_from_clause(words: List[str], i: int, tables: List[str]) -> Optional[int]:
+    """Collect table names from a FROM list and its joins, returning where the list ends or None if unsure"""
+    while True:
+        i = _read_from_item(words, i, tables)
+        while i is not None and i < len(words) and words[i] in _JOIN_WORDS:
+            while i < len(words) and words[i] in _JOIN_WORDS - {"join"}:
+                i += 1
+            if i == len(words) or words[i] != "join":
+                return None
+            i = _read_from_item(words, i + 1, tables)
+            if i is not None and i < len(words) and words[i] in ("on", "using"):
+                i = _skip_condition(words, i + 1)
+        if i is None:
+            return None
+        if i < len(words) and words[i] == ",":
+            i += 1
+            continue
+        return i if i == len(words) or words[i] in _CLAUSE_WORDS else None
+
+
+def _read_from_item(words: List[str], i: int, tables: List[str]) -> Optional[int]:
+    while i < len(words) and words[i] in ("lateral", "only"):
+        i += 1
+    if i == len(words):
+        return None
+
+    if words[i] == "(":
+        end = _closing_paren(words, i)
+        if end is None:
+            return None
+        if words[i + 1] not in ("select", "with", "values", "table") and _read_from_clause(words, i + 1, tables) != end:
+            return None
+        i = end + 1
+    elif _NAME_PATTERN.fullmatch(words[i]):
+        name = words[i]
+        i += 1
+        while i + 1 < len(words) and words[i] == "." and _NAME_PATTERN.fullmatch(words[i + 1]):
+            name += "." + words[i + 1]
+            i += 2
+        if i < len(words) and words[i] == "(":
+            # Set-returning function such as generate_series(1, 10)
+            i = _closing_paren(words, i)
+            if i is None:
+                return None
+            i += 1
+        else:
+            tables.append(name)
+    else:
+        return None
+
+    if i < len(words) and words[i] == "as":
+        i += 1
+    if i < len(words) and words[i] not in _NOT_ALIASES and _NAME_PATTERN.fullmatch(words[i]):
+        i += 1
+        if i < len(words) and words[i] == "(":
+            i = _closing_paren(words, i)
+            if i is None:
+                return None
+            i += 1
+    return i
+
+
+def _skip_condition(words: List[str], i: int) -> int:
+    while i < len(words) and words[i] not in _JOIN_WORDS and words[i] not in _CLAUSE_WORDS and words[i] != ",":
+        if words[i] == "(":
+            end = _closing_paren(words, i)
+            if end is None:
+                return len(words)
+            i = end
+        i += 1
+    return i
+
+
+def _closing_paren(words: List[str], i: int) -> Optional[int]:
+    depth = 0
+    for j in range(i, len(words)):
+        if words[j] == "(":
+            depth += 1
+        elif words[j] == ")":
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+# Words that turn a following string into a typed literal, which cannot take a parameter
+_TYPED_LITERAL_PREFIX = re.compile(r"\b(?:date|time|timestamp|timestamptz|interval|zone)\s*$")
+# Numbers inside type modifiers such as ::numeric(10, 2) or AS varchar(20)
+_TYPE_MODIFIER_PREFIX = re.compile(r"(?:::|\bas)\s*[a-z_][a-z0-9_ ]*\(\s*(?:\d+\s*,\s*)*$")
+_NUMBER_PATTERN = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])")
+_POSITIONAL_CLAUSE = re.compile(r"\b(?:order|group)\s+by\b")
+_CLAUSE_END = re.compile(r"\b(?:limit|offset|having|window|union|intersect|except|fetch|for)\b|\)")
+
+
+def extract_literals(sql: str) -> Tuple[str, List[Any]]:
+    """Replace constants with $n placeholders, returning the template and the extracted values"""
+    normalized = normalize_sql(sql)
+    params: List[Any] = []
+    parts = []
+    position = 0
+
+    for match in _TOKEN_PATTERN.finditer(normalized):
+        code = normalized[position:match.start()]
+        prefix = "".join(parts) + code
+        parts.append(_parameterize_numbers(code, prefix[:len(prefix) - len(code)], params))
+        token = match.group(0)
+        if match.lastgroup == "string" and token[0] == "'" and not _TYPED_LITERAL_PREFIX.search(prefix):
+            params.append(token[1:-1].replace("''", "'"))
+            parts.append(f"${len(params)}")
+        else:
+            parts.append(token)
+        position = match.end()
+
+    prefix = "".join(parts)
+    parts.append(_parameterize_numbers(normalized[position:], prefix, params))
+    return "".join(parts), params
+
+
+def _parameterize_numbers(code: str, prefix: str, params: List[Any]) -> str:
+    result = []
+    position = 0
+    for match in _NUMBER_PATTERN.finditer(code):
+        before = prefix + code[:match.start()]
+        if _in_positional_clause(before) or _TYPE_MODIFIER_PREFIX.search(before):
+            continue
+        text = match.group(0)
+        params.append(int(text) if text.isdigit() else Decimal(text))
+        result.append(code[position:match.start()])
+        result.append(f"${len(params)}")
+        position = match.end()
+    result.append(code[position:])
+    return "".join(result)
+
+
+def _in_positional_clause(before: str) -> bool:
+    # ORDER BY 1 / GROUP BY 2 refer to output columns, so those numbers must stay literal
+    clauses = list(_POSITIONAL_CLAUSE.finditer(before))
+    if not clauses:
+        return False
+    return not _CLAUSE_END.search(before, clauses[-1].end())
+
+
+def bind_parameters(template: str, params: List[Any]) -> Tuple[str, List[Any]]:
+    """Rewrite $n placeholders as psycopg2 %s parameters, escaping literal percent signs"""
+    ordered = []
+    parts = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(template):
+        parts.append(_bind_code(template[position:match.start()], params, ordered))
+        parts.append(match.group(0).replace("%", "%%"))
+        position = match.end()
+    parts.append(_bind_code(template[position:], params, ordered))
+    return "".join(parts), ordered
+
+
+def _bind_code(code: str, params: List[Any], ordered: List[Any]) -> str:
+    def replace(match):
+        ordered.append(params[int(match.group(1)) - 1])
+        return "%s"
+    return re.sub(r"\$(\d+)", replace, code.replace("%", "%%"))
@@ -0,0 +1,135 @@
+"""
+Suggested question prefetch
+Generates, validates and caches SQL for suggested questions in the background, keyed by schema fingerprint
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.schemas import SchemaResponse
+from app.services.database_service import DatabaseService
+from app.services.llm_service import LLMService
+from app.services.sql_text import is_read_only, is_single_statement
+from app.core.config import config
+from app.core.metrics import CACHE_REQUESTS
+
+PrefetchKey = Tuple[str, str, str]
+
+
+def schema_fingerprint(schema: SchemaResponse) -> str:
+    """Stable hash of the tables, columns and relationships; row counts are left out"""
+    shape = {
+        "tables": sorted(
+            [table.name, [column.model_dump() for column in table.columns]]
+            for table in schema.tables
+        ),
+        "relationships": sorted(json.dumps(rel, sort_keys=True) for rel in schema.relationships)
+    }
+    return hashlib.sha1(json.dumps(shape, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question.strip().strip("\"'").rstrip("?").strip().lower())
+
+
+@dataclass
+class PrefetchedQuery:
+    question: str
+    sql: str
+    explanation: str
+    safety_warnings: List[str] = field(default_factory=list)
+    preview: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+
+    def fresh_preview(self) -> Optional[Dict[str, Any]]:
+        """Cached preview rows, or None once they are older than SUGGESTION_PREVIEW_TTL"""
+        if self.preview is None or time.time() - self.created_at > config.SUGGESTION_PREVIEW_TTL:
+            return None
+        return self.preview
+
+
+class SuggestionPrefetcher:
+    """LRU cache of validated SQL for suggested questions, filled by background workers"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or config.SUGGESTION_CACHE_SIZE
+        self._entries: "OrderedDict[PrefetchKey, PrefetchedQuery]" = OrderedDict()
+        self._in_progress = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.SUGGESTION_PREFETCH_WORKERS, thread_name_prefix="suggestion-prefetch"
+        )
+
+    def schedule(self, database_url: str, schema: SchemaResponse, questions: List[str]) -> str:
+        """Queue SQL generation for questions that are not cached yet; returns the schema fingerprint"""
+        fingerprint = schema_fingerprint(schema)
+        for question in questions:
+            key = (database_url, fingerprint, normalize_question(question))
+            with self._lock:
+                if key in self._in_progress or self._fresh(key) is not None:
+                    continue
+                self._in_progress.add(key)
+            self._executor.submit(self._prefetch, key, database_url, schema, question)
+        return fingerprint
+
+    def lookup(self, database_url: str, schema: SchemaResponse, question: str) -> Optional[PrefetchedQuery]:
+        key = (database_url, schema_fingerprint(schema), normalize_question(question))
+        with self._lock:
+            entry = self._fresh(key)
+        CACHE_REQUESTS.labels("suggestion", "miss" if entry is None else "hit").inc()
+        return entry
+
+    def _fresh(self, key: PrefetchKey) -> Optional[PrefetchedQuery]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.created_at > config.SUGGESTION_CACHE_TTL:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _prefetch(self, key: PrefetchKey, database_url: str, schema: SchemaResponse, question: str):
+        try:
+            generated = LLMService().generate_sql(question, schema)
+            sql = generated.sql.strip()
+            # Only statements that could be previewed safely are worth serving without review
+            if not (is_read_only(sql) and is_single_statement(sql)):
+                return
+            error = DatabaseService.explain_query(database_url, sql, config.PREVIEW_TIMEOUT)
+            if error is not None:
+                print(f"Prefetched SQL for {question!r} failed EXPLAIN: {error}")
+                return
+
+            preview = None
+            if config.SUGGESTION_PREFETCH_PREVIEW:
+                result = DatabaseService.preview_query(database_url, sql)
+                preview = result.model_dump() if result.success else None
+
+            entry = PrefetchedQuery(
+                question=question,
+                sql=sql,
+                explanation=generated.explanation,
+                safety_warnings=generated.safety_warnings,
+                preview=preview
+            )
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"Prefetch for {question!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_progress.discard(key)
+
+
+suggestion_prefetcher = SuggestionPrefetcher()
@@ -0,0 +1,69 @@
+"""
+JSON-ready typecasters
+psycopg2 casters that decode column values straight into JSON primitives while rows are fetched
+"""
+
+import json
+import re
+
+import psycopg2.extensions
+
+_TZ_HOURS_ONLY = re.compile(r"[+-]\d{2}$")
+
+
+def _cast_timestamp(value, cursor):
+    if value is None or value[0] not in "0123456789":
+        # NULL, infinity and BC dates pass through as text
+        return value
+    value = value.replace(" ", "T", 1)
+    if _TZ_HOURS_ONLY.search(value):
+        value += ":00"
+    return value
+
+
+def _cast_text(value, cursor):
+    return value
+
+
+def _cast_json(value, cursor):
+    return None if value is None else json.loads(value)
+
+
+def _cast_bytea(value, cursor):
+    # bytea arrives in hex output format; drop the \x prefix like bytes.hex()
+    if value is None:
+        return None
+    return value[2:] if value.startswith("\\x") else value
+
+
+def _make_types():
+    types = []
+    for oids, array_oid, name, caster in (
+        # numeric stays its exact text form, as the native path encodes Decimal; a float would round it
+        ((1700,), 1231, "JSON_NUMERIC", _cast_text),
+        ((1114,), 1115, "JSON_TIMESTAMP", _cast_timestamp),
+        ((1184,), 1185, "JSON_TIMESTAMPTZ", _cast_timestamp),
+        ((1082,), 1182, "JSON_DATE", _cast_text),
+        ((1083,), 1183, "JSON_TIME", _cast_text),
+        ((1266,), 1270, "JSON_TIMETZ", _cast_text),
+        ((2950,), 2951, "JSON_UUID", _cast_text),
+        ((114,), 199, "JSON_JSON", _cast_json),
+        ((3802,), 3807, "JSON_JSONB", _cast_json),
+        ((17,), 1001, "JSON_BYTEA", _cast_bytea),
+    ):
+        base = psycopg2.extensions.new_type(oids, name, caster)
+        types.append(base)
+        types.append(psycopg2.extensions.new_array_type((array_oid,), f"{name}_ARRAY", base))
+    return types
+
+
+JSON_TYPES = _make_types()
+
+
+def register_json_typecasters(scope=None):
+    """Register the JSON-ready casters on a cursor or connection, or globally when scope is None"""
+    for caster in JSON_TYPES:
+        if scope is None:
+            psycopg2.extensions.register_type(caster)
+        else:
+            psycopg2.extensions.register_type(caster, scope)
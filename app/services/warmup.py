@@ -0,0 +1,53 @@
+"""
+Server warm-up
+Opens pooled connections, fills the schema cache and builds the shared LLM client before the server takes traffic
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import psycopg2.extensions
+
+from app.core.config import config
+from app.services.connection_pool import pool_manager
+from app.services.database_service import DatabaseService
+from app.services.llm_service import _shared_client
+from app.services.replica_router import replica_router
+
+
+def _label(database_url: str) -> str:
+    """host/dbname for logs, so credentials in the DSN are never printed"""
+    try:
+        params = psycopg2.extensions.parse_dsn(database_url)
+    except psycopg2.ProgrammingError:
+        # DSN group names aren't DSNs
+        return database_url
+    return f"{params.get('host', 'localhost')}/{params.get('dbname', '')}"
+
+
+def warm_up(database_urls: Optional[List[str]] = None, pool_connections: Optional[int] = None) -> Dict[str, Any]:
+    """Warm everything a first request would otherwise pay for; failures are reported, never raised"""
+    database_urls = config.WARMUP_DATABASE_URLS if database_urls is None else database_urls
+    pool_connections = config.WARMUP_POOL_CONNECTIONS if pool_connections is None else pool_connections
+    start = time.perf_counter()
+    summary: Dict[str, Any] = {"databases": {}}
+
+    try:
+        _shared_client()
+        summary["llm_client"] = True
+    except Exception as e:
+        print(f"Warm-up: LLM client unavailable: {e}")
+        summary["llm_client"] = False
+
+    for database_url in database_urls:
+        label = _label(database_url)
+        try:
+            opened = pool_manager.get(replica_router.primary(database_url)).warm(pool_connections)
+            schema = DatabaseService.get_cached_schema_info(database_url)
+            summary["databases"][label] = {"connections": opened, "tables": len(schema.tables)}
+        except Exception as e:
+            print(f"Warm-up: {label} failed: {e}")
+            summary["databases"][label] = {"error": str(e)}
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+End-to-end /api/generate-query benchmark with a stubbed LLM
+Measures the service's own overhead: schema lookup, agents, EXPLAIN validation and preview
+"""
+
+import json
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from benchmarks.bench_schema import create_tables
+from benchmarks.common import time_calls
+from benchmarks.llm_stub import patched_openai
+from benchmarks.local_postgres import fresh_database, local_postgres
+
+
+def run(database_url: str, requests: int = 100, tables: int = 10, llm_latency: float = 0.0) -> dict:
+    """Latency of generate-query with and without the speculative preview"""
+    dsn = fresh_database(database_url, "bench_generate_query")
+    create_tables(dsn, tables)
+    client = TestClient(app)
+    results = {}
+
+    with patched_openai(llm_latency):
+        for preview in (False, True):
+            payload = {
+                "natural_language": "Show the latest rows of t_0003",
+                "database_url": dsn,
+                "preview": preview
+            }
+
+            def call():
+                response = client.post("/api/generate-query", json=payload)
+                if response.status_code != 200 or not response.json()["validation"]["valid"]:
+                    raise RuntimeError(response.text)
+
+            results["preview" if preview else "no_preview"] = time_calls(call, requests)
+    return results
+
+
+if __name__ == "__main__":
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with local_postgres() as url:
+        report = run(url, request_count)
+
+    for name, r in report.items():
+        print(f"{name:>11}: p50 {r['p50_ms']:7.1f}ms  p95 {r['p95_ms']:7.1f}ms")
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Prompt building and SQL heuristics benchmark
+Times LLMService's schema formatting and its query type, safety and row estimate heuristics without a database
+"""
+
+import json
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.schemas import ColumnInfo, SchemaResponse, TableInfo
+from app.services.llm_service import LLMService
+from benchmarks.common import time_calls
+
+# Mix of shapes the heuristics branch on: LIMIT, WHERE, JOIN, writes and large tables
+SAMPLE_SQL = [
+    "SELECT * FROM t_0001 LIMIT 10",
+    "SELECT name, amount FROM t_0002 WHERE amount > 100",
+    "SELECT a.name, b.amount FROM t_0003 a JOIN t_0004 b ON b.parent_id = a.id",
+    "SELECT count(*) FROM t_0005",
+    "DELETE FROM t_0006 WHERE id = 1",
+    "UPDATE t_0007 SET name = 'x'",
+    "SELECT * FROM t_0008 ORDER BY created_at DESC",
+    "WITH recent AS (SELECT * FROM t_0009 WHERE created_at > now() - interval '1 day') SELECT * FROM recent",
+]
+
+
+def synthetic_schema(tables: int, columns: int = 8) -> SchemaResponse:
+    """Schema shaped like bench_schema's tables, with every other table large"""
+    return SchemaResponse(
+        tables=[
+            TableInfo(
+                name=f"t_{i:04d}",
+                row_count=50000 if i % 2 else 100,
+                columns=[
+                    ColumnInfo(
+                        name="id" if c == 0 else f"column_{c}",
+                        data_type="integer" if c < 2 else "character varying",
+                        is_nullable=c > 1,
+                        is_primary_key=c == 0,
+                        is_foreign_key=c == 1 and i > 0,
+                        foreign_table=f"t_{i - 1:04d}" if c == 1 and i > 0 else None,
+                        foreign_column="id" if c == 1 and i > 0 else None
+                    )
+                    for c in range(columns)
+                ]
+            )
+            for i in range(tables)
+        ],
+        relationships=[
+            {"from_table": f"t_{i:04d}", "from_column": "column_1", "to_table": f"t_{i - 1:04d}", "to_column": "id"}
+            for i in range(1, tables)
+        ]
+    )
+
+
+def run(sizes=(10, 100, 1000), repeats: int = 50) -> dict:
+    """Latency of prompt formatting per schema size, and of the heuristics over SAMPLE_SQL"""
+    service = LLMService()
+    results = {}
+
+    for size in sizes:
+        schema = synthetic_schema(size)
+        results[f"format_schema_{size}"] = time_calls(lambda: service._format_schema_for_prompt(schema), repeats)
+        results[f"build_prompt_{size}"] = time_calls(
+            lambda: service._build_prompt("Who are our top customers by revenue?", schema), repeats
+        )
+
+        def heuristics():
+            for sql in SAMPLE_SQL:
+                service._detect_query_type(sql)
+                service._analyze_query_safety(sql, schema)
+                service._estimate_result_rows(sql, schema)
+
+        timing = time_calls(heuristics, repeats)
+        results[f"heuristics_{size}"] = {**timing, "us_per_statement": timing["p50_ms"] * 1000 / len(SAMPLE_SQL)}
+    return results
+
+
+if __name__ == "__main__":
+    table_sizes = tuple(int(n) for n in sys.argv[1:]) or (10, 100, 1000)
+    report = run(table_sizes)
+
+    for name, r in report.items():
+        print(f"{name:>20}: p50 {r['p50_ms']:8.3f}ms  p95 {r['p95_ms']:8.3f}ms")
+    print(json.dumps(report, indent=2))
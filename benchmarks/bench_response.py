@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark for /api/execute-query
+Compares the validated response path against fast_response for a 1000-row result
+"""
+
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from benchmarks.bench_serialization import WIDE_QUERY
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(database_url: str, rows: int = 1000, requests: int = 200) -> dict:
+    """Time repeated requests for each response path, reporting latency percentiles in ms"""
+    client = TestClient(app)
+    sql = WIDE_QUERY.format(rows=rows)
+    results = {}
+
+    for encoding in ("native", "json"):
+        for fast in (False, True):
+            payload = {
+                "sql": sql,
+                "database_url": database_url,
+                "result_encoding": encoding,
+                "fast_response": fast
+            }
+            client.post("/api/execute-query", json=payload)  # warm up
+
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.post("/api/execute-query", json=payload)
+                samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(response.text)
+
+            results[f"{encoding}{'_fast' if fast else ''}"] = {
+                "p50_ms": _percentile(samples, 0.50),
+                "p95_ms": _percentile(samples, 0.95),
+                "p99_ms": _percentile(samples, 0.99),
+                "bytes": len(response.content)
+            }
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/bench_response.py <database_url> [rows] [requests]")
+        sys.exit(1)
+
+    row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    request_count = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    report = run(sys.argv[1], row_count, request_count)
+
+    for name, r in report.items():
+        print(f"{name:>11}: p50 {r['p50_ms']:7.1f}ms  p95 {r['p95_ms']:7.1f}ms  p99 {r['p99_ms']:7.1f}ms")
+    print(json.dumps(report, indent=2))
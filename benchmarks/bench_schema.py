@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Schema introspection benchmark
+Times DatabaseService.get_schema_info against databases of increasing table counts
+"""
+
+import json
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+from app.services.database_service import DatabaseService
+from benchmarks.common import time_calls
+from benchmarks.local_postgres import fresh_database, local_postgres
+
+
+def create_tables(database_url: str, tables: int, rows: int = 10):
+    """Chain of tables t_0000..t_N, each with a foreign key to the previous one and a few rows"""
+    with psycopg2.connect(database_url) as conn:
+        cursor = conn.cursor()
+        for i in range(tables):
+            parent = f"REFERENCES t_{i - 1:04d}(id)" if i else ""
+            cursor.execute(f"""
+                CREATE TABLE t_{i:04d} (
+                    id INTEGER PRIMARY KEY,
+                    parent_id INTEGER {parent},
+                    name VARCHAR(100) NOT NULL,
+                    amount NUMERIC(12, 2),
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    attributes JSONB
+                );
+                INSERT INTO t_{i:04d} (id, parent_id, name, amount, attributes)
+                SELECT g, {"g" if i else "NULL"}, 'row ' || g, g * 1.5, jsonb_build_object('g', g)
+                FROM generate_series(1, {rows}) AS g;
+            """)
+
+
+def run(database_url: str, sizes=(10, 100, 1000), repeats: int = 3) -> dict:
+    """Introspect a fresh database per size, reporting latency per call and per table"""
+    results = {}
+    for size in sizes:
+        dsn = fresh_database(database_url, f"bench_schema_{size}")
+        create_tables(dsn, size)
+        timing = time_calls(lambda: DatabaseService.get_schema_info(dsn), repeats)
+        results[f"tables_{size}"] = {**timing, "ms_per_table": timing["p50_ms"] / size}
+    return results
+
+
+if __name__ == "__main__":
+    table_sizes = tuple(int(n) for n in sys.argv[1:]) or (10, 100, 1000)
+    with local_postgres() as url:
+        report = run(url, table_sizes)
+
+    for name, r in report.items():
+        print(f"{name:>11}: p50 {r['p50_ms']:9.1f}ms  ({r['ms_per_table']:.2f}ms per table)")
+    print(json.dumps(report, indent=2))
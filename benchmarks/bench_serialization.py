@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for execute_query results
+Compares native driver types against JSON-ready typecasters on a wide result
+"""
+
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.schemas import ResultEncoding
+from app.services.database_service import DatabaseService
+
+# Wide row covering the typecasters' types; bytea is left out because the native
+# path cannot JSON-encode memoryview values at all
+WIDE_QUERY = """
+    SELECT
+        g AS id,
+        (g * 1.25)::numeric(12, 2) AS amount,
+        (g % 1000)::numeric AS whole_amount,
+        'customer ' || g AS name,
+        timestamp '2024-01-01' + g * interval '1 minute' AS created_at,
+        timestamptz '2024-01-01 00:00:00+00' + g * interval '1 second' AS updated_at,
+        date '2024-01-01' + (g % 365) AS order_date,
+        md5(g::text)::uuid AS external_id,
+        jsonb_build_object('rank', g % 10, 'tags', jsonb_build_array('a', 'b')) AS attributes
+    FROM generate_series(1, {rows}) AS g
+"""
+
+NARROW_QUERY = """
+    SELECT g AS id, 'customer ' || g AS name
+    FROM generate_series(1, {rows}) AS g
+"""
+
+QUERIES = {"wide": WIDE_QUERY, "narrow": NARROW_QUERY}
+
+
+def _measure(database_url: str, sql: str, rows: int, encoding: ResultEncoding, direct: bool) -> dict:
+    start = time.perf_counter()
+    response = DatabaseService.execute_query(
+        database_url, sql, max_rows=rows, timeout_seconds=600, result_encoding=encoding
+    )
+    fetched = time.perf_counter()
+    if not response.success:
+        raise RuntimeError(response.error)
+
+    if direct:
+        # JSON-ready rows can skip the jsonable_encoder walk entirely
+        body = json.dumps(response.model_dump())
+    else:
+        # Same work FastAPI does for a response_model return value
+        body = json.dumps(jsonable_encoder(response))
+    encoded = time.perf_counter()
+
+    return {
+        "fetch_seconds": fetched - start,
+        "encode_seconds": encoded - fetched,
+        "total_seconds": encoded - start,
+        "bytes": len(body)
+    }
+
+
+def run(database_url: str, rows: int = 100000, repeats: int = 3, shape: str = "wide") -> dict:
+    """Fetch and JSON-encode a wide or narrow result with each encoding, reporting rows/sec"""
+    sql = QUERIES[shape].format(rows=rows)
+    variants = {
+        "native": (ResultEncoding.NATIVE, False),
+        "json": (ResultEncoding.JSON, False),
+        "json_direct": (ResultEncoding.JSON, True),
+    }
+    results = {}
+
+    for name, (encoding, direct) in variants.items():
+        timings = [_measure(database_url, sql, rows, encoding, direct) for _ in range(repeats)]
+        best = min(timings, key=lambda t: t["total_seconds"])
+        results[name] = {
+            **best,
+            "rows": rows,
+            "rows_per_sec": rows / best["total_seconds"]
+        }
+
+    for name in ("json", "json_direct"):
+        results[name]["speedup"] = results[name]["rows_per_sec"] / results["native"]["rows_per_sec"]
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/bench_serialization.py <database_url> [rows] [wide|narrow]")
+        sys.exit(1)
+
+    row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    result_shape = sys.argv[3] if len(sys.argv) > 3 else "wide"
+    report = run(sys.argv[1], row_count, shape=result_shape)
+
+    for name, r in report.items():
+        speedup = f", {r['speedup']:.2f}x" if "speedup" in r else ""
+        print(f"{name:>11}: {r['rows_per_sec']:>10,.0f} rows/sec "
+              f"(fetch {r['fetch_seconds']:.2f}s, encode {r['encode_seconds']:.2f}s{speedup})")
+    print(json.dumps(report, indent=2))
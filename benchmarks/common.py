@@ -0,0 +1,30 @@
+"""
+Timing helpers shared by the benchmarks
+"""
+
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_calls(func: Callable[[], object], repeats: int, warmup: int = 1) -> Dict[str, float]:
+    """Call func repeatedly after warming up, reporting latency in ms"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": min(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "mean_ms": statistics.fmean(samples),
+        "repeats": repeats
+    }
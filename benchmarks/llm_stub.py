@@ -0,0 +1,109 @@
+"""
+Deterministic stand-in for the OpenAI chat completions API
+Rule-based replies to each prompt the services send, so agent pipelines run without network access
+"""
+
+import json
+import re
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import openai
+
+from app.services import llm_service
+
+# Matches the table lines of every schema format the prompts use:
+# "Table users: ..." (agents), "Table: users (...)" (LLMService), "Table 'users' with ..." (suggestions)
+_TABLE_NAME = re.compile(r"Table:?\s+'?([A-Za-z_]\w*)")
+_QUESTION = re.compile(r"(?:Request:|NATURAL LANGUAGE REQUEST:)\s*(.+)")
+
+
+def _question(prompt: str) -> str:
+    match = _QUESTION.search(prompt)
+    return match.group(1).strip() if match else ""
+
+
+def stub_sql(prompt: str) -> str:
+    """A valid query on the table the question names, else on the first table in the schema"""
+    tables = _TABLE_NAME.findall(prompt)
+    if not tables:
+        return "SELECT 1"
+    question = _question(prompt).lower()
+    table = next((t for t in tables if t.lower() in question or t.lower().rstrip("s") in question), tables[0])
+    return f"SELECT * FROM {table} LIMIT 10"
+
+
+def reply_for(messages: List[Dict[str, str]]) -> str:
+    """Canned reply for a chat request, chosen by which service prompt it is"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+
+    if "Return JSON with sql" in prompt:
+        body = {"sql": stub_sql(prompt), "explanation": "Stub query", "query_type": "select"}
+        return f"```json\n{json.dumps(body)}\n```"
+    if "Return only the corrected SQL" in prompt or "Return only the SQL query" in prompt:
+        return stub_sql(prompt)
+    if "complexity_score" in prompt:
+        return json.dumps({
+            "complexity_score": 2,
+            "performance_estimate": "fast",
+            "bottlenecks": [],
+            "optimizations": []
+        })
+    if "safety issues" in prompt:
+        return ""
+    if "business insights" in prompt:
+        return "- Shows the most recent records\n- Useful for spotting new activity"
+    if "questions" in prompt:
+        tables = _TABLE_NAME.findall(prompt) or ["records"]
+        return "\n".join(f"- How many {table} were created this week?" for table in tables[:8])
+    return "OK"
+
+
+def completion(messages: List[Dict[str, str]], model: str, content: Optional[str] = None) -> SimpleNamespace:
+    """Response object shaped like openai's ChatCompletion, with rough token counts"""
+    content = reply_for(messages) if content is None else content
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return SimpleNamespace(
+        id="chatcmpl-stub",
+        model=model,
+        choices=[SimpleNamespace(
+            index=0,
+            finish_reason="stop",
+            message=SimpleNamespace(role="assistant", content=content)
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+    )
+
+
+class StubOpenAI:
+    """In-process replacement for openai.OpenAI exposing chat.completions.create"""
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model: str = "stub", **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return completion(messages, model)
+
+
+@contextmanager
+def patched_openai(latency: float = 0.0):
+    """Every LLMService created inside the block talks to StubOpenAI"""
+    original = openai.OpenAI
+    openai.OpenAI = lambda **kwargs: StubOpenAI(latency)
+    # LLMService shares clients, so drop any built before (or during) the patch
+    llm_service._clients.clear()
+    try:
+        yield
+    finally:
+        openai.OpenAI = original
+        llm_service._clients.clear()
@@ -0,0 +1,99 @@
+"""
+Throwaway local Postgres for benchmarks
+Uses BENCH_DATABASE_URL when set, otherwise starts a temporary cluster with pgserver or initdb/pg_ctl
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+import psycopg2
+import psycopg2.extensions
+
+try:
+    import pgserver
+except ImportError:  # pragma: no cover - pgserver is optional
+    pgserver = None
+
+
+def _postgres_bin(name: str) -> str:
+    """Locate a server binary via PG_BIN, PATH or pg_config --bindir"""
+    candidates = []
+    if os.getenv("PG_BIN"):
+        candidates.append(os.path.join(os.environ["PG_BIN"], name))
+    if shutil.which(name):
+        candidates.append(shutil.which(name))
+    if shutil.which("pg_config"):
+        bindir = subprocess.run(["pg_config", "--bindir"], capture_output=True, text=True).stdout.strip()
+        candidates.append(os.path.join(bindir, name))
+    for path in candidates:
+        if os.access(path, os.X_OK):
+            return path
+    raise RuntimeError(
+        f"Cannot find {name}: set BENCH_DATABASE_URL, install pgserver, or put the Postgres binaries on PATH"
+    )
+
+
+@contextmanager
+def _pg_ctl_cluster(data_dir: str) -> Iterator[str]:
+    pg_ctl = _postgres_bin("pg_ctl")
+    subprocess.run(
+        [_postgres_bin("initdb"), "-D", data_dir, "-U", "postgres", "-A", "trust", "--no-sync"],
+        check=True, capture_output=True
+    )
+    # Unix socket only, inside the data directory, so runs never collide on a port
+    options = f"-k {data_dir} -c listen_addresses='' -c fsync=off"
+    subprocess.run(
+        [pg_ctl, "-D", data_dir, "-o", options, "-l", os.path.join(data_dir, "server.log"), "-w", "start"],
+        check=True, capture_output=True
+    )
+    try:
+        yield f"postgresql://postgres@/postgres?host={data_dir}"
+    finally:
+        subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "-w", "stop"], capture_output=True)
+
+
+@contextmanager
+def local_postgres() -> Iterator[str]:
+    """Yield the DSN of a Postgres server for the duration of a benchmark run"""
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        yield url
+        return
+
+    data_dir = tempfile.mkdtemp(prefix="nl2sql-bench-")
+    try:
+        if pgserver is not None:
+            server = pgserver.get_server(os.path.join(data_dir, "pgdata"), cleanup_mode="stop")
+            try:
+                yield server.get_uri()
+            finally:
+                server.cleanup()
+        else:
+            with _pg_ctl_cluster(os.path.join(data_dir, "pgdata")) as url:
+                yield url
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def fresh_database(database_url: str, name: str) -> str:
+    """(Re)create an empty database next to database_url and return its DSN"""
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{name}";')
+        cursor.execute(f'CREATE DATABASE "{name}";')
+    finally:
+        conn.close()
+    return psycopg2.extensions.make_dsn(database_url, dbname=name)
+
+
+def server_version(database_url: str) -> str:
+    with psycopg2.connect(database_url) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW server_version;")
+        return cursor.fetchone()[0]
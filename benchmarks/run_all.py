@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite runner
+Runs the hot-path benchmarks against a throwaway local Postgres and writes JSON that can be compared between commits
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import bench_generate_query, bench_prompt, bench_response, bench_schema, bench_serialization
+from benchmarks.local_postgres import local_postgres, server_version
+
+
+def _serialization(url: str, quick: bool) -> dict:
+    results = {}
+    for shape in ("narrow", "wide"):
+        for rows in (1000, 10000 if quick else 100000):
+            results[f"{shape}_{rows}"] = bench_serialization.run(url, rows, repeats=3, shape=shape)
+    return results
+
+
+SUITES = {
+    "schema": lambda url, quick: bench_schema.run(url, (10, 100) if quick else (10, 100, 1000)),
+    "serialization": _serialization,
+    "prompt": lambda url, quick: bench_prompt.run((10, 100) if quick else (10, 100, 1000)),
+    "response": lambda url, quick: bench_response.run(url, 1000, 50 if quick else 200),
+    "generate_query": lambda url, quick: bench_generate_query.run(url, 20 if quick else 100),
+}
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _flatten(report: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Metrics that got worse by more than threshold: latency (_ms, _seconds) up or throughput (_per_sec) down"""
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    regressions = []
+    for path, before in sorted(old.items()):
+        after = new.get(path)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if path.endswith(("_ms", "_seconds")) and change > threshold:
+            regressions.append((path, before, after, change))
+        elif path.endswith("_per_sec") and -change > threshold:
+            regressions.append((path, before, after, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write the JSON report")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="run only these suites")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick
+        },
+        "results": {}
+    }
+
+    with local_postgres() as url:
+        report["meta"]["postgres"] = server_version(url)
+        for name in args.only or SUITES:
+            print(f"Running {name}...", flush=True)
+            start = time.perf_counter()
+            report["results"][name] = SUITES[name](url, args.quick)
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        print(f"\nCompared with {baseline['meta'].get('commit', '?')[:12]}: {len(regressions)} regression(s)")
+        for path, before, after, change in regressions:
+            print(f"  {path}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Accuracy and latency evals for the SQL generation pipelines
+"""
@@ -0,0 +1,159 @@
+"""
+Record/replay cassettes for LLM calls
+Each chat completion request is keyed by its content, so a replayed run sees exactly the responses,
+token counts and latencies that were recorded
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import openai
+
+from app.services import llm_service
+
+MODES = ("replay", "record", "auto")
+# Request fields that don't change the answer; the repair call passes its remaining time budget as timeout
+_UNKEYED = ("timeout", "stream")
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recorded response"""
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    keyed = {k: v for k, v in request.items() if k not in _UNKEYED}
+    return hashlib.sha256(json.dumps(keyed, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded chat completions, loaded from and saved to one JSON file"""
+
+    def __init__(self, path: str, mode: str = "replay", replay_latency: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.interactions: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        # Running totals the eval reads before and after each question
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_seconds": 0.0,
+                      "skipped_seconds": 0.0, "recorded": 0, "misses": 0}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.interactions = json.load(f)["interactions"]
+        elif mode == "replay":
+            raise FileNotFoundError(f"No cassette at {path}; record one first with --mode record or auto")
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"version": 1, "interactions": dict(sorted(self.interactions.items()))}, f, indent=1)
+        self.dirty = False
+
+    def create(self, request: Dict[str, Any], send: Callable[[], Any]):
+        """Recorded response for request, calling send and recording it when the mode allows"""
+        key = request_key(request)
+        with self._lock:
+            entry = None if self.mode == "record" else self.interactions.get(key)
+
+        if entry is None:
+            if self.mode == "replay":
+                with self._lock:
+                    self.usage["misses"] += 1
+                raise CassetteMiss(f"No recorded response for {request.get('model')} request {key}")
+            start = time.perf_counter()
+            response = send()
+            entry = {
+                "request": {k: v for k, v in request.items() if k not in _UNKEYED},
+                "response": {
+                    "model": getattr(response, "model", request.get("model")),
+                    "content": response.choices[0].message.content,
+                    "finish_reason": response.choices[0].finish_reason,
+                    "usage": _usage_dict(getattr(response, "usage", None))
+                },
+                "latency": time.perf_counter() - start
+            }
+            with self._lock:
+                self.interactions[key] = entry
+                self.dirty = True
+                self.usage["recorded"] += 1
+            skipped = 0.0
+        elif self.replay_latency:
+            time.sleep(entry["latency"])
+            skipped = 0.0
+        else:
+            skipped = entry["latency"]
+
+        usage = entry["response"]["usage"]
+        with self._lock:
+            self.usage["skipped_seconds"] += skipped
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += usage["prompt_tokens"]
+            self.usage["completion_tokens"] += usage["completion_tokens"]
+            self.usage["llm_seconds"] += entry["latency"]
+        return _completion(entry["response"])
+
+
+def _usage_dict(usage) -> Dict[str, int]:
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def _completion(response: Dict[str, Any]) -> SimpleNamespace:
+    """Recorded response shaped like openai's ChatCompletion"""
+    return SimpleNamespace(
+        id="chatcmpl-cassette",
+        model=response["model"],
+        choices=[SimpleNamespace(
+            index=0,
+            finish_reason=response["finish_reason"],
+            message=SimpleNamespace(role="assistant", content=response["content"])
+        )],
+        usage=SimpleNamespace(**response["usage"])
+    )
+
+
+class CassetteClient:
+    """Stands in for openai.OpenAI, building the real client only when a request has to be recorded"""
+
+    def __init__(self, cassette: Cassette, factory: Callable[[], Any]):
+        self.cassette = cassette
+        self._factory = factory
+        self._client: Optional[Any] = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        def send():
+            if self._client is None:
+                self._client = self._factory()
+            return self._client.chat.completions.create(**kwargs)
+
+        return self.cassette.create(kwargs, send)
+
+
+@contextmanager
+def use_cassette(cassette: Cassette, factory: Optional[Callable[..., Any]] = None):
+    """Every LLMService created inside the block reads from (and records to) cassette"""
+    original = openai.OpenAI
+    factory = factory or original
+    openai.OpenAI = lambda **kwargs: CassetteClient(cassette, lambda: factory(**kwargs))
+    # LLMService shares clients, so drop any built before (or during) the block
+    llm_service._clients.clear()
+    try:
+        yield cassette
+    finally:
+        openai.OpenAI = original
+        llm_service._clients.clear()
+        cassette.save()
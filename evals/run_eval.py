@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Text-to-SQL eval runner
+Asks each pipeline variant the question set against the demo schema, executes the SQL it generates and
+compares the rows with the gold query's. LLM calls go through a cassette, so replayed runs are deterministic.
+
+    # Record (or top up) the cassette against the configured model, then replay it offline
+    python evals/run_eval.py --mode auto
+    python evals/run_eval.py --output eval.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.schemas import ResultEncoding, SchemaResponse
+from app.services.agent_service import AgentContext, QueryAgent
+from app.services.database_service import DatabaseService
+from app.services.llm_service import LLMService
+from app.services.sql_text import is_read_only, is_single_statement
+from benchmarks.common import percentile
+from evals.cassette import MODES, Cassette, use_cassette
+
+EVALS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUESTIONS = os.path.join(EVALS_DIR, "questions.json")
+DEFAULT_CASSETTE = os.path.join(EVALS_DIR, "cassettes", "demo.json")
+QUERY_TIMEOUT = 10
+
+
+async def llm_service_sql(question: str, database_url: str, schema: SchemaResponse) -> str:
+    """Single prompt built by LLMService._build_prompt"""
+    return LLMService().generate_sql(question, schema).sql
+
+
+async def query_agent_sql(question: str, database_url: str, schema: SchemaResponse) -> str:
+    """QueryAgent as /api/generate-query runs it, EXPLAIN validation and repair included"""
+    context = AgentContext(
+        database_url=database_url,
+        user_id="eval",
+        session_id="eval",
+        query_history=[],
+        schema_info={
+            table.name: [{"name": col.name, "type": col.data_type} for col in table.columns]
+            for table in schema.tables
+        }
+    )
+    messages = await QueryAgent().process(context, {"natural_query": question})
+    return messages[0].metadata["sql"]
+
+
+VARIANTS: Dict[str, Callable[[str, str, SchemaResponse], Any]] = {
+    "llm_service": llm_service_sql,
+    "query_agent": query_agent_sql,
+}
+
+
+_NUMERIC_TEXT = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    # numeric columns arrive as exact text, so a ::float cast of the same value still matches
+    if isinstance(value, (int, float)) or (isinstance(value, str) and _NUMERIC_TEXT.fullmatch(value)):
+        return round(float(value), 2)
+    return str(value)
+
+
+def results_match(gold: List[List[Any]], rows: List[List[Any]], ordered: bool = False) -> bool:
+    """Some choice of generated columns, one per gold column, reproduces the gold rows
+
+    Column order, extra columns and (unless ordered) row order are ignored, so a query that also returns
+    the name next to a count still matches a gold query returning only the count. Rows are compared whole,
+    so values must stay paired the way the gold query pairs them.
+    """
+    if len(gold) != len(rows):
+        return False
+    if not gold:
+        return True
+
+    gold = [[_normalize(v) for v in row] for row in gold]
+    rows = [[_normalize(v) for v in row] for row in rows]
+
+    def column_key(column):
+        return tuple(column) if ordered else Counter(column)
+
+    def table_key(table):
+        return [tuple(row) for row in table] if ordered else Counter(map(tuple, table))
+
+    # A generated column can only stand in for a gold column holding the same values
+    generated = [column_key(column) for column in zip(*rows)]
+    candidates = [
+        [index for index, key in enumerate(generated) if key == column_key(column)]
+        for column in zip(*gold)
+    ]
+    expected = table_key(gold)
+
+    def assign(mapping):
+        if len(mapping) == len(candidates):
+            return table_key([[row[index] for index in mapping] for row in rows]) == expected
+        return any(
+            assign(mapping + [index]) for index in candidates[len(mapping)] if index not in mapping
+        )
+
+    return assign([])
+
+
+def _execute(database_url: str, sql: str):
+    """Rows of a read-only statement as lists, or the reason it couldn't run"""
+    if not (is_read_only(sql) and is_single_statement(sql)):
+        return None, "not a single read-only statement"
+    response = DatabaseService.execute_query(
+        database_url, sql, timeout_seconds=QUERY_TIMEOUT, result_encoding=ResultEncoding.JSON
+    )
+    if not response.success:
+        return None, response.error
+    return [list(row) for row in response.data], None
+
+
+async def evaluate(variant: str, questions: List[Dict[str, Any]], database_url: str,
+                   schema: SchemaResponse, cassette: Cassette,
+                   gold_rows: Dict[str, List[List[Any]]]) -> Dict[str, Any]:
+    """Per-question outcomes and summary figures for one variant"""
+    generate = VARIANTS[variant]
+    results = []
+    for item in questions:
+        before = dict(cassette.usage)
+        start = time.perf_counter()
+        sql = await generate(item["question"], database_url, schema)
+        wall = time.perf_counter() - start
+        used = {key: cassette.usage[key] - before[key] for key in before}
+
+        rows, error = _execute(database_url, sql)
+        results.append({
+            "id": item["id"],
+            "correct": rows is not None and results_match(gold_rows[item["id"]], rows, item.get("ordered", False)),
+            "sql": sql,
+            "error": error,
+            "cassette_misses": used["misses"],
+            "llm_calls": used["calls"],
+            "prompt_tokens": used["prompt_tokens"],
+            "completion_tokens": used["completion_tokens"],
+            "llm_ms": used["llm_seconds"] * 1000,
+            # Replays that skip the recorded wait still count it, so latency estimates a live run
+            "latency_ms": (wall + used["skipped_seconds"]) * 1000
+        })
+
+    latencies = [r["latency_ms"] for r in results]
+    correct = sum(r["correct"] for r in results)
+    return {
+        "accuracy": correct / len(results),
+        "correct": correct,
+        "questions": len(results),
+        "executed": sum(r["error"] is None for r in results),
+        "cassette_misses": sum(r["cassette_misses"] for r in results),
+        "prompt_tokens_per_question": statistics.fmean(r["prompt_tokens"] for r in results),
+        "completion_tokens_per_question": statistics.fmean(r["completion_tokens"] for r in results),
+        "llm_calls_per_question": statistics.fmean(r["llm_calls"] for r in results),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "mean_ms": statistics.fmean(latencies),
+        "llm_mean_ms": statistics.fmean(r["llm_ms"] for r in results),
+        "results": results
+    }
+
+
+async def run(database_url: str, questions: List[Dict[str, Any]], variants: List[str],
+              cassette: Cassette, factory: Optional[Callable[..., Any]] = None) -> Dict[str, Any]:
+    schema = DatabaseService.get_schema_info(database_url)
+    gold_rows = {}
+    for item in questions:
+        rows, error = _execute(database_url, item["gold_sql"])
+        if error is not None:
+            raise ValueError(f"Gold SQL for {item['id']} failed: {error}")
+        gold_rows[item["id"]] = rows
+
+    report = {"mode": cassette.mode, "cassette": cassette.path, "variants": {}}
+    with use_cassette(cassette, factory):
+        for variant in variants:
+            report["variants"][variant] = await evaluate(variant, questions, database_url, schema, cassette, gold_rows)
+    return report
+
+
+def setup_demo(database_url: str, seed: int):
+    """Recreate the demo tables with seeded data, so prompts (which include row counts) match the cassette"""
+    from scripts.setup_demo_db import create_demo_database
+    random.seed(seed)
+    create_demo_database(database_url)
+
+
+def print_summary(report: Dict[str, Any]):
+    print(f"\n{'variant':<14}{'accuracy':>10}{'executed':>10}{'tokens/q':>10}{'calls/q':>9}{'p50':>9}{'p95':>9}{'llm':>9}")
+    for name, s in report["variants"].items():
+        tokens = s["prompt_tokens_per_question"] + s["completion_tokens_per_question"]
+        print(f"{name:<14}{s['correct']:>5}/{s['questions']:<4}{s['executed']:>6}/{s['questions']:<3}"
+              f"{tokens:>10.0f}{s['llm_calls_per_question']:>9.1f}"
+              f"{s['p50_ms']:>7.0f}ms{s['p95_ms']:>7.0f}ms{s['llm_mean_ms']:>7.0f}ms")
+        if s["cassette_misses"]:
+            print(f"  {s['cassette_misses']} LLM calls missing from the cassette; re-run with --mode auto to record them")
+        for r in s["results"]:
+            if not r["correct"]:
+                print(f"  x {r['id']}: {r['error'] or 'wrong result'} -- {r['sql']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text-to-SQL accuracy and latency eval")
+    parser.add_argument("--database-url", help="demo database; default is a throwaway local Postgres")
+    parser.add_argument("--setup", action="store_true", help="recreate the demo tables in --database-url first")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSON question set with gold SQL")
+    parser.add_argument("--variants", nargs="+", choices=sorted(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--mode", choices=MODES, default="replay",
+                        help="replay only, record everything afresh, or replay and record what is missing")
+    parser.add_argument("--replay-latency", action="store_true", help="sleep for each recorded LLM latency")
+    parser.add_argument("--seed", type=int, default=7, help="seed for the demo data")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    with open(args.questions) as f:
+        questions = json.load(f)
+    cassette = Cassette(args.cassette, args.mode, args.replay_latency)
+
+    if args.database_url:
+        if args.setup:
+            setup_demo(args.database_url, args.seed)
+        report = asyncio.run(run(args.database_url, questions, args.variants, cassette))
+    else:
+        from benchmarks.local_postgres import fresh_database, local_postgres
+        with local_postgres() as url:
+            dsn = fresh_database(url, "eval_demo")
+            setup_demo(dsn, args.seed)
+            report = asyncio.run(run(dsn, questions, args.variants, cassette))
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for scale testing
+Builds rows in vectorized NumPy batches and bulk loads them with COPY FROM STDIN, one table per worker.
+Each table gets foreign keys to earlier tables, and key and category values can follow a Zipf skew.
+
+    python scripts/generate_data.py postgresql://... --tables 1000 --rows 1000:1000000 --fanout 2 --skew 1.1
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+import psycopg2
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by this script
+    np = None
+
+CATEGORIES = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+              "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa"]
+# created_at values fall in the three years before this instant
+EPOCH_END = "2025-01-01T00:00:00"
+SPAN_SECONDS = 3 * 365 * 86400
+
+
+@dataclass
+class TableSpec:
+    name: str
+    rows: int
+    # (table, rows) of each table this one references, one foreign key column per entry
+    parents: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def parse_rows(spec: str) -> Tuple[int, int]:
+    low, _, high = spec.partition(":")
+    low, high = int(low), int(high or low)
+    if not 0 < low <= high:
+        raise ValueError(f"Row range {spec!r} must be N or MIN:MAX with 0 < MIN <= MAX")
+    return low, high
+
+
+def plan_tables(tables: int, rows: Tuple[int, int], fanout: int, seed: int = 0,
+                prefix: str = "syn_") -> List[TableSpec]:
+    """Table sizes drawn log-uniformly from the row range, each referencing up to fanout earlier tables"""
+    rng = random.Random(seed)
+    width = max(4, len(str(tables - 1)))
+    specs = []
+    for i in range(tables):
+        count = round(math.exp(rng.uniform(math.log(rows[0]), math.log(rows[1]))))
+        parents = rng.sample(specs, min(fanout, len(specs)))
+        specs.append(TableSpec(f"{prefix}{i:0{width}d}", count, [(p.name, p.rows) for p in parents]))
+    return specs
+
+
+def create_sql(spec: TableSpec) -> str:
+    """Table without constraints; keys and indexes are added after the load"""
+    refs = "".join(f"    ref_{parent} BIGINT NOT NULL,\n" for parent, _ in spec.parents)
+    return (
+        f"CREATE TABLE {spec.name} (\n"
+        f"    id BIGINT NOT NULL,\n{refs}"
+        f"    name TEXT NOT NULL,\n"
+        f"    category TEXT NOT NULL,\n"
+        f"    amount NUMERIC(12, 2) NOT NULL,\n"
+        f"    created_at TIMESTAMP NOT NULL,\n"
+        f"    active BOOLEAN NOT NULL\n"
+        f")"
+    )
+
+
+def skewed_indexes(rng, n: int, skew: float, size: int):
+    """size draws from range(n); index k has weight about 1/(k+1)**skew, so skew 0 is uniform"""
+    if skew <= 0:
+        return rng.integers(0, n, size)
+    # Inverse CDF of the continuous power law on [0.5, n + 0.5), rounded to the nearest rank,
+    # so no per-n table of weights is built however many rows the parent has
+    low, high, u = 0.5, n + 0.5, rng.random(size)
+    exponent = 1.0 - skew
+    if abs(exponent) < 1e-9:
+        ranks = low * np.power(high / low, u)
+    else:
+        ranks = np.power(low ** exponent + u * (high ** exponent - low ** exponent), 1.0 / exponent)
+    return np.minimum((ranks + 0.5).astype(np.int64) - 1, n - 1)
+
+
+def table_batches(spec: TableSpec, skew: float = 0.0, batch_size: int = 100_000,
+                  seed: int = 0) -> Iterator[str]:
+    """COPY text-format chunks of at most batch_size rows"""
+    rng = np.random.default_rng([seed, zlib.crc32(spec.name.encode())])
+    categories = np.array(CATEGORIES)
+    end = np.datetime64(EPOCH_END, "s")
+
+    for start in range(0, spec.rows, batch_size):
+        n = min(batch_size, spec.rows - start)
+        ids = np.arange(start + 1, start + n + 1, dtype=np.int64).astype(str)
+        columns = [ids]
+        for _, parent_rows in spec.parents:
+            columns.append((skewed_indexes(rng, parent_rows, skew, n) + 1).astype(str))
+        columns.append(np.char.add("name_", ids))
+        columns.append(categories[skewed_indexes(rng, len(CATEGORIES), skew, n)])
+        columns.append(np.round(rng.lognormal(3.0, 1.0, n), 2).astype(str))
+        columns.append((end - rng.integers(0, SPAN_SECONDS, n).astype("timedelta64[s]")).astype(str))
+        columns.append(np.where(rng.random(n) < 0.9, "t", "f"))
+        # Interleave the columns' strings with tab and newline separators, then join the batch once
+        width = 2 * len(columns)
+        cells = ["\t"] * (width * n)
+        for i, column in enumerate(columns):
+            cells[2 * i::width] = column.tolist()
+        cells[width - 1::width] = ["\n"] * n
+        yield "".join(cells)
+
+
+def load_table(database_url: str, spec: TableSpec, skew: float, batch_size: int, seed: int) -> Tuple[str, int, float]:
+    """Create, COPY and index one table; runs in a worker process"""
+    start = time.perf_counter()
+    conn = psycopg2.connect(database_url)
+    try:
+        cursor = conn.cursor()
+        # Losing the tail of a synthetic load on a crash is fine
+        cursor.execute("SET synchronous_commit = off")
+        # Creating the table in the loading transaction lets wal_level=minimal servers skip WAL for the COPY
+        cursor.execute(create_sql(spec))
+        for chunk in table_batches(spec, skew, batch_size, seed):
+            cursor.copy_expert(f"COPY {spec.name} FROM STDIN", io.StringIO(chunk))
+        conn.commit()
+
+        cursor.execute(f"ALTER TABLE {spec.name} ADD PRIMARY KEY (id)")
+        for parent, _ in spec.parents:
+            cursor.execute(f"CREATE INDEX ON {spec.name} (ref_{parent})")
+        cursor.execute(f"ANALYZE {spec.name}")
+        conn.commit()
+    finally:
+        conn.close()
+    return spec.name, spec.rows, time.perf_counter() - start
+
+
+def add_foreign_keys(database_url: str, specs: List[TableSpec]):
+    """Foreign keys go on last and one at a time: each one locks its parent table against the others"""
+    with psycopg2.connect(database_url) as conn:
+        cursor = conn.cursor()
+        for spec in specs:
+            for parent, _ in spec.parents:
+                cursor.execute(
+                    f"ALTER TABLE {spec.name} ADD FOREIGN KEY (ref_{parent}) REFERENCES {parent} (id)"
+                )
+            conn.commit()
+
+
+def drop_tables(database_url: str, specs: List[TableSpec], chunk: int = 500):
+    with psycopg2.connect(database_url) as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(specs), chunk):
+            names = ", ".join(spec.name for spec in specs[i:i + chunk])
+            cursor.execute(f"DROP TABLE IF EXISTS {names} CASCADE")
+
+
+def generate(database_url: str, specs: List[TableSpec], skew: float = 0.0, workers: Optional[int] = None,
+             batch_size: int = 100_000, seed: int = 0, foreign_keys: bool = True) -> dict:
+    """Load every table in parallel, then add foreign keys; returns row and timing totals"""
+    if np is None:
+        raise RuntimeError("The synthetic data generator needs NumPy: pip install numpy")
+    start = time.perf_counter()
+    drop_tables(database_url, specs)
+
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(load_table, database_url, spec, skew, batch_size, seed) for spec in specs]
+        for done, future in enumerate(as_completed(futures), 1):
+            name, rows, seconds = future.result()
+            total_rows += rows
+            print(f"[{done}/{len(specs)}] {name}: {rows} rows in {seconds:.2f}s")
+    loaded = time.perf_counter()
+
+    if foreign_keys:
+        add_foreign_keys(database_url, specs)
+
+    return {
+        "tables": len(specs),
+        "rows": total_rows,
+        "load_seconds": loaded - start,
+        "foreign_key_seconds": time.perf_counter() - loaded,
+        "rows_per_sec": total_rows / (loaded - start)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load synthetic tables for scale testing")
+    parser.add_argument("database_url")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--rows", default="10000", help="rows per table, N or MIN:MAX (log-uniform)")
+    parser.add_argument("--fanout", type=int, default=1, help="foreign keys per table, to earlier tables")
+    parser.add_argument("--skew", type=float, default=0.0,
+                        help="Zipf exponent for foreign key and category values; 0 is uniform")
+    parser.add_argument("--workers", type=int, help="tables loaded in parallel (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="rows per COPY chunk")
+    parser.add_argument("--prefix", default="syn_", help="table name prefix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-foreign-keys", action="store_true", help="skip adding FK constraints after loading")
+    args = parser.parse_args()
+
+    if np is None:
+        sys.exit("The synthetic data generator needs NumPy: pip install numpy")
+
+    specs = plan_tables(args.tables, parse_rows(args.rows), args.fanout, args.seed, args.prefix)
+    summary = generate(args.database_url, specs, args.skew, args.workers, args.batch_size, args.seed,
+                       not args.no_foreign_keys)
+    print(f"Loaded {summary['rows']} rows into {summary['tables']} tables in {summary['load_seconds']:.1f}s "
+          f"({summary['rows_per_sec']:.0f} rows/s); foreign keys took {summary['foreign_key_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
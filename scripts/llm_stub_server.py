@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stub server
+Serves /v1/chat/completions (including streaming) with configurable latency, token rate, error injection
+and canned or rule-based SQL replies, so agent paths can be load tested offline.
+
+    python scripts/llm_stub_server.py --port 8100 --latency lognormal:-0.7,0.4 --tokens-per-sec 80
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub python scripts/run.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.llm_stub import reply_for
+
+# Rough chars per token, matching how the stub counts usage
+CHARS_PER_TOKEN = 4
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class LatencyModel:
+    """Seconds before the first token, drawn from a named distribution: fixed:S, uniform:LO,HI,
+    normal:MEAN,SD, lognormal:MU,SIGMA (of the log of seconds) or exponential:MEAN"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, _, params = spec.partition(":")
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {', '.join(DISTRIBUTIONS)}")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p] or [0.0]
+        self.rng = rng
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "uniform":
+            value = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = self.rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = self.rng.lognormvariate(p[0], p[1])
+        elif self.kind == "exponential":
+            value = self.rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        else:
+            value = p[0]
+        return max(0.0, value)
+
+
+class StubBehaviour:
+    """Everything that decides how the stub answers one request"""
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_sec: float = 0.0, error_rate: float = 0.0,
+                 error_statuses: Optional[List[int]] = None, hang_rate: float = 0.0, hang_seconds: float = 60.0,
+                 responses: Optional[List[Dict[str, str]]] = None, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [500]
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.responses = [(re.compile(r["match"], re.IGNORECASE | re.DOTALL), r["reply"]) for r in responses or []]
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "hangs": 0}
+
+    def reply(self, messages: List[Dict[str, Any]]) -> str:
+        """First canned reply whose pattern matches the last user message, else the rule-based reply"""
+        last_user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+        for pattern, reply in self.responses:
+            if pattern.search(str(last_user.get("content", ""))):
+                return reply
+        return reply_for(messages)
+
+    def token_delay(self) -> float:
+        return 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+
+def _tokens(text: str) -> List[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+
+
+def _usage(messages: List[Dict[str, Any]], content: str) -> Dict[str, int]:
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // CHARS_PER_TOKEN
+    completion_tokens = len(content) // CHARS_PER_TOKEN
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def _error(status: int) -> JSONResponse:
+    kinds = {429: "rate_limit_exceeded", 500: "server_error", 503: "service_unavailable"}
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": f"Injected stub error ({status})", "type": kinds.get(status, "error"),
+                           "param": None, "code": kinds.get(status)}}
+    )
+
+
+def create_app(behaviour: StubBehaviour) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return behaviour.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "stub")
+        behaviour.stats["requests"] += 1
+
+        if behaviour.rng.random() < behaviour.hang_rate:
+            # Simulates a provider that stops responding; clients should hit their own timeout first
+            behaviour.stats["hangs"] += 1
+            await asyncio.sleep(behaviour.hang_seconds)
+        if behaviour.rng.random() < behaviour.error_rate:
+            behaviour.stats["errors"] += 1
+            await asyncio.sleep(behaviour.latency.sample())
+            return _error(behaviour.rng.choice(behaviour.error_statuses))
+
+        content = behaviour.reply(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        first_token_delay = behaviour.latency.sample()
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay + len(_tokens(content)) * behaviour.token_delay())
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": _usage(messages, content)
+            }
+
+        behaviour.stats["streamed"] += 1
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(first_token_delay)
+            yield chunk({"role": "assistant", "content": ""})
+            for token in _tokens(content):
+                yield chunk({"content": token})
+                await asyncio.sleep(behaviour.token_delay())
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="fixed:0",
+                        help=f"time to first token, as <{'|'.join(DISTRIBUTIONS)}>:<params> (seconds)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="completion token rate; 0 means instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, nargs="+", default=[500], help="statuses used for injected errors")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that stall first")
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--responses", help='JSON file of [{"match": regex, "reply": text}] canned replies')
+    parser.add_argument("--seed", type=int, help="seed for latency and error draws")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+
+    behaviour = StubBehaviour(
+        latency=args.latency, tokens_per_sec=args.tokens_per_sec, error_rate=args.error_rate,
+        error_statuses=args.error_status, hang_rate=args.hang_rate, hang_seconds=args.hang_seconds,
+        responses=responses, seed=args.seed
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(behaviour), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
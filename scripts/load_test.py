@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Load test harness
+Drives the API endpoints in a closed loop (fixed concurrency) or open loop (Poisson arrivals at a fixed rate)
+and reports throughput, error rate and latency percentiles per endpoint.
+
+    # Against a running server
+    python scripts/load_test.py --database-url postgresql://... --mode closed --concurrency 16 --duration 30
+    # Start the LLM stub and a server on free ports first, then drive them
+    python scripts/load_test.py --database-url postgresql://... --start-stack --mode open --rate 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.common import percentile
+
+ENDPOINTS = ("generate-query", "execute-query", "schema", "suggested-questions")
+DEFAULT_MIX = "generate-query=1,execute-query=4,schema=1,suggested-questions=1"
+DEFAULT_QUESTIONS = [
+    "Show the latest users",
+    "How many orders were placed this month?",
+    "Which products sell best?",
+    "List order items with their products",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(endpoint: str, args, rng: random.Random) -> dict:
+    """Method, path and body for one request to endpoint"""
+    if endpoint == "generate-query":
+        return {"method": "POST", "url": "/api/generate-query",
+                "json": {"natural_language": rng.choice(args.questions), "database_url": args.database_url}}
+    if endpoint == "execute-query":
+        return {"method": "POST", "url": "/api/execute-query",
+                "json": {"sql": args.sql, "database_url": args.database_url}}
+    if endpoint == "schema":
+        return {"method": "POST", "url": "/api/schema", "json": {"database_url": args.database_url}}
+    return {"method": "GET", "url": "/api/suggested-questions", "params": {"database_url": args.database_url}}
+
+
+class Recorder:
+    """Latency and outcome of every request, split into warm-up and measured phases"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.samples: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.error_kinds: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, endpoint: str, started: float, latency: float, error: Optional[str]):
+        if started < self.measure_from:
+            return
+        self.samples[endpoint].append(latency)
+        if error is not None:
+            self.errors[endpoint] += 1
+            self.error_kinds[error] = self.error_kinds.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        def summarize(latencies: List[float], errors: int) -> dict:
+            if not latencies:
+                return {"requests": 0}
+            ms = [value * 1000 for value in latencies]
+            return {
+                "requests": len(ms),
+                "errors": errors,
+                "error_rate": errors / len(ms),
+                "throughput_rps": len(ms) / elapsed,
+                "mean_ms": statistics.fmean(ms),
+                "p50_ms": percentile(ms, 0.50),
+                "p95_ms": percentile(ms, 0.95),
+                "p99_ms": percentile(ms, 0.99),
+                "max_ms": max(ms)
+            }
+
+        endpoints = {
+            name: summarize(self.samples[name], self.errors[name]) for name in ENDPOINTS if self.samples[name]
+        }
+        everything = [value for samples in self.samples.values() for value in samples]
+        return {
+            "measured_seconds": elapsed,
+            "endpoints": endpoints,
+            "total": summarize(everything, sum(self.errors.values())),
+            "dropped": self.dropped,
+            "error_kinds": self.error_kinds
+        }
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, args, rng: random.Random,
+               recorder: Recorder, intended_start: Optional[float] = None):
+    """Issue one request; open-loop latency counts from the intended start to avoid coordinated omission"""
+    start = intended_start if intended_start is not None else time.perf_counter()
+    error = None
+    try:
+        response = await client.request(**build_request(endpoint, args, rng))
+        if response.status_code >= 400:
+            error = f"HTTP {response.status_code}"
+        elif endpoint == "execute-query" and not response.json().get("success", False):
+            error = "query failed"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    recorder.record(endpoint, start, time.perf_counter() - start, error)
+
+
+async def closed_loop(client, args, mix, rng, recorder, deadline: float):
+    """`concurrency` virtual users, each sending its next request as soon as the last one finishes"""
+    names, weights = list(mix), list(mix.values())
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await send(client, rng.choices(names, weights)[0], args, rng, recorder)
+            # An in-process transport can answer without suspending; yield so the users take turns
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+
+
+async def open_loop(client, args, mix, rng, recorder, deadline: float):
+    """Poisson arrivals at `rate` per second regardless of how fast responses come back"""
+    names, weights = list(mix), list(mix.values())
+    in_flight = set()
+    next_arrival = time.perf_counter()
+
+    while next_arrival < deadline:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= args.max_in_flight:
+            # The client is saturated; count the arrival instead of silently slowing down
+            recorder.dropped += next_arrival >= recorder.measure_from
+        else:
+            task = asyncio.ensure_future(
+                send(client, rng.choices(names, weights)[0], args, rng, recorder, next_arrival)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(args.rate)
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+
+async def run(args, transport: Optional[httpx.AsyncBaseTransport] = None) -> dict:
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits,
+                                 transport=transport) as client:
+        start = time.perf_counter()
+        recorder = Recorder(measure_from=start + args.warmup)
+        deadline = start + args.warmup + args.duration
+        if args.mode == "closed":
+            await closed_loop(client, args, mix, rng, recorder, deadline)
+        else:
+            await open_loop(client, args, mix, rng, recorder, deadline)
+        elapsed = time.perf_counter() - recorder.measure_from
+
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "rate": args.rate if args.mode == "open" else None,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "mix": mix,
+        "seed": args.seed
+    }
+    return report
+
+
+def print_summary(report: dict):
+    config = report["config"]
+    load = f"concurrency {config['concurrency']}" if config["mode"] == "closed" else f"{config['rate']}/s arrivals"
+    print(f"\n{config['mode']} loop, {load}, {report['measured_seconds']:.1f}s measured")
+    print(f"{'endpoint':<22}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, s in rows:
+        if not s.get("requests"):
+            continue
+        print(f"{name:<22}{s['requests']:>7}{s['throughput_rps']:>8.1f}{s['error_rate'] * 100:>6.1f}%"
+              f"{s['p50_ms']:>8.0f}ms{s['p95_ms']:>7.0f}ms{s['p99_ms']:>7.0f}ms{s['max_ms']:>7.0f}ms")
+    if report["dropped"]:
+        print(f"dropped arrivals (client saturated): {report['dropped']}")
+    for kind, count in sorted(report["error_kinds"].items()):
+        print(f"errors: {kind} x{count}")
+
+
+def _wait_for(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_stack(app_port: int, stub_port: int, stub_args: List[str], log_path: Optional[str] = None):
+    """Start the LLM stub and one app worker pointed at it, stopping both afterwards"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Server output (loop stall reports included) goes to the log so it doesn't interleave with the summary
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(root, "scripts", "llm_stub_server.py"), "--port", str(stub_port), *stub_args],
+        cwd=root, stdout=log, stderr=subprocess.STDOUT
+    )
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "stub"
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    try:
+        _wait_for(f"http://127.0.0.1:{stub_port}/stats")
+        _wait_for(f"http://127.0.0.1:{app_port}/api/health")
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in (server, stub):
+            process.terminate()
+        for process in (server, stub):
+            process.wait(timeout=15)
+        if log_path:
+            log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API and report latency percentiles")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--database-url", required=True, help="database the requests run against")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed loop: simultaneous virtual users")
+    parser.add_argument("--rate", type=float, default=10.0, help="open loop: mean arrivals per second")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open loop: cap on outstanding requests")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. execute-query=3,schema=1")
+    parser.add_argument("--sql", default="SELECT * FROM users LIMIT 50", help="statement for execute-query")
+    parser.add_argument("--questions", nargs="+", default=DEFAULT_QUESTIONS, help="questions for generate-query")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--start-stack", action="store_true",
+                        help="start the LLM stub and a server locally instead of using --base-url")
+    parser.add_argument("--app-port", type=int, help="with --start-stack, server port (default: a free one)")
+    parser.add_argument("--stub-port", type=int, help="with --start-stack, LLM stub port (default: a free one)")
+    parser.add_argument("--stub-args", default="--latency lognormal:-1.2,0.3 --tokens-per-sec 100 --seed 1",
+                        help="arguments passed to scripts/llm_stub_server.py")
+    parser.add_argument("--stack-log", help="with --start-stack, write server and stub output here")
+    args = parser.parse_args()
+
+    if args.start_stack:
+        app_port, stub_port = args.app_port or _free_port(), args.stub_port or _free_port()
+        with local_stack(app_port, stub_port, args.stub_args.split(), args.stack_log) as base_url:
+            args.base_url = base_url
+            report = asyncio.run(run(args))
+    else:
+        report = asyncio.run(run(args))
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report["total"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """
 Startup script for Natural Language SQL Tool
-Handles environment validation and starts the server
+Handles environment validation and starts the server: a single auto-reloading process by default,
+or with --production, tuned workers without reload (one by default)
 """
 
+import argparse
+import importlib.util
 import os
 import sys
 
@@ -28,48 +31,86 @@ def check_environment():
     
     return True
 
+def worker_count(requested: int = 0) -> int:
+    """requested if positive, else the number of CPUs this process may run on"""
+    if requested > 0:
+        return requested
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def production_options(host: str, port: int, workers: int = 1) -> dict:
+    """uvicorn settings for serving: worker processes, uvloop/httptools when installed, tuned sockets"""
+    from app.core.config import config
+    
+    return {
+        "host": host,
+        "port": port,
+        # Result sets, templates, the cancel registry and metrics live in each worker's memory
+        "workers": worker_count(workers),
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "backlog": config.SERVER_BACKLOG,
+        "timeout_keep_alive": config.SERVER_KEEPALIVE_TIMEOUT,
+        # SIGTERM stops accepting, lets in-flight requests finish for this long, then runs shutdown
+        "timeout_graceful_shutdown": config.SERVER_GRACEFUL_TIMEOUT,
+        "access_log": config.SERVER_ACCESS_LOG,
+        "lifespan": "on",
+        "log_level": "info"
+    }
+
 def main():
     """Main startup function"""
+    # Add parent directory to path so we can import app modules
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
+    from app.core.config import config
+    
+    parser = argparse.ArgumentParser(description="Start the Natural Language SQL Tool server")
+    parser.add_argument("--production", action="store_true", help="tuned serving without auto-reload")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                        help="worker processes with --production; 0 means one per CPU. Result sets, templates "
+                             "and the cancel registry are per process, so with more than one a follow-up "
+                             "request must reach the worker that served the first")
+    args = parser.parse_args()
+    
     print("🗃️  Natural Language SQL Tool")
     print("=" * 40)
     
-    # Add parent directory to path so we can import app modules
-    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-    
     # Check environment
     if not check_environment():
         sys.exit(1)
     
-    from app.core.config import config
-    
     print("✅ Environment variables configured")
     print(f"✅ Max query timeout: {config.MAX_QUERY_TIMEOUT}s")
     print(f"✅ Max result rows: {config.MAX_RESULT_ROWS}")
     
-    # Start the server
-    print("\n🚀 Starting server...")
-    print("   Web interface: http://localhost:8000")
-    print("   API docs: http://localhost:8000/docs")
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is not installed. Run: pip install -r requirements.txt")
+        sys.exit(1)
+    
+    if args.production:
+        options = production_options(args.host, args.port, args.workers)
+        print(f"\n🚀 Starting {options['workers']} worker(s) on {args.host}:{args.port} "
+              f"(loop: {options['loop']}, http: {options['http']})")
+    else:
+        options = {"host": args.host, "port": args.port, "reload": True, "log_level": "info"}
+        print("\n🚀 Starting development server...")
+        print(f"   Web interface: http://localhost:{args.port}")
+        print(f"   API docs: http://localhost:{args.port}/docs")
     print("   Press Ctrl+C to stop")
     print("-" * 40)
     
     try:
-        import uvicorn
-        from app.main import app
-        
-        uvicorn.run(
-            app, 
-            host="0.0.0.0", 
-            port=8000,
-            reload=True,
-            log_level="info"
-        )
+        # An import string, so reload and extra workers can each import the app themselves
+        uvicorn.run("app.main:app", **options)
     except KeyboardInterrupt:
         print("\n👋 Server stopped")
-    except ImportError:
-        print("❌ uvicorn not installed. Installing dependencies...")
-        os.system("pip install -r requirements.txt")
-        print("Please run the script again.")
     except Exception as e:
         print(f"❌ Failed to start server: {e}")
         sys.exit(1)
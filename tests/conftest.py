@@ -0,0 +1,40 @@
+"""
+Shared test configuration
+
+Set LOOP_BLOCK_FAIL_MS to fail any test during which an asyncio callback blocked its event loop
+for longer than that many milliseconds, e.g. a sync database or LLM call inside an async endpoint.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.loop_monitor import detect_blocking_callbacks
+
+LOOP_BLOCK_FAIL_MS = float(os.getenv("LOOP_BLOCK_FAIL_MS", "0"))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    if not LOOP_BLOCK_FAIL_MS or item.get_closest_marker("allow_loop_blocking"):
+        yield
+        return
+
+    with detect_blocking_callbacks(LOOP_BLOCK_FAIL_MS / 1000) as stalls:
+        outcome = yield
+    if stalls and outcome.excinfo is None:
+        details = "\n".join(
+            f"{stall.duration * 1000:.0f}ms in {stall.callback}\n{''.join(stall.stack[-8:])}"
+            for stall in stalls
+        )
+        outcome.force_exception(pytest.fail.Exception(
+            f"Event loop blocked for more than {LOOP_BLOCK_FAIL_MS:.0f}ms:\n{details}"
+        ))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "allow_loop_blocking: exempt a test from LOOP_BLOCK_FAIL_MS")
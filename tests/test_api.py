@@ -15,6 +15,8 @@ from app.main import app
 from app.models.schemas import QueryType
 from app.services.llm_service import LLMService
 from app.services.database_service import DatabaseService
+from app.api.responses import FastJSONResponse, execute_response_content
+from app.models.schemas import ExecuteResponse
 
 client = TestClient(app)
 
@@ -84,6 +86,122 @@ def test_row_estimation():
     estimated = service._estimate_result_rows("SELECT * FROM users JOIN orders ON users.id = orders.user_id", schema)
     assert estimated == 500
 
+def test_preview_safety_check():
+    """Test only single read-only statements are previewed speculatively"""
+    from app.services.agent_service import QueryAgent
+    
+    assert QueryAgent._is_preview_safe("SELECT * FROM users LIMIT 5")
+    assert not QueryAgent._is_preview_safe("DELETE FROM users")
+    assert not QueryAgent._is_preview_safe("SELECT 1; DROP TABLE users")
+    assert not QueryAgent._is_preview_safe("-- Error generating SQL: timeout")
+    assert not QueryAgent._is_preview_safe("SELECT nextval('orders_id_seq')")
+    assert not QueryAgent._is_preview_safe("SELECT pg_terminate_backend(pid) FROM pg_stat_activity")
+    assert not QueryAgent._is_preview_safe("SELECT set_config('search_path', 'x', false)")
+    assert not QueryAgent._is_preview_safe("SELECT * FROM dblink('host=other', 'DELETE FROM t') AS t(n int)")
+
+def test_preview_runs_in_rolled_back_read_only_transaction(monkeypatch):
+    """Test previews open a read-only transaction before the statement and always roll it back"""
+    from app.services import database_service
+    executed = []
+    
+    class FakeCursor:
+        def execute(self, sql):
+            executed.append(sql)
+    
+    class FakeConnection:
+        def cursor(self):
+            return FakeCursor()
+        
+        def rollback(self):
+            executed.append("ROLLBACK")
+        
+        def close(self):
+            pass
+    
+    def run_statement(conn, sql, start_time, max_rows, timeout_seconds, result_encoding):
+        executed.append(sql)
+        raise database_service.psycopg2.errors.ReadOnlySqlTransaction("cannot execute INSERT in a read-only transaction")
+    
+    monkeypatch.setattr(database_service.psycopg2, "connect", lambda dsn: FakeConnection())
+    monkeypatch.setattr(DatabaseService, "_run_statement", staticmethod(run_statement))
+    response = DatabaseService.preview_query("postgresql://db.internal/sales", "SELECT audit_write()")
+    assert executed == ["SET TRANSACTION READ ONLY;", "SELECT audit_write()", "ROLLBACK"]
+    assert not response.success and "read-only transaction" in response.error
+    assert not DatabaseService.preview_query("postgresql://db.internal/sales", "SELECT nextval('s')").success
+
+def test_validation_repairs_off_loop_and_survives_unreachable_database(monkeypatch):
+    """Test repair calls leave the event loop free and a database outage returns the SQL unvalidated"""
+    import asyncio
+    import time
+    from types import SimpleNamespace
+    import psycopg2
+    from app.services.agent_service import AgentContext, QueryAgent
+    
+    explained = []
+    
+    def explain(database_url, sql, timeout_seconds):
+        explained.append(sql)
+        if len(explained) == 1:
+            return 'column "nme" does not exist'
+        raise psycopg2.OperationalError("connection refused")
+    
+    def chat(self, agent, purpose, **kwargs):
+        # Blocks like the real client does
+        time.sleep(0.2)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="SELECT name FROM users"))])
+    
+    monkeypatch.setattr(DatabaseService, "explain_query", staticmethod(explain))
+    monkeypatch.setattr(LLMService, "chat", chat)
+    context = AgentContext("postgresql://db", "u", "s", [], {"users": [{"name": "name", "type": "text"}]})
+    sql_result = SimpleNamespace(sql="SELECT nme FROM users")
+    
+    async def scenario():
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.ensure_future(ticker())
+        validation = await QueryAgent()._validate_and_repair(sql_result, "user names", context)
+        task.cancel()
+        return validation, ticks
+    
+    validation, ticks = asyncio.run(scenario())
+    assert sql_result.sql == "SELECT name FROM users" and validation["attempts"] == 2
+    assert not validation["valid"] and validation["error"].startswith("Could not validate SQL")
+    assert ticks >= 10
+
+def test_strip_code_fences():
+    """Test fenced model output is reduced to the bare query"""
+    from app.services.agent_service import QueryAgent
+    
+    assert QueryAgent._strip_code_fences("```sql\nSELECT 1\n```") == "SELECT 1"
+    assert QueryAgent._strip_code_fences("  SELECT 1  ") == "SELECT 1"
+
+def test_fanout_requires_tenants():
+    """Test fan-out rejects an empty tenant list"""
+    response = client.post("/api/execute-fanout", json={"sql": "SELECT 1", "tenants": {}})
+    assert response.status_code == 400
+
+def test_fast_response_matches_validated_response():
+    """Test the fast response path encodes like the validated one"""
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    import json
+    
+    result = ExecuteResponse.model_construct(
+        success=True,
+        data=[{"amount": Decimal("1.25"), "at": datetime(2024, 1, 1, tzinfo=timezone.utc), "note": None}],
+        columns=["amount", "at", "note"],
+        row_count=1
+    )
+    fast = json.loads(FastJSONResponse(execute_response_content(result)).body)
+    assert fast == json.loads(ExecuteResponse.model_validate(result.model_dump()).model_dump_json())
+    assert fast["data"][0]["amount"] == "1.25"
+
 if __name__ == "__main__":
     # Run basic tests
     print("Running basic API tests...")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark helpers
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.agent_service import QueryAgent
+from app.services.llm_service import LLMService
+from benchmarks.bench_prompt import synthetic_schema
+from benchmarks.llm_stub import StubOpenAI, stub_sql
+from benchmarks.run_all import compare
+
+def test_stub_sql_targets_named_table():
+    """Test the stub LLM queries the table a question names, in every schema prompt format"""
+    schema = synthetic_schema(5)
+    prompt = LLMService()._build_prompt("Latest rows of t_0003", schema)
+    assert stub_sql(prompt) == "SELECT * FROM t_0003 LIMIT 10"
+    assert stub_sql("Request: show orders\nTable users: id\nTable orders: id") == "SELECT * FROM orders LIMIT 10"
+
+def test_stub_client_reply_parses_like_openai():
+    """Test LLMService.generate_sql parses the stub's JSON reply"""
+    service = LLMService()
+    service.client = StubOpenAI()
+    response = service.generate_sql("Latest rows of t_0002", synthetic_schema(3))
+    assert response.sql == "SELECT * FROM t_0002 LIMIT 10"
+    assert QueryAgent._strip_code_fences(response.sql) == response.sql
+
+def test_compare_flags_latency_and_throughput_regressions():
+    """Test only changes past the threshold in the worse direction are reported"""
+    baseline = {"results": {"a": {"p50_ms": 10.0, "rows_per_sec": 1000.0, "bytes": 5}}}
+    current = {"results": {"a": {"p50_ms": 12.0, "rows_per_sec": 950.0, "bytes": 50}}}
+    assert [r[0] for r in compare(baseline, current, 0.10)] == ["a.p50_ms"]
+    assert compare(baseline, current, 0.25) == []
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for connection pooling and batch execution over pooled connections
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from app.core.config import config
+from app.models.schemas import ExecuteResponse
+from app.services import connection_pool
+from app.services.connection_pool import ConnectionPool, PoolTimeoutError
+from app.services.database_service import DatabaseService
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+
+class FakeConnection:
+    """Records what runs on it and reports a configurable transaction status"""
+
+    def __init__(self):
+        self.closed = False
+        self.executed = []
+        self.rollbacks = 0
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(*args, **kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(connection_pool.psycopg2, "connect", connect)
+    return opened
+
+def test_checkout_reuses_returned_connections(connections):
+    """Test a returned connection is handed out again instead of opening a new one"""
+    pool = ConnectionPool("postgresql://pool", max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert len(connections) == 1
+
+def test_return_rolls_back_open_transactions_and_drops_broken_connections(connections):
+    """Test a connection left in a transaction is rolled back and one in an unknown state is closed"""
+    pool = ConnectionPool("postgresql://pool", max_size=2)
+    with pool.connection() as conn:
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    assert conn.rollbacks == 1 and len(pool._idle) == 1
+
+    with pool.connection() as conn:
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    assert conn.closed and len(pool._idle) == 0
+
+def test_idle_and_closed_connections_are_evicted(connections, monkeypatch):
+    """Test connections idle past POOL_MAX_IDLE_TIME or closed by the server are replaced on checkout"""
+    pool = ConnectionPool("postgresql://pool", max_size=2)
+    with pool.connection() as stale:
+        pass
+    monkeypatch.setattr(config, "POOL_MAX_IDLE_TIME", -1)
+    with pool.connection() as fresh:
+        assert fresh is not stale
+    assert stale.closed
+
+    monkeypatch.setattr(config, "POOL_MAX_IDLE_TIME", 300)
+    fresh.closed = True
+    with pool.connection() as replacement:
+        assert replacement is not fresh
+    assert len(connections) == 3
+
+def test_checkout_times_out_when_the_pool_is_exhausted(connections):
+    """Test max_size bounds concurrent checkouts and a waiting caller gives up after its timeout"""
+    pool = ConnectionPool("postgresql://pool", max_size=1)
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection(timeout=0.01):
+                pass
+    with pool.connection(timeout=0.01):
+        pass
+
+def _run_statement(conn, sql, start_time, *args, **kwargs):
+    """_run_statement stand-in: statements containing 'boom' fail like a PostgreSQL error"""
+    conn.executed.append(sql)
+    if "boom" in sql:
+        raise psycopg2.ProgrammingError(f"relation in {sql!r} does not exist")
+    return ExecuteResponse(success=True, data=[{"sql": sql}], row_count=1)
+
+def test_snapshot_batch_isolates_failed_statements_with_savepoints(connections, monkeypatch):
+    """Test one failing statement in a snapshot batch is rolled back to its savepoint and the rest still run"""
+    monkeypatch.setattr(DatabaseService, "_run_statement", staticmethod(_run_statement))
+    response = DatabaseService.execute_batch(
+        "postgresql://snapshot", ["SELECT 1", "SELECT boom", "SELECT 3"], consistent=True
+    )
+
+    assert [result.success for result in response.results] == [True, False, True]
+    assert "does not exist" in response.results[1].error
+    conn = connections[0]
+    assert conn.executed == [
+        "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;",
+        "SAVEPOINT batch_statement;", "SELECT 1", "RELEASE SAVEPOINT batch_statement;",
+        "SAVEPOINT batch_statement;", "SELECT boom", "ROLLBACK TO SAVEPOINT batch_statement;",
+        "SAVEPOINT batch_statement;", "SELECT 3", "RELEASE SAVEPOINT batch_statement;",
+    ]
+    assert conn.rollbacks == 1 and len(connections) == 1
+
+def test_snapshot_batch_reports_connection_failures_for_every_statement(monkeypatch):
+    """Test a snapshot batch that cannot connect returns one failed result per statement"""
+    def refuse(*args, **kwargs):
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(connection_pool.psycopg2, "connect", refuse)
+    response = DatabaseService.execute_batch("postgresql://down", ["SELECT 1", "SELECT 2"], consistent=True)
+    assert [(r.success, r.error) for r in response.results] == [(False, "connection refused")] * 2
+
+def test_pooled_batch_keeps_order_and_isolates_errors(connections, monkeypatch):
+    """Test pooled batches return results in statement order, with a failure confined to its statement"""
+    monkeypatch.setattr(DatabaseService, "_run_statement", staticmethod(_run_statement))
+    statements = ["SELECT 1", "SELECT boom", "SELECT 3", "SELECT 4"]
+    response = DatabaseService.execute_batch("postgresql://pooled", statements, max_concurrency=2)
+
+    assert [result.success for result in response.results] == [True, False, True, True]
+    assert [result.data[0]["sql"] for result in response.results if result.success] == ["SELECT 1", "SELECT 3", "SELECT 4"]
+    assert 1 <= len(connections) <= 2
+    assert sorted(sql for conn in connections for sql in conn.executed) == sorted(statements)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the eval harness and LLM cassettes
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from app.services.llm_service import LLMService
+from benchmarks.bench_prompt import synthetic_schema
+from benchmarks.llm_stub import StubOpenAI
+from evals.cassette import Cassette, CassetteMiss, request_key, use_cassette
+from evals.run_eval import results_match
+
+MESSAGES = [{"role": "user", "content": "Request: show t_0001\nTable t_0001: id\nReturn only the SQL query."}]
+
+def test_cassette_records_then_replays(tmp_path):
+    """Test a recorded run replays the same SQL and token counts without calling the model"""
+    path = str(tmp_path / "cassette.json")
+    schema = synthetic_schema(3)
+
+    with use_cassette(Cassette(path, "auto"), factory=lambda **kwargs: StubOpenAI()) as recording:
+        recorded = LLMService().generate_sql("Latest rows of t_0002", schema)
+    assert recording.usage["recorded"] == 1 and os.path.exists(path)
+
+    def unreachable(**kwargs):
+        raise AssertionError("replay must not build a real client")
+
+    with use_cassette(Cassette(path, "replay"), factory=unreachable) as replay:
+        replayed = LLMService().generate_sql("Latest rows of t_0002", schema)
+    assert replayed.sql == recorded.sql == "SELECT * FROM t_0002 LIMIT 10"
+    assert replay.usage["prompt_tokens"] == recording.usage["prompt_tokens"] > 0
+    assert replay.usage["recorded"] == 0
+
+def test_replay_miss_raises_and_timeout_is_not_keyed(tmp_path):
+    """Test unrecorded requests fail in replay mode, while a different timeout still matches"""
+    assert request_key({"model": "m", "messages": MESSAGES, "timeout": 3.2}) == \
+        request_key({"model": "m", "messages": MESSAGES, "timeout": 9.9})
+
+    path = str(tmp_path / "cassette.json")
+    with use_cassette(Cassette(path, "record"), factory=lambda **kwargs: StubOpenAI()):
+        LLMService().client.chat.completions.create(model="m", messages=MESSAGES, timeout=3.2)
+
+    cassette = Cassette(path, "replay")
+    with use_cassette(cassette):
+        client = LLMService().client
+        client.chat.completions.create(model="m", messages=MESSAGES, timeout=9.9)
+        with pytest.raises(CassetteMiss):
+            client.chat.completions.create(model="other", messages=MESSAGES)
+    assert cassette.usage["misses"] == 1
+
+def test_results_match_ignores_extra_columns_and_row_order():
+    """Test generated rows match gold when they add columns or reorder rows, unless order matters"""
+    gold = [["Shoes", 2], ["Home", 4]]
+    assert results_match(gold, [[4, "Home", "x"], [2, "Shoes", "y"]])
+    assert results_match([[1499.9801]], [[1499.98]])
+    assert not results_match(gold, [["Home", 4], ["Shoes", 2]], ordered=True)
+    assert not results_match(gold, [["Home", 4]])
+    assert not results_match(gold, [["Home", 5], ["Shoes", 2]])
+    # Each column holds the right values, but the pairs are swapped
+    assert not results_match(gold, [["Shoes", 4], ["Home", 2]])
+    assert results_match([[1, 1], [2, 2]], [[1, 1, 9], [2, 2, 9]])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-tenant fan-out queries
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.main import app
+from app.models.schemas import ExecuteResponse, FanoutRequest
+from app.services import database_service
+
+class FakeTenants:
+    """execute_query stand-in: 'down' tenants fail, 'slow' ones block until their request id is cancelled"""
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+        self.release = threading.Event()
+
+    def execute_query(self, database_url, sql, request_id=None, **kwargs):
+        tenant = database_url.rsplit("/", 1)[-1]
+        self.started.append(tenant)
+        if tenant.startswith("down"):
+            return ExecuteResponse(success=False, error=f"could not connect to {tenant}")
+        if tenant.startswith("slow"):
+            self.release.wait(5)
+        return ExecuteResponse(success=True, data=[{"tenant": tenant}], columns=["tenant"], row_count=1)
+
+    def cancel(self, request_id):
+        self.cancelled.append(request_id.split(":", 1)[1])
+        self.release.set()
+        return True
+
+@pytest.fixture
+def tenants(monkeypatch):
+    fake = FakeTenants()
+    monkeypatch.setattr(database_service.DatabaseService, "execute_query", staticmethod(fake.execute_query))
+    monkeypatch.setattr(database_service.query_registry, "cancel", fake.cancel)
+    monkeypatch.setattr(database_service, "FANOUT_STOP_POLL_INTERVAL", 0.01)
+    yield fake
+    fake.release.set()
+
+def test_failing_tenant_is_reported_while_the_others_stream(tenants):
+    """Test an unreachable tenant gets its own failed result line and the other tenants still return rows"""
+    response = TestClient(app).post("/api/execute-fanout", json={
+        "sql": "SELECT 1",
+        "tenants": {"acme": "postgresql://db/acme", "globex": "postgresql://db/down-globex",
+                    "initech": "postgresql://db/initech"}
+    })
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    rows = {line["tenant"] for line in lines if line["type"] == "row"}
+    results = {line["tenant"]: line for line in lines if line["type"] == "result"}
+    assert rows == {"acme", "initech"}
+    assert results["globex"]["success"] is False and "down-globex" in results["globex"]["error"]
+    assert results["acme"]["success"] and results["initech"]["success"]
+    assert lines[-1] == {**lines[-1], "type": "done", "tenants": 3, "failed": 1}
+
+def test_client_disconnect_cancels_outstanding_tenants(tenants):
+    """Test a disconnect after the first result cancels running tenants and never starts queued ones"""
+    request = FanoutRequest(sql="SELECT 1", max_concurrency=1, tenants={
+        name: f"postgresql://db/{name}" for name in ("fast", "slow-1", "slow-2", "slow-3")
+    })
+
+    async def drive():
+        response = await endpoints.execute_fanout(request)
+        first_line = asyncio.Event()
+
+        async def send(message):
+            if message.get("body"):
+                first_line.set()
+
+        async def receive():
+            await first_line.wait()
+            return {"type": "http.disconnect"}
+
+        await response({"type": "http"}, receive, send)
+
+    start = time.perf_counter()
+    asyncio.run(drive())
+    assert time.perf_counter() - start < 2
+
+    deadline = time.time() + 2
+    while set(tenants.started) - {"fast"} != set(tenants.cancelled) and time.time() < deadline:
+        time.sleep(0.01)
+    assert set(tenants.started) - {"fast"} == set(tenants.cancelled)
+    time.sleep(0.1)
+    assert tenants.started[0] == "fast" and len(tenants.started) <= 2
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic data generator
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.generate_data import TableSpec, parse_rows, plan_tables, skewed_indexes, table_batches
+
+def test_plan_tables_references_only_earlier_tables():
+    """Test the plan is seeded, keeps sizes in range and points foreign keys backwards"""
+    specs = plan_tables(50, parse_rows("10:1000"), fanout=2, seed=3)
+    assert specs == plan_tables(50, (10, 1000), fanout=2, seed=3)
+    assert all(10 <= spec.rows <= 1000 for spec in specs)
+    assert specs[0].parents == [] and len(specs[1].parents) == 1 and len(specs[9].parents) == 2
+    position = {spec.name: i for i, spec in enumerate(specs)}
+    assert all(position[parent] < i for i, spec in enumerate(specs) for parent, _ in spec.parents)
+
+def test_table_batches_emit_copy_rows_with_valid_keys():
+    """Test batches cover every row once with foreign keys inside the parent's id range"""
+    spec = TableSpec("syn_0002", 2500, [("syn_0000", 40)])
+    lines = "".join(table_batches(spec, skew=1.2, batch_size=1000, seed=1)).splitlines()
+    rows = [line.split("\t") for line in lines]
+    assert [int(r[0]) for r in rows] == list(range(1, 2501))
+    assert all(len(r) == 7 and 1 <= int(r[1]) <= 40 for r in rows)
+    assert "".join(table_batches(spec, skew=1.2, batch_size=1000, seed=1)).splitlines() == lines
+
+def test_skew_concentrates_draws_on_low_indexes():
+    """Test a Zipf skew makes the first index far more common than under uniform draws"""
+    rng = np.random.default_rng(0)
+    uniform = skewed_indexes(rng, 100, 0.0, 20000)
+    skewed = skewed_indexes(rng, 100, 1.5, 20000)
+    assert skewed.max() < 100 and skewed.min() >= 0
+    assert (skewed == 0).mean() > 0.3 > 0.05 > (uniform == 0).mean()
+    # Parents of any size are drawn from without building a table of their weights
+    huge = skewed_indexes(rng, 10**12, 1.1, 1000)
+    assert 0 <= huge.min() and huge.max() < 10**12 and (huge < 10).mean() > 0.2
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for asynchronous query jobs
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from app.core.config import config
+from app.models.schemas import ExecuteResponse, JobStatus
+from app.services import job_service as job_module
+from app.services.job_service import JobService
+
+class FakeDatabase:
+    """Stands in for DatabaseService.execute_query; each call blocks until released"""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.calls = []
+
+    def execute_query(self, database_url, sql, **kwargs):
+        self.calls.append((database_url, sql))
+        self.started.release()
+        self.release.wait(5)
+        return ExecuteResponse(success=True, data=[{"n": 1}], columns=["n"], row_count=1)
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(job_module.DatabaseService, "execute_query", staticmethod(fake.execute_query))
+    monkeypatch.setattr(job_module.query_registry, "cancel", lambda request_id: fake.release.set() or True)
+    yield fake
+    fake.release.set()
+
+@pytest.fixture
+def jobs(tmp_path):
+    service = JobService(db_path=str(tmp_path / "jobs.sqlite3"), result_dir=str(tmp_path / "results"))
+    yield service
+    service.shutdown()
+
+def wait_for(jobs, job_id, *statuses):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stayed {job.status}")
+
+def test_submit_reports_progress_and_stores_the_result(jobs, database):
+    """Test a job moves from queued to running to succeeded and its result can be downloaded"""
+    job = jobs.submit("postgresql://db/sales", "SELECT 1 AS n")
+    assert job.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+    assert database.started.acquire(timeout=5)
+    running = wait_for(jobs, job.job_id, JobStatus.RUNNING)
+    assert running.progress == "Executing query" and jobs.result_path(job.job_id) is None
+
+    database.release.set()
+    done = wait_for(jobs, job.job_id, JobStatus.SUCCEEDED)
+    assert done.progress == "Done" and done.row_count == 1
+    with open(jobs.result_path(job.job_id)) as f:
+        assert json.load(f)["data"] == [{"n": 1}]
+
+def test_cancel_queued_and_running_jobs(jobs, database, monkeypatch):
+    """Test a queued job is cancelled before it starts and a running one once its statement stops"""
+    monkeypatch.setattr(config, "JOB_WORKERS_PER_DSN", 1)
+    running = jobs.submit("postgresql://db/sales", "SELECT pg_sleep(60)")
+    assert database.started.acquire(timeout=5)
+    queued = jobs.submit("postgresql://db/sales", "SELECT 2")
+
+    cancelled = jobs.cancel(queued.job_id)
+    assert cancelled.status == JobStatus.CANCELLED and cancelled.progress == "Cancelled before start"
+
+    jobs.cancel(running.job_id)
+    assert wait_for(jobs, running.job_id, JobStatus.CANCELLED).progress == "Cancelled"
+    assert [sql for _, sql in database.calls] == ["SELECT pg_sleep(60)"]
+
+def test_idle_executors_beyond_the_limit_are_shut_down(jobs, database, monkeypatch):
+    """Test worker pools for other DSNs are shut down once idle and the pool count is over the limit"""
+    monkeypatch.setattr(config, "JOB_MAX_EXECUTORS", 1)
+    database.release.set()
+    first = jobs.submit("postgresql://db/one", "SELECT 1")
+    wait_for(jobs, first.job_id, JobStatus.SUCCEEDED)
+    second = jobs.submit("postgresql://db/two", "SELECT 1")
+    wait_for(jobs, second.job_id, JobStatus.SUCCEEDED)
+    assert list(jobs._executors) == ["postgresql://db/two"]
+
+def test_restart_fails_only_jobs_whose_owner_is_gone(tmp_path):
+    """Test a new process fails jobs of exited or restarted owners but leaves a live process's jobs alone"""
+    db_path = str(tmp_path / "jobs.sqlite3")
+    previous = JobService(db_path=db_path, result_dir=str(tmp_path / "results"))
+    previous._ensure_initialized()
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    owners = {
+        "exited": (exited.pid, previous._owner[1], "a"),
+        # Same PID as the new process, as after a container restart, but another process's token
+        "restarted": (os.getpid(), previous._owner[1], "b"),
+        "rebooted": (os.getppid(), "another-boot", "c"),
+        "live": (os.getppid(), previous._owner[1], "d"),
+    }
+    with previous._connect() as db:
+        for job_id, owner in owners.items():
+            db.execute(
+                "INSERT INTO jobs (job_id, sql, status, progress, created_at, owner_pid, owner_boot, owner_token) "
+                "VALUES (?, 'SELECT 1', ?, 'Executing query', ?, ?, ?, ?)",
+                (job_id, JobStatus.RUNNING.value, time.time(), *owner)
+            )
+
+    restarted = JobService(db_path=db_path, result_dir=str(tmp_path / "results"))
+    statuses = {job_id: restarted.get(job_id).status for job_id in owners}
+    assert statuses == {
+        "exited": JobStatus.FAILED, "restarted": JobStatus.FAILED, "rebooted": JobStatus.FAILED,
+        "live": JobStatus.RUNNING
+    }
+    assert restarted.get("exited").progress == "Interrupted"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the OpenAI-compatible stub server
+"""
+
+import json
+import os
+import random
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+
+from scripts.llm_stub_server import LatencyModel, StubBehaviour, create_app
+
+MESSAGES = [{"role": "user", "content": "Request: show orders\nTable users: id\nTable orders: id\nReturn only the SQL query."}]
+
+def test_completion_uses_canned_reply_then_rules():
+    """Test canned replies win when their pattern matches and rule-based SQL is used otherwise"""
+    behaviour = StubBehaviour(responses=[{"match": "revenue", "reply": "SELECT sum(total) FROM orders"}])
+    client = TestClient(create_app(behaviour))
+
+    body = client.post("/v1/chat/completions", json={"model": "gpt-4o-mini", "messages": MESSAGES}).json()
+    assert body["choices"][0]["message"]["content"] == "SELECT * FROM orders LIMIT 10"
+    assert body["usage"]["completion_tokens"] > 0
+
+    canned = [{"role": "user", "content": "What is our revenue?"}]
+    body = client.post("/v1/chat/completions", json={"model": "gpt-4o-mini", "messages": canned}).json()
+    assert body["choices"][0]["message"]["content"] == "SELECT sum(total) FROM orders"
+
+def test_streaming_chunks_reassemble_reply():
+    """Test the SSE stream carries the same content in chunks and ends with [DONE]"""
+    client = TestClient(create_app(StubBehaviour()))
+    response = client.post("/v1/chat/completions", json={"model": "m", "messages": MESSAGES, "stream": True})
+    events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    content = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert content == "SELECT * FROM orders LIMIT 10"
+
+def test_error_injection_and_seeded_latency():
+    """Test injected errors use OpenAI's error shape and seeded latency sequences repeat"""
+    client = TestClient(create_app(StubBehaviour(error_rate=1.0, error_statuses=[429])))
+    response = client.post("/v1/chat/completions", json={"model": "m", "messages": MESSAGES})
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "rate_limit_exceeded"
+
+    runs = []
+    for _ in range(2):
+        model = LatencyModel("lognormal:-1,0.5", random.Random(7))
+        runs.append([model.sample() for _ in range(3)])
+    assert runs[0] == runs[1] and len(set(runs[0])) == 3
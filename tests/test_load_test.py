@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for the load test harness
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from scripts.load_test import parse_mix, run
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/execute-query")
+    async def execute_query():
+        return {"success": True}
+
+    return app
+
+def _args(**overrides) -> argparse.Namespace:
+    defaults = dict(
+        base_url="http://test", database_url="postgresql://stub", mode="closed", concurrency=2, rate=200.0,
+        max_in_flight=50, duration=0.3, warmup=0.05, mix="execute-query=1", sql="SELECT 1",
+        questions=["q"], timeout=5.0, seed=1
+    )
+    return argparse.Namespace(**{**defaults, **overrides})
+
+def test_parse_mix_rejects_unknown_endpoints():
+    """Test the mix spec defaults weights to 1 and refuses endpoints the harness can't drive"""
+    assert parse_mix("schema,execute-query=3") == {"schema": 1.0, "execute-query": 3.0}
+    with pytest.raises(ValueError):
+        parse_mix("health=1")
+
+@pytest.mark.parametrize("mode", ["closed", "open"])
+def test_run_reports_percentiles_and_errors(mode):
+    """Test both loop modes report per-endpoint latency and count non-2xx responses as errors"""
+    transport = httpx.ASGITransport(app=_app())
+    report = asyncio.run(run(_args(mode=mode, mix="execute-query=1,generate-query=1"), transport=transport))
+
+    execute = report["endpoints"]["execute-query"]
+    assert execute["requests"] > 0 and execute["errors"] == 0
+    assert execute["p50_ms"] <= execute["p95_ms"] <= execute["p99_ms"] <= execute["max_ms"]
+    # generate-query isn't served by the test app, so every request is a 404
+    assert report["endpoints"]["generate-query"]["error_rate"] == 1.0
+    assert report["error_kinds"] == {"HTTP 404": report["endpoints"]["generate-query"]["requests"]}
+    assert report["config"]["mode"] == mode
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the event loop monitor
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.loop_monitor import LoopMonitor, detect_blocking_callbacks
+
+def _block_loop(seconds):
+    time.sleep(seconds)
+
+@pytest.mark.allow_loop_blocking
+def test_monitor_captures_blocking_stack():
+    """Test a stall past the threshold is recorded with the blocking call's stack and its duration"""
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, buffer_size=5)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _block_loop(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    stalls = monitor.stalls()
+    assert len(stalls) == 1
+    assert any("_block_loop" in line for line in stalls[0].stack)
+    assert stalls[0].duration >= 0.25
+
+@pytest.mark.allow_loop_blocking
+def test_detect_blocking_callbacks_reports_slow_callback():
+    """Test the test-mode detector flags only callbacks that ran past the threshold"""
+    async def scenario():
+        await asyncio.sleep(0.01)
+        _block_loop(0.2)
+
+    with detect_blocking_callbacks(0.1) as stalls:
+        asyncio.run(scenario())
+    assert len(stalls) == 1
+    assert stalls[0].duration >= 0.2
+    assert any("_block_loop" in line for line in stalls[0].stack)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics subsystem
+"""
+
+import os
+import sys
+import threading
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.metrics import Registry
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram buckets are cumulative and include +Inf, sum and count"""
+    registry = Registry()
+    histogram = registry.histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("fetch").observe(value)
+    
+    text = registry.render()
+    assert 'test_seconds_bucket{stage="fetch",le="0.1"} 2' in text
+    assert 'test_seconds_bucket{stage="fetch",le="1"} 3' in text
+    assert 'test_seconds_bucket{stage="fetch",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="fetch"} 4' in text
+    assert 'test_seconds_sum{stage="fetch"} 3.65' in text
+
+def test_counter_sums_thread_shards():
+    """Test counts recorded from many threads, including finished ones, are all reported"""
+    registry = Registry()
+    counter = registry.counter("test_total", "Test counter", ["cache", "result"])
+    
+    def record():
+        for _ in range(1000):
+            counter.labels("query", "hit").inc()
+    
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert 'test_total{cache="query",result="hit"} 8000' in registry.render()
+    assert counter.labels("query", "hit").value() == 8000
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for on-demand request profiling
+"""
+
+import asyncio
+import cProfile
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import config
+from app.core import profiling
+from app.core.profiling import Profiler, _cprofile_report
+
+client = TestClient(app)
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+def test_cprofile_report_builds_collapsed_stacks():
+    """Test cProfile data yields top functions and collapsed stacks that nest callers before callees"""
+    session = cProfile.Profile()
+    session.enable()
+    _busy(200000)
+    session.disable()
+    stacks, top = _cprofile_report(session, 10)
+    assert any(row["function"].startswith("_busy") for row in top)
+    assert any("_busy (test_profiling.py" in stack and ";<genexpr>" in stack for stack in stacks)
+
+def test_armed_profiler_claims_only_matching_requests():
+    """Test arming profiles the next N requests under the prefix and a busy cProfile falls back to sampling"""
+    profiler = Profiler(buffer_size=5)
+    profiler.arm("cprofile", 2, path_prefix="/api/execute")
+    assert profiler.claim("/api/schema") is None
+    assert profiler.claim("/api/execute-query") == "cprofile"
+    assert profiler.claim("/api/execute-query") == "sample"
+    assert profiler.claim("/api/execute-query") is None
+
+def test_admin_endpoints_require_token(monkeypatch):
+    """Test admin endpoints are hidden without ADMIN_TOKEN and reject a wrong token"""
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    assert client.get("/api/admin/profiles").status_code == 404
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+def test_marked_request_is_sampled(monkeypatch):
+    """Test a request sent with X-Profile and the admin token returns a profile id with collapsed stacks"""
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    response = client.get("/api/health", headers={**headers, "X-Profile": "sample"})
+    profile_id = response.headers["x-profile-id"]
+
+    profile = client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+    assert profile["mode"] == "sample" and profile["path"] == "/api/health"
+    collapsed = client.get(f"/api/admin/profiles/{profile_id}?format=collapsed", headers=headers)
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert "x-profile-id" not in client.get("/api/health", headers={"X-Profile": "sample"}).headers
+
+def test_failed_cprofile_start_releases_the_slot(monkeypatch):
+    """Test a cProfile session that cannot start frees the slot so later requests can still use cProfile"""
+    class BrokenProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", BrokenProfile)
+    profiler = Profiler(buffer_size=5)
+    assert profiler.claim("/api/health", "cprofile") == "cprofile"
+    with pytest.raises(ValueError):
+        profiler.start("cprofile", "GET", "/api/health")
+    assert profiler.claim("/api/health", "cprofile") == "cprofile"
+
+def test_profile_report_is_built_off_the_event_loop(monkeypatch):
+    """Test the middleware builds the cProfile report in a worker thread, not on the event loop"""
+    threads = []
+
+    def report(session, limit):
+        try:
+            asyncio.get_running_loop()
+            threads.append("event loop")
+        except RuntimeError:
+            threads.append("worker")
+        return {}, []
+
+    monkeypatch.setattr(profiling, "_cprofile_report", report)
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    response = client.get("/api/health", headers={"X-Admin-Token": "secret", "X-Profile": "cprofile"})
+    assert "x-profile-id" in response.headers and threads == ["worker"]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the query result cache
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.core.config import config
+from app.main import app
+from app.models.schemas import ConnectionResponse, ConnectionStatus, ExecuteResponse
+from app.services import query_cache as cache_module
+from app.services.query_cache import QueryCache
+
+class FakeDatabase:
+    """Stands in for execute_query and the table counters; each query returns a fresh payload"""
+
+    def __init__(self):
+        self.executed = []
+        self.counters = {"orders": (10, 0, 0, 10), "users": (5, 0, 0, 5)}
+
+    def execute_query(self, database_url, sql, **kwargs):
+        self.executed.append(sql)
+        return ExecuteResponse(success=True, data=[{"run": len(self.executed), "pad": "x" * 200}], row_count=1)
+
+    def table_counters(self, database_url, tables):
+        return {table: self.counters[table] for table in tables}
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(cache_module.DatabaseService, "execute_query", staticmethod(fake.execute_query))
+    monkeypatch.setattr(QueryCache, "_table_counters", staticmethod(fake.table_counters))
+    return fake
+
+def test_repeated_query_is_served_from_cache(database):
+    """Test a repeated read hits the cache, normalizing whitespace and keyword case"""
+    cache = QueryCache(max_bytes=1024 * 1024)
+    first = cache.execute("postgresql://db", "SELECT * FROM orders")
+    second = cache.execute("postgresql://db", "select *\n  from orders")
+    assert not first.cache_hit and second.cache_hit
+    assert second.data == first.data and database.executed == ["SELECT * FROM orders"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_changed_counters_invalidate_the_entry(database):
+    """Test a write to any referenced table, seen through its counters, makes the next read run again"""
+    cache = QueryCache(max_bytes=1024 * 1024)
+    sql = "SELECT * FROM orders JOIN users ON users.id = orders.user_id"
+    cache.execute("postgresql://db", sql)
+    database.counters["users"] = (5, 1, 0, 5)
+    assert not cache.execute("postgresql://db", sql).cache_hit
+    assert cache.execute("postgresql://db", sql).cache_hit
+    assert len(database.executed) == 2
+
+def test_untrackable_tables_and_writes_are_not_cached(database, monkeypatch):
+    """Test statements whose tables have no usable counters, or that write, always run"""
+    monkeypatch.setattr(QueryCache, "_table_counters", staticmethod(lambda url, tables: None))
+    cache = QueryCache(max_bytes=1024 * 1024)
+    for sql in ("SELECT * FROM partitioned_orders", "SELECT * FROM partitioned_orders",
+                "DELETE FROM orders", "SELECT random() FROM orders"):
+        assert not cache.execute("postgresql://db", sql).cache_hit
+    assert len(database.executed) == 4 and cache.stats()["entries"] == 0
+
+def test_least_recently_used_entries_are_evicted_by_bytes(database):
+    """Test storing past max_bytes drops the least recently used entries first"""
+    cache = QueryCache(max_bytes=1024 * 1024)
+    cache.execute("postgresql://db", "SELECT * FROM orders WHERE id = 1")
+    # Room for four entries of about this size; one entry may use at most a quarter of the cache
+    cache.max_bytes = cache.stats()["bytes"] * 4 + 16
+
+    for i in (2, 3, 4):
+        cache.execute("postgresql://db", f"SELECT * FROM orders WHERE id = {i}")
+    assert cache.execute("postgresql://db", "SELECT * FROM orders WHERE id = 1").cache_hit
+    cache.execute("postgresql://db", "SELECT * FROM orders WHERE id = 5")
+
+    assert cache.stats()["entries"] == 4 and cache.stats()["bytes"] <= cache.max_bytes
+    assert cache.execute("postgresql://db", "SELECT * FROM orders WHERE id = 1").cache_hit
+    assert not cache.execute("postgresql://db", "SELECT * FROM orders WHERE id = 2").cache_hit
+
+def test_entries_expire_after_max_age(database, monkeypatch):
+    """Test an entry older than QUERY_CACHE_MAX_AGE is dropped even though its counters still match"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    monkeypatch.setattr(config, "QUERY_CACHE_MAX_AGE", 60)
+    cache = QueryCache(max_bytes=1024 * 1024)
+    cache.execute("postgresql://db", "SELECT * FROM orders")
+
+    now[0] += 59
+    assert cache.execute("postgresql://db", "SELECT * FROM orders").cache_hit
+    now[0] += 2
+    assert not cache.execute("postgresql://db", "SELECT * FROM orders").cache_hit
+    assert len(database.executed) == 2
+
+def test_template_mode_runs_cache_misses(database, monkeypatch):
+    """Test /execute-query with use_template and use_cache serves hits from the cache and runs misses as templates"""
+    templated = []
+
+    def execute_sql(database_url, sql, **kwargs):
+        templated.append(sql)
+        return ExecuteResponse(success=True, data=[{"n": 1}], row_count=1, template_id="t1")
+
+    monkeypatch.setattr(endpoints.DatabaseService, "test_connection",
+                        staticmethod(lambda url: ConnectionResponse(status=ConnectionStatus.SUCCESS, message="ok")))
+    monkeypatch.setattr(endpoints.query_template_service, "execute_sql", execute_sql)
+    monkeypatch.setattr(endpoints, "query_cache", QueryCache(max_bytes=1024 * 1024))
+    client = TestClient(app)
+    body = {"sql": "SELECT * FROM orders", "database_url": "postgresql://db", "use_template": True, "use_cache": True}
+
+    first = client.post("/api/execute-query", json=body).json()
+    second = client.post("/api/execute-query", json=body).json()
+    assert not first["cache_hit"] and second["cache_hit"] and second["template_id"] == "t1"
+    assert templated == ["SELECT * FROM orders"] and database.executed == []
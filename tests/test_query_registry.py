@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for in-flight query cancellation
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.main import app
+from app.services.query_registry import DuplicateRequestError, QueryCancelledError, QueryRegistry, query_registry
+
+class FakeConnection:
+    def __init__(self, cancel_error=None):
+        self.cancelled = 0
+        self.cancel_error = cancel_error
+
+    def get_backend_pid(self):
+        return 4242
+
+    def cancel(self):
+        if self.cancel_error:
+            raise self.cancel_error
+        self.cancelled += 1
+
+class FakeRequest:
+    """Starlette Request stand-in that reports a disconnect after a few polls"""
+
+    def __init__(self, polls_before_disconnect=2):
+        self.polls = 0
+        self.polls_before_disconnect = polls_before_disconnect
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls > self.polls_before_disconnect
+
+def test_cancel_running_and_not_yet_started_requests():
+    """Test a running request is cancelled on its connection and an early cancel stops it from starting"""
+    registry = QueryRegistry()
+    conn = FakeConnection()
+    registry.register("running", "postgresql://db", conn)
+    assert registry.cancel("running") and conn.cancelled == 1
+    assert registry.in_flight()[0]["backend_pid"] == 4242
+    registry.unregister("running")
+    assert not registry.is_running("running")
+
+    assert not registry.cancel("early")
+    with pytest.raises(QueryCancelledError):
+        registry.register("early", "postgresql://db", FakeConnection())
+
+def test_duplicate_request_ids_are_rejected():
+    """Test a second statement cannot take over the request id of one still running"""
+    registry = QueryRegistry()
+    first = FakeConnection()
+    registry.register("shared", "postgresql://db", first)
+    with pytest.raises(DuplicateRequestError):
+        registry.register("shared", "postgresql://db", FakeConnection())
+    registry.cancel("shared")
+    assert first.cancelled == 1
+
+def test_execute_query_rejects_a_running_request_id():
+    """Test /execute-query answers 409 instead of reusing a request id that is still running"""
+    query_registry.register("busy", "postgresql://db", FakeConnection())
+    try:
+        response = TestClient(app).post("/api/execute-query", json={
+            "sql": "SELECT 1", "database_url": "postgresql://db", "request_id": "busy"
+        })
+    finally:
+        query_registry.unregister("busy")
+    assert response.status_code == 409
+
+def test_failed_cancel_does_not_signal_the_backend_pid(monkeypatch):
+    """Test a failed libpq cancel is reported instead of falling back to pg_cancel_backend on a reusable PID"""
+    def connect(*args, **kwargs):
+        raise AssertionError("cancel must not open a second session")
+
+    monkeypatch.setattr("psycopg2.connect", connect)
+    registry = QueryRegistry()
+    registry.register("broken", "postgresql://db", FakeConnection(OSError("socket closed")))
+    assert registry.cancel("broken") is False
+
+def test_client_disconnect_cancels_the_statement(monkeypatch):
+    """Test _run_cancellable cancels by request id when the client goes away and still waits for the worker"""
+    registry = QueryRegistry()
+    monkeypatch.setattr(endpoints, "query_registry", registry)
+    monkeypatch.setattr(endpoints, "DISCONNECT_POLL_INTERVAL", 0.01)
+    conn = FakeConnection()
+    stopped = threading.Event()
+    conn.cancel = stopped.set
+
+    def statement(request_id):
+        registry.register(request_id, "postgresql://db", conn)
+        try:
+            return "cancelled" if stopped.wait(5) else "finished"
+        finally:
+            registry.unregister(request_id)
+
+    request = FakeRequest()
+    result = asyncio.run(endpoints._run_cancellable(request, "req-1", statement, "req-1"))
+    assert result == "cancelled" and request.polls == 3
+    assert not registry.is_running("req-1")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for parameterized query templates
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import psycopg2
+import pytest
+
+from app.models.schemas import ExecuteResponse
+from app.services import query_templates
+from app.services.query_registry import QueryRegistry
+from app.services.query_templates import QueryTemplateService
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+        if sql.startswith("PREPARE") and self.conn.prepare_error:
+            raise self.conn.prepare_error
+
+    def mogrify(self, sql, params):
+        return (sql % tuple(repr(p) for p in params or ())).encode("utf-8")
+
+class FakeConnection:
+    """Pooled connection stand-in whose PREPARE can be made to fail"""
+
+    def __init__(self, prepare_error=None):
+        self.prepare_error = prepare_error
+        self.prepared_statements = OrderedDict()
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def get_backend_pid(self):
+        return 4242
+
+@pytest.fixture
+def database(monkeypatch):
+    state = {"conn": FakeConnection(), "registry": QueryRegistry()}
+
+    @contextmanager
+    def get_pooled_connection(database_url):
+        yield state["conn"]
+
+    def run_statement(conn, sql, start_time, *args, **kwargs):
+        state["running"] = state["registry"].in_flight()
+        return ExecuteResponse(success=True, data=[{"sql": sql}], row_count=1)
+
+    monkeypatch.setattr(query_templates.DatabaseService, "get_pooled_connection", staticmethod(get_pooled_connection))
+    monkeypatch.setattr(query_templates.DatabaseService, "_run_statement", staticmethod(run_statement))
+    monkeypatch.setattr("app.services.database_service.query_registry", state["registry"])
+    return state
+
+def test_failed_prepare_is_remembered_per_template(database):
+    """Test a template whose PREPARE fails runs as plain text and is not prepared again on the next call"""
+    database["conn"] = FakeConnection(psycopg2.ProgrammingError("column must appear in the GROUP BY clause"))
+    service = QueryTemplateService()
+    sql = "SELECT status = 'x', count(*) FROM orders GROUP BY status = 'x'"
+
+    for _ in range(3):
+        response = service.execute_sql("postgresql://db", sql)
+        assert response.success and response.data[0]["sql"].startswith("select status = 'x'")
+    assert [s for s in database["conn"].executed if s.startswith("PREPARE")] == [database["conn"].executed[0]]
+    assert database["conn"].rollbacks == 1
+
+def test_prepared_template_is_reused_and_tracked_by_request_id(database):
+    """Test a preparable template is prepared once, executed by name, and cancellable by request id"""
+    service = QueryTemplateService()
+    for _ in range(2):
+        response = service.execute_sql("postgresql://db", "SELECT * FROM orders WHERE id = 7", request_id="req-1")
+        assert response.data[0]["sql"].startswith("EXECUTE nl2sql_")
+    assert sum(s.startswith("PREPARE") for s in database["conn"].executed) == 1
+    assert [entry["request_id"] for entry in database["running"]] == ["req-1"]
+    assert not database["registry"].is_running("req-1")
+
+def test_cancelled_prepare_is_not_remembered_or_retried_as_text(database):
+    """Test a PREPARE stopped by a cancel fails the request without marking the template unpreparable"""
+    database["conn"] = FakeConnection(psycopg2.extensions.QueryCanceledError("canceling statement"))
+    service = QueryTemplateService()
+    response = service.execute_sql("postgresql://db", "SELECT * FROM orders WHERE id = 7")
+    assert not response.success and "canceling statement" in response.error
+    assert not service._unpreparable
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for read replica routing
+"""
+
+import os
+import sys
+import pytest
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.services import replica_router as replica_module
+from app.services.replica_router import ReplicaRouter, UnknownDsnGroupError, parse_dsn_groups
+from app.services.sql_text import is_read_only
+
+def make_router():
+    router = ReplicaRouter({
+        "sales": {"primary": "postgresql://primary/sales", "replicas": ["postgresql://r1/sales", "postgresql://r2/sales"]}
+    })
+    for replica in router._groups["sales"].replicas:
+        replica.healthy = True
+        replica.lag_seconds = 0.0
+    return router
+
+def test_reads_go_to_least_loaded_replica():
+    """Test concurrent reads are spread across healthy replicas"""
+    router = make_router()
+    with router.route("group:sales", read_only=True) as first:
+        with router.route("group:sales", read_only=True) as second:
+            assert {first, second} == {"postgresql://r1/sales", "postgresql://r2/sales"}
+    assert all(r.in_flight == 0 for r in router._groups["sales"].replicas)
+
+def test_writes_and_unhealthy_replicas_use_primary():
+    """Test writes always, and reads without a healthy replica, run on the primary"""
+    router = make_router()
+    with router.route("group:sales", read_only=False) as dsn:
+        assert dsn == "postgresql://primary/sales"
+
+    for replica in router._groups["sales"].replicas:
+        replica.healthy = False
+    with router.route("group:sales", read_only=True) as dsn:
+        assert dsn == "postgresql://primary/sales"
+
+def test_plain_and_unknown_dsns():
+    """Test plain DSNs pass through and unknown groups are rejected"""
+    router = make_router()
+    with router.route("postgresql://other/db", read_only=True) as dsn:
+        assert dsn == "postgresql://other/db"
+    with pytest.raises(UnknownDsnGroupError):
+        router.primary("group:missing")
+
+def test_side_effecting_selects_stay_on_primary():
+    """Test SELECTs that advance sequences or signal backends are not treated as replica-safe reads"""
+    assert is_read_only("SELECT count(*) FROM orders")
+    assert not is_read_only("SELECT nextval('orders_id_seq')")
+    assert not is_read_only("SELECT pg_advisory_lock(1)")
+
+def test_disconnected_wal_receiver_marks_replica_unhealthy(monkeypatch):
+    """Test a replica that has replayed all it received but stopped streaming is not routed to"""
+    class FakeCursor:
+        def execute(self, sql):
+            pass
+        
+        def fetchone(self):
+            return (0, streaming)
+    
+    class FakeConnection:
+        def cursor(self):
+            return FakeCursor()
+        
+        def close(self):
+            pass
+    
+    monkeypatch.setattr(replica_module.psycopg2, "connect", lambda *args, **kwargs: FakeConnection())
+    router = make_router()
+    streaming = False
+    router.probe()
+    assert [r.healthy for r in router._groups["sales"].replicas] == [False, False]
+    assert router.status()["sales"][0]["error"] == "WAL receiver is not streaming"
+    
+    streaming = True
+    router.probe()
+    assert [r.healthy for r in router._groups["sales"].replicas] == [True, True]
+
+def test_malformed_dsn_groups_fail_at_startup_not_import(monkeypatch):
+    """Test a bad DSN_GROUPS value is reported clearly when routing starts instead of at import"""
+    with pytest.raises(ValueError, match="not valid JSON"):
+        parse_dsn_groups("{sales: }")
+    with pytest.raises(ValueError, match="needs a \"primary\""):
+        parse_dsn_groups({"sales": {"replicas": []}})
+    
+    monkeypatch.setattr(replica_module.config, "DSN_GROUPS", '{"sales": {"primary": 1}}')
+    router = ReplicaRouter()
+    with pytest.raises(ValueError, match="group 'sales'"):
+        router.start()
+    with pytest.raises(UnknownDsnGroupError, match="group 'sales'"):
+        router.primary("group:sales")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for result byte budgets
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from app.core.config import config
+from app.models.schemas import LimitReason
+from app.services import database_service
+from app.services.database_service import DatabaseService
+from app.services.result_budget import (
+    TRUNCATION_MARKER, ResultBudgetMiddleware, WorkerByteBudget, encoded_size, request_reservation, row_size
+)
+
+def test_row_size_tracks_cells():
+    """Test row sizes grow with cell contents"""
+    small, _ = row_size({"name": "a"})
+    large, truncated = row_size({"name": "a" * 1000})
+    assert large - small == 999
+    assert truncated == 0
+
+def test_row_size_truncates_oversized_cells():
+    """Test oversized cells are cut with a marker only when a cell limit is given"""
+    row = {"body": "x" * 5000, "doc": {"text": "y" * 5000}, "raw": b"\x00" * 5000, "id": 7}
+    size, truncated = row_size(row, max_cell_bytes=100)
+    assert truncated == 3
+    assert row["body"] == "x" * 100 + TRUNCATION_MARKER
+    assert row["doc"].endswith(TRUNCATION_MARKER) and len(row["doc"]) == 100 + len(TRUNCATION_MARKER)
+    assert row["raw"] == "00" * 50 + TRUNCATION_MARKER
+    assert row["id"] == 7
+    assert size < 500
+    assert encoded_size(row["body"]) <= 100 + len(TRUNCATION_MARKER) + 2
+
+def test_worker_budget_reserve_and_release():
+    """Test the worker budget refuses reservations past its limit until bytes are released"""
+    budget = WorkerByteBudget(max_bytes=100)
+    assert budget.reserve(60)
+    assert not budget.reserve(50)
+    budget.release(60)
+    assert budget.reserve(100)
+
+class FakeCursor:
+    """Server-side cursor stand-in handing out rows of a fixed size in fetchmany batches"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+
+    def fetchmany(self, size):
+        batch = self.rows[self.fetched:self.fetched + size]
+        self.fetched += len(batch)
+        return batch
+
+@pytest.fixture
+def budget(monkeypatch):
+    worker_budget = WorkerByteBudget(max_bytes=10_000)
+    monkeypatch.setattr(database_service, "worker_byte_budget", worker_budget)
+    monkeypatch.setattr(config, "RESULT_FETCH_BATCH", 4)
+    return worker_budget
+
+def _rows(count):
+    return [{"name": "x" * 90} for _ in range(count)]
+
+def test_fetch_stops_at_the_request_byte_limit(budget, monkeypatch):
+    """Test a result is cut at RESULT_MAX_BYTES and the fetch releases its bytes outside a request"""
+    row_bytes, _ = row_size(_rows(1)[0])
+    monkeypatch.setattr(config, "RESULT_MAX_BYTES", row_bytes * 5 + 1)
+    cursor = FakeCursor(_rows(20))
+    data, limit_reason, truncated = DatabaseService._fetch_within_budget(cursor, max_rows=100)
+    assert len(data) == 5 and limit_reason == LimitReason.MAX_BYTES and truncated == 0
+    assert cursor.fetched < 20 and budget.used_bytes == 0
+
+def test_fetch_stops_when_the_worker_budget_is_spent(budget):
+    """Test a fetch is cut with WORKER_MAX_BYTES once other requests hold most of the worker budget"""
+    row_bytes, _ = row_size(_rows(1)[0])
+    assert budget.reserve(budget.max_bytes - row_bytes * 3)
+    data, limit_reason, _ = DatabaseService._fetch_within_budget(FakeCursor(_rows(20)), max_rows=100)
+    assert len(data) == 3 and limit_reason == LimitReason.WORKER_MAX_BYTES
+
+def test_request_keeps_its_rows_reserved_until_the_response_is_sent(budget):
+    """Test rows fetched for a request stay charged to the worker budget until the middleware sees it finish"""
+    row_bytes, _ = row_size(_rows(1)[0])
+    held = []
+
+    async def app(scope, receive, send):
+        data, _, _ = DatabaseService._fetch_within_budget(FakeCursor(_rows(6)), max_rows=100)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        held.append((len(data), budget.used_bytes))
+        await send({"type": "http.response.body", "body": b"rows"})
+
+    async def send(message):
+        pass
+
+    middleware = ResultBudgetMiddleware(app, budget)
+    asyncio.run(middleware({"type": "http"}, None, send))
+    assert held == [(6, row_bytes * 6)]
+    assert budget.used_bytes == 0 and request_reservation() is None
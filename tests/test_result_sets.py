@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for server-held result sets and the columnar result store
+"""
+
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from app.services import result_store
+from app.core.config import config
+from app.services.result_set_service import ResultSet, ResultSetService
+from app.services.result_store import ColumnarResultWriter, ColumnKind
+
+def _write_store(path, rows):
+    """Write id/name/score/tags rows into a columnar file"""
+    writer = ColumnarResultWriter(
+        path,
+        ["id", "name", "score", "tags"],
+        [ColumnKind.INT64, ColumnKind.STR, ColumnKind.FLOAT64, ColumnKind.JSON]
+    )
+    writer.append_rows(rows)
+    return writer.finish()
+
+def test_columnar_round_trip(tmp_path):
+    """Test values and nulls survive the columnar layout"""
+    store = _write_store(str(tmp_path / "result.nlrs"), [
+        (1, "alice", Decimal("9.50"), ["a", "b"]),
+        (2, None, None, {"k": 1}),
+        (3, "carol", 7.25, None),
+    ])
+    
+    assert store.columns == ["id", "name", "score", "tags"]
+    assert store.row_count == 3
+    assert store.slice(0, 3) == [
+        {"id": 1, "name": "alice", "score": 9.5, "tags": ["a", "b"]},
+        {"id": 2, "name": None, "score": None, "tags": {"k": 1}},
+        {"id": 3, "name": "carol", "score": 7.25, "tags": None},
+    ]
+    store.close()
+
+def test_columnar_sort(tmp_path):
+    """Test sorted slicing with NaN and nulls placed like PostgreSQL"""
+    store = _write_store(str(tmp_path / "result.nlrs"), [
+        (1, "bob", 2.0, None),
+        (2, None, 3.0, None),
+        (3, "alice", 1.0, None),
+        (4, "dave", float("nan"), None),
+        (5, "erin", 0.5, None),
+    ])
+    
+    assert [row["id"] for row in store.slice(0, 3, sort_by="name")] == [3, 1, 4]
+    assert [row["id"] for row in store.slice(0, 3, sort_by="name", descending=True)] == [2, 5, 4]
+    assert [row["id"] for row in store.slice(0, 5, sort_by="score")] == [5, 3, 1, 2, 4]
+    assert [row["id"] for row in store.slice(0, 2, sort_by="score", descending=True)] == [4, 2]
+    store.close()
+
+def test_numeric_columns_stay_exact_and_sort_by_value(tmp_path):
+    """Test numeric (OID 1700) keeps its text form and sorts numerically with NaN above every number"""
+    writer = ColumnarResultWriter.from_description(str(tmp_path / "result.nlrs"), [("amount", 1700)])
+    writer.append_rows([(Decimal("10.50"),), (Decimal("NaN"),), (None,), (Decimal("9.99"),),
+                        (Decimal("12345678901234567890.01"),)])
+    store = writer.finish()
+    
+    assert store.slice(0, 1) == [{"amount": "10.50"}]
+    ordered = [row["amount"] for row in store.slice(0, 5, sort_by="amount")]
+    assert ordered == ["9.99", "10.50", "12345678901234567890.01", "NaN", None]
+    assert [row["amount"] for row in store.slice(0, 2, sort_by="amount", descending=True)] == [None, "NaN"]
+    store.close()
+
+def test_sort_merges_runs_stably(tmp_path, monkeypatch):
+    """Test sorting in several runs gives the same stable order as one in-memory sort"""
+    monkeypatch.setattr(result_store, "_SORT_RUN_ROWS", 3)
+    nan = float("nan")
+    scores = [3.0, 1.0, None, nan, 2.0, 1.0, 3.0, None, 2.0, nan, 1.0, 0.5]
+    store = _write_store(str(tmp_path / "result.nlrs"), [(i, None, score, None) for i, score in enumerate(scores)])
+    
+    valid = [i for i, score in enumerate(scores) if score is not None and score == score]
+    nans = [i for i, score in enumerate(scores) if score is not None and score != score]
+    nulls = [i for i, score in enumerate(scores) if score is None]
+    ordered = sorted(valid, key=lambda i: scores[i])
+    assert list(store.sort_order("score")) == ordered + nans + nulls
+    descending = sorted(valid, key=lambda i: scores[i], reverse=True)
+    assert list(store.sort_order("score", descending=True)) == nulls + nans + descending
+    store.close()
+
+def test_close_waits_for_readers(tmp_path):
+    """Test closing a result while a reader is mid-slice defers releasing the mapping until it finishes"""
+    store = _write_store(str(tmp_path / "result.nlrs"), [(i, f"user {i}", i / 2, None) for i in range(5)])
+    rows = store.iter_rows(sort_by="name")
+    assert next(rows)["id"] == 0
+    
+    store.close()
+    assert not store._mmap.closed
+    assert [row["id"] for row in rows] == [1, 2, 3, 4]
+    assert store._mmap.closed
+    with pytest.raises(ValueError):
+        store.slice(0, 1)
+
+def test_fetch_page(tmp_path):
+    """Test paging through a held result set"""
+    service = ResultSetService(directory=str(tmp_path))
+    store = _write_store(str(tmp_path / "test.nlrs"), [(i, f"user {i}", i / 2, None) for i in range(25)])
+    service._result_sets["test"] = ResultSet(result_set_id="test", user_id="demo_user", store=store)
+    
+    page = service.fetch_page("test", 10, 5)
+    assert [row["id"] for row in page.data] == [10, 11, 12, 13, 14]
+    assert page.total_rows == 25
+    
+    # Last partial page
+    page = service.fetch_page("test", 20, 10)
+    assert [row["id"] for row in page.data] == [20, 21, 22, 23, 24]
+    
+    # Past the end
+    page = service.fetch_page("test", 30, 10)
+    assert page.data == []
+    
+    # Release removes the spill file
+    assert service.close("test")
+    assert not os.path.exists(store.path)
+    assert service.fetch_page("test", 0, 10) is None
+
+def test_startup_removes_spill_files_of_exited_processes(tmp_path):
+    """Test start() deletes files of exited processes and unowned files of its own, but not a live process's"""
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    service = ResultSetService(directory=str(tmp_path))
+    files = {
+        "exited": tmp_path / f"p{exited.pid}" / "a.nlrs",
+        "live": tmp_path / f"p{os.getppid()}" / "b.nlrs",
+        "own": tmp_path / f"p{os.getpid()}" / "c.nlrs",
+        "flat": tmp_path / "d.nlrs",
+    }
+    for path in files.values():
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"spill")
+    store = _write_store(str(tmp_path / f"p{os.getpid()}" / "held.nlrs"), [(1, "a", 1.0, None)])
+    service._result_sets["held"] = ResultSet(result_set_id="held", user_id="demo_user", store=store)
+
+    try:
+        service.start()
+        assert {name for name, path in files.items() if path.exists()} == {"live"}
+        assert not (tmp_path / f"p{exited.pid}").exists() and os.path.exists(store.path)
+    finally:
+        service.stop()
+    assert not os.path.exists(store.path)
+
+def test_idle_result_sets_expire_without_further_requests(tmp_path, monkeypatch):
+    """Test the background sweep drops expired result sets and their files with no create or fetch"""
+    monkeypatch.setattr(config, "RESULT_SET_SWEEP_INTERVAL", 0.01)
+    monkeypatch.setattr(config, "RESULT_SET_TTL", 0)
+    service = ResultSetService(directory=str(tmp_path))
+    store = _write_store(str(tmp_path / "idle.nlrs"), [(1, "a", 1.0, None)])
+    service._result_sets["idle"] = ResultSet(result_set_id="idle", user_id="demo_user", store=store,
+                                             last_access=time.time() - 1)
+    service.start()
+    try:
+        deadline = time.time() + 5
+        while os.path.exists(store.path) and time.time() < deadline:
+            time.sleep(0.01)
+        assert not os.path.exists(store.path) and not service._result_sets
+    finally:
+        service.stop()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for SQL text helpers
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.sql_text import (
+    bind_parameters, extract_literals, is_deterministic, is_read_only, is_single_statement, normalize_sql,
+    referenced_tables
+)
+
+def test_normalize_sql():
+    """Test normalization keeps literals and drops formatting differences"""
+    first = "SELECT  name\nFROM Users -- comment\nWHERE name = 'Bob  Smith';"
+    second = "select name from users where name = 'Bob  Smith'"
+    
+    assert normalize_sql(first) == normalize_sql(second)
+    assert normalize_sql("SELECT 'A'") != normalize_sql("SELECT 'a'")
+
+def test_normalize_sql_keeps_dollar_quoted_strings():
+    """Test dollar-quoted bodies keep their case and hide keywords and separators"""
+    assert normalize_sql("SELECT $$Bob$$") != normalize_sql("SELECT $$bob$$")
+    assert normalize_sql("SELECT $q$ Hi -- there $q$ FROM X") == "select $q$ Hi -- there $q$ from x"
+    assert is_single_statement("SELECT $$a; b$$")
+    assert is_read_only("SELECT $body$delete$body$")
+
+def test_referenced_tables():
+    """Test table extraction skips CTE names"""
+    sql = "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent JOIN public.users u ON true"
+    assert referenced_tables(sql) == ["orders", "public.users"]
+
+def test_referenced_tables_reads_comma_lists_and_joins():
+    """Test every item of a comma FROM list and its joins is found, and unclear clauses give no tables"""
+    assert referenced_tables("SELECT * FROM orders o, users u WHERE o.user_id = u.id") == ["orders", "users"]
+    assert referenced_tables("SELECT * FROM a JOIN b ON a.id = b.id, c WHERE true") == ["a", "b", "c"]
+    assert referenced_tables(
+        "SELECT * FROM (a LEFT JOIN b USING (id)) x, LATERAL generate_series(1, 3) g(n) "
+        "WHERE EXISTS (SELECT 1 FROM c, d)"
+    ) == ["a", "b", "c", "d"]
+    assert referenced_tables("SELECT EXTRACT(year FROM created), SUBSTRING(name FROM 1 FOR 2) FROM users") == ["users"]
+    assert referenced_tables("SELECT * FROM orders TABLESAMPLE SYSTEM (10)") == []
+
+def test_read_only_detection():
+    """Test classification of statements for caching"""
+    assert is_read_only("SELECT * FROM users")
+    assert is_read_only("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not is_read_only("DELETE FROM users")
+    assert not is_read_only("SELECT * FROM users FOR UPDATE")
+    assert is_read_only("SELECT * FROM users WHERE note = 'delete me'")
+    
+    assert is_deterministic("SELECT * FROM orders")
+    assert not is_deterministic("SELECT * FROM orders WHERE order_date > now()")
+
+def test_extract_literals():
+    """Test literals become parameters except where PostgreSQL needs constants"""
+    template, params = extract_literals(
+        "SELECT name, total::numeric(10,2) FROM orders "
+        "WHERE name = 'O''Brien' AND total > 9.5 AND created > DATE '2024-01-01' "
+        "GROUP BY 1, 2 ORDER BY 2 DESC LIMIT 10"
+    )
+    
+    assert template == (
+        "select name, total::numeric(10,2) from orders "
+        "where name = $1 and total > $2 and created > date '2024-01-01' "
+        "group by 1, 2 order by 2 desc limit $3"
+    )
+    assert params == ["O'Brien", Decimal("9.5"), 10]
+
+def test_bind_parameters():
+    """Test templates can be turned back into driver-parameterized SQL"""
+    sql, params = bind_parameters("select * from t where a = $2 and b like $1 and c = '5%'", ["x%", 3])
+    assert sql == "select * from t where a = %s and b like %s and c = '5%%'"
+    assert params == [3, "x%"]
+
+def test_is_single_statement():
+    """Test statement separators inside literals are ignored"""
+    assert is_single_statement("select ';' from users;")
+    assert not is_single_statement("select 1; select 2")
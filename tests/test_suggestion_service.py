@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for suggested question prefetch
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.core.config import config
+from app.main import app
+from app.models.schemas import ColumnInfo, ExecuteResponse, QueryResponse, QueryType, SchemaResponse, TableInfo
+from app.services.database_service import DatabaseService
+from app.services.llm_service import LLMService
+from app.services import suggestion_service
+from app.services.suggestion_service import PrefetchedQuery, SuggestionPrefetcher, normalize_question, schema_fingerprint
+
+def make_schema(row_count=10, data_type="integer"):
+    column = ColumnInfo(name="id", data_type=data_type, is_nullable=False, is_primary_key=True, is_foreign_key=False)
+    return SchemaResponse(tables=[TableInfo(name="users", columns=[column], row_count=row_count)], relationships=[])
+
+def test_schema_fingerprint_ignores_row_counts():
+    """Test the fingerprint changes with the schema shape but not with table sizes"""
+    assert schema_fingerprint(make_schema(10)) == schema_fingerprint(make_schema(5000))
+    assert schema_fingerprint(make_schema()) != schema_fingerprint(make_schema(data_type="bigint"))
+
+def test_normalize_question():
+    """Test suggestions match the questions users send back"""
+    assert normalize_question('"Who are our  top customers?"') == normalize_question("who are our top customers")
+
+def test_prefetch_previews_through_read_only_path(monkeypatch):
+    """Test prefetched previews run via preview_query, never the general execute path"""
+    generated = QueryResponse(sql="SELECT id FROM users", explanation="ids", query_type=QueryType.SELECT)
+    previewed = []
+    
+    def execute_query(*args, **kwargs):
+        raise AssertionError("prefetch must not use execute_query")
+    
+    monkeypatch.setattr(LLMService, "generate_sql", lambda self, question, schema: generated)
+    monkeypatch.setattr(DatabaseService, "explain_query", staticmethod(lambda url, sql, timeout: None))
+    monkeypatch.setattr(DatabaseService, "execute_query", staticmethod(execute_query))
+    monkeypatch.setattr(DatabaseService, "preview_query", staticmethod(
+        lambda url, sql: previewed.append(sql) or ExecuteResponse(success=True, data=[{"id": 1}], row_count=1)
+    ))
+    
+    prefetcher = SuggestionPrefetcher()
+    schema = make_schema()
+    key = ("postgresql://db", schema_fingerprint(schema), normalize_question("List user ids"))
+    prefetcher._prefetch(key, "postgresql://db", schema, "List user ids")
+    assert previewed == ["SELECT id FROM users"]
+    assert prefetcher.lookup("postgresql://db", schema, "list user ids?").preview["data"] == [{"id": 1}]
+
+def test_stale_prefetched_preview_is_fetched_again(monkeypatch):
+    """Test cached preview rows are served with their fetch time until SUGGESTION_PREVIEW_TTL, then refetched"""
+    now = [1000.0]
+    monkeypatch.setattr(suggestion_service.time, "time", lambda: now[0])
+    monkeypatch.setattr(endpoints.time, "time", lambda: now[0])
+    monkeypatch.setattr(config, "SUGGESTION_PREVIEW_TTL", 300)
+    entry = PrefetchedQuery(question="List user ids", sql="SELECT id FROM users", explanation="ids",
+                            preview={"data": [{"id": 1}]}, created_at=now[0])
+    previewed = []
+    monkeypatch.setattr(DatabaseService, "get_cached_schema_info", staticmethod(lambda url: make_schema()))
+    monkeypatch.setattr(endpoints.suggestion_prefetcher, "lookup", lambda url, schema, question: entry)
+    monkeypatch.setattr(DatabaseService, "preview_query", staticmethod(
+        lambda url, sql: previewed.append(sql) or ExecuteResponse(success=True, data=[{"id": 2}], row_count=1)
+    ))
+    client = TestClient(app)
+    body = {"natural_language": "List user ids", "database_url": "postgresql://db", "preview": True}
+
+    now[0] += 299
+    response = client.post("/api/generate-query", json=body).json()
+    assert response["preview"]["data"] == [{"id": 1}] and response["preview_fetched_at"] == 1000.0
+    now[0] += 2
+    response = client.post("/api/generate-query", json=body).json()
+    assert response["preview"]["data"] == [{"id": 2}] and response["preview_fetched_at"] == 1301.0
+    assert previewed == ["SELECT id FROM users"]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+
+from app.core.config import config
+from app.main import app
+from app.core.tracing import Trace, TraceBuffer, _current_trace, propagate, span
+
+client = TestClient(app)
+
+def test_span_is_noop_without_trace():
+    """Test spans outside a traced request record nothing"""
+    with span("db.query") as current:
+        current.set(rows=1)
+    assert _current_trace.get() is None
+
+def test_spans_nest_across_threads():
+    """Test propagated work on other threads is parented to the span that submitted it"""
+    trace = Trace(name="test")
+    token = _current_trace.set(trace)
+    try:
+        with span("root"):
+            with span("fanout"):
+                def work(n):
+                    with span(f"worker.{n}"):
+                        pass
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    list(executor.map(propagate(work), range(2)))
+    finally:
+        _current_trace.reset(token)
+
+    waterfall = trace.waterfall()
+    by_name = {row["name"]: row for row in waterfall["spans"]}
+    assert by_name["root"]["depth"] == 0
+    assert by_name["fanout"]["depth"] == 1
+    assert by_name["worker.0"]["parent_id"] == by_name["fanout"]["span_id"]
+    assert by_name["worker.1"]["depth"] == 2
+
+def test_otlp_export_and_ring_buffer(tmp_path):
+    """Test the buffer keeps only the newest traces and exports them as OTLP JSON lines"""
+    buffer = TraceBuffer(size=2)
+    for name in ("a", "b", "c"):
+        trace = Trace(name=name)
+        token = _current_trace.set(trace)
+        with span(name, rows=3):
+            pass
+        _current_trace.reset(token)
+        buffer.add(trace)
+
+    assert [trace.name for trace in buffer.list()] == ["c", "b"]
+    path = tmp_path / "traces.jsonl"
+    assert buffer.export(str(path)) == 2
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    otlp_span = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["name"] == "b"
+    assert len(otlp_span["traceId"]) == 32 and len(otlp_span["spanId"]) == 16
+    assert {"key": "rows", "value": {"intValue": "3"}} in otlp_span["attributes"]
+
+    # A second export appends only traces added since the first
+    assert buffer.export(str(path)) == 0
+    trace = Trace(name="d")
+    buffer.add(trace)
+    assert buffer.export(str(path)) == 1
+    assert len(path.read_text().splitlines()) == 3
+
+def test_trace_flag_adds_headers_and_buffers_trace(monkeypatch):
+    """Test ?trace=1 returns Server-Timing and a trace id that the admin-only debug endpoint can show"""
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    response = client.get("/api/health?trace=1")
+    assert response.status_code == 200
+    trace_id = response.headers["x-trace-id"]
+    assert "GET__api_health;dur=" in response.headers["server-timing"]
+
+    assert client.get(f"/api/debug/traces/{trace_id}").status_code == 403
+    waterfall = client.get(f"/api/debug/traces/{trace_id}", headers={"X-Admin-Token": "secret"}).json()
+    assert waterfall["spans"][0]["name"] == "GET /api/health"
+    assert "x-trace-id" not in client.get("/api/health").headers
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSON-ready psycopg2 typecasters
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.typecasters import JSON_TYPES
+
+CASTERS = {caster.name: caster for caster in JSON_TYPES}
+
+def cast(name, value):
+    return CASTERS[name](value, None)
+
+def test_numeric_keeps_exact_text():
+    """Test numeric values keep every digit as text, matching how the native path encodes Decimal"""
+    assert cast("JSON_NUMERIC", "1.25") == "1.25"
+    assert cast("JSON_NUMERIC", "12345678901234567890.123456789") == "12345678901234567890.123456789"
+    assert cast("JSON_NUMERIC", "NaN") == "NaN"
+    assert cast("JSON_NUMERIC", None) is None
+    assert cast("JSON_NUMERIC_ARRAY", "{1.50,NULL}") == ["1.50", None]
+
+def test_timestamps_become_iso_8601():
+    """Test timestamps get a T separator and a full offset, while infinity and BC dates pass through"""
+    assert cast("JSON_TIMESTAMP", "2024-01-01 10:00:00.5") == "2024-01-01T10:00:00.5"
+    assert cast("JSON_TIMESTAMPTZ", "2024-01-01 10:00:00+02") == "2024-01-01T10:00:00+02:00"
+    assert cast("JSON_TIMESTAMPTZ", "2024-01-01 10:00:00+05:30") == "2024-01-01T10:00:00+05:30"
+    assert cast("JSON_TIMESTAMP", "infinity") == "infinity"
+    assert cast("JSON_TIMESTAMPTZ_ARRAY", '{"2024-01-01 10:00:00+00"}') == ["2024-01-01T10:00:00+00:00"]
+
+def test_text_types_pass_through():
+    """Test date, time, timetz and uuid values are returned as PostgreSQL prints them"""
+    assert cast("JSON_DATE", "2024-02-29") == "2024-02-29"
+    assert cast("JSON_TIME", "23:59:59") == "23:59:59"
+    assert cast("JSON_TIMETZ", "10:00:00+02") == "10:00:00+02"
+    uuid = "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11"
+    assert cast("JSON_UUID", uuid) == uuid and cast("JSON_UUID_ARRAY", "{" + uuid + "}") == [uuid]
+
+def test_json_and_bytea():
+    """Test json/jsonb are parsed and bytea becomes bare hex"""
+    assert cast("JSON_JSON", '{"a": [1, null]}') == {"a": [1, None]}
+    assert cast("JSON_JSONB", "null") is None and cast("JSON_JSONB", None) is None
+    assert cast("JSON_BYTEA", "\\xdeadbeef") == "deadbeef"
+    assert cast("JSON_BYTEA", None) is None